@@ -0,0 +1,177 @@
+"""界面刷新延迟基准测试（离屏运行）
+
+在 QT_QPA_PLATFORM=offscreen 下运行 MainView + MainController，
+对逐渐增大的数据规模测量首次绘制时间、完整刷新、筛选变更和出售后刷新的耗时，
+并对每个用例拟合 耗时 ∝ 规模^k 的指数k，用于跟踪界面代码的扩展性。
+
+用法：
+    python -m benchmarks.bench_gui --sizes 500 1000 2000 --output gui.json
+    python -m benchmarks.bench_gui --sizes 500 1000 --compare gui.json
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks import harness
+from benchmarks.bench_model import prepare_portfolio
+from controllers.main_controller import MainController
+from models.item_model import ItemModel
+from views.main_view import MainView
+
+
+class _PaintWatcher(QObject):
+    """记录控件是否已收到绘制事件"""
+
+    def __init__(self):
+        super().__init__()
+        self.painted = False
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            self.painted = True
+        return False
+
+
+def _flush_events(app):
+    """处理所有待处理事件（包括deleteLater）"""
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+    app.processEvents()
+
+
+def _time_first_paint(app, model):
+    """从创建窗口到库存表格首次绘制的耗时，返回 (耗时, view, controller)"""
+    watcher = _PaintWatcher()
+    start = time.perf_counter()
+    view = MainView()
+    view.inventory_table.viewport().installEventFilter(watcher)
+    controller = MainController(model, view)
+    view.controller = controller
+    view.show()
+    deadline = start + 600
+    while not watcher.painted and time.perf_counter() < deadline:
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+    view.inventory_table.viewport().removeEventFilter(watcher)
+    return elapsed, view, controller
+
+
+def _full_refresh(controller):
+    controller._update_tables()
+    controller._update_analysis()
+    controller._update_statistics()
+
+
+def run_size(app, n_inventory, n_sold, seed, repeat):
+    source = prepare_portfolio(n_inventory, n_sold, seed)
+    workdir = tempfile.mkdtemp(prefix='cs2_gui_bench_')
+    try:
+        inventory_path = os.path.join(workdir, 'inventory.xlsx')
+        shutil.copy(os.path.join(source, 'inventory.xlsx'), inventory_path)
+        model = ItemModel(inventory_path)
+
+        results = {}
+        first_paint, view, controller = _time_first_paint(app, model)
+        results['time_to_first_paint'] = {
+            'min': first_paint, 'median': first_paint, 'max': first_paint, 'repeat': 1,
+        }
+
+        def refresh():
+            _full_refresh(controller)
+            _flush_events(app)
+
+        results['full_refresh'] = harness.measure(refresh, repeat=repeat, track_memory=False)
+
+        filters = iter([('步枪', '久经沙场'), ('全部', '全部')] * (repeat + 1))
+
+        def change_filter():
+            goods_type, wear = next(filters)
+            view.type_filter.setCurrentText(goods_type)
+            view.wear_filter.setCurrentText(wear)
+            _flush_events(app)
+
+        results['filter_change'] = harness.measure(change_filter, repeat=repeat, track_memory=False)
+        view.on_clear_filter()
+        _flush_events(app)
+
+        inventory = model.get_inventory_items()
+        holding_ids = iter(inventory.loc[inventory['goods_state'] == model.STATUS_HOLDING,
+                                         'inventory_id'].tolist())
+
+        def sell_and_refresh():
+            # 与MainController.sell_item确认出售后的流程一致
+            model.sell_item(next(holding_ids), 120.0)
+            _full_refresh(controller)
+            _flush_events(app)
+
+        results['post_sale_refresh'] = harness.measure(
+            sell_and_refresh, repeat=max(1, repeat // 2), track_memory=False)
+
+        view.close()
+        view.deleteLater()
+        _flush_events(app)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def scaling_curves(results):
+    """整理每个用例的 (规模, 中位耗时) 曲线，并拟合对数坐标下的斜率"""
+    curves = {}
+    sizes = sorted(results, key=int)
+    for case in results[sizes[0]]:
+        points = [[int(size), results[size][case]['median']] for size in sizes]
+        exponent = None
+        if len(points) >= 2:
+            x = np.log([p[0] for p in points])
+            y = np.log([max(p[1], 1e-9) for p in points])
+            exponent = float(np.polyfit(x, y, 1)[0])
+        curves[case] = {'points': points, 'exponent': exponent}
+    return curves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='界面刷新延迟基准测试（离屏）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000])
+    parser.add_argument('--sold-ratio', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='保存结果的JSON文件')
+    parser.add_argument('--compare', help='作为基线的JSON结果文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定退化的相对阈值')
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_size(app, size, int(size * args.sold_ratio), args.seed, args.repeat)
+
+    report = harness.build_report('gui', results)
+    report['curves'] = scaling_curves(results)
+    harness.print_results(results)
+    print("\n扩展性（耗时 ∝ 规模^k）:")
+    for case, curve in report['curves'].items():
+        if curve['exponent'] is not None:
+            print(f"  {case:<28} k = {curve['exponent']:.2f}")
+
+    if args.output:
+        harness.save_report(report, args.output)
+        print(f"\n结果已保存到 {args.output}")
+    if args.compare:
+        rows, regressed = harness.compare_reports(report, harness.load_report(args.compare),
+                                                  args.threshold)
+        harness.print_comparison(rows)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
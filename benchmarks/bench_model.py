@@ -0,0 +1,146 @@
+"""模型与控制器热点路径的基准测试
+
+用法：
+    python -m benchmarks.bench_model --sizes 10000 100000 --output results.json
+    python -m benchmarks.bench_model --sizes 10000 --compare baseline.json
+
+生成的测试数据缓存在 benchmarks/.cache 下，相同规模和种子只生成一次。
+与基线对比时，任一用例中位耗时超过阈值即以非零状态码退出。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from benchmarks import harness
+from benchmarks.data_gen import write_portfolio
+from models.item_mapping import ItemMapping
+from models.item_model import ItemModel
+from models.portfolio_analytics import compute_portfolio_analytics
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache')
+
+
+def prepare_portfolio(n_inventory, n_sold, seed):
+    """返回缓存的测试数据目录，不存在时生成"""
+    directory = os.path.join(CACHE_DIR, f"{n_inventory}_{n_sold}_{seed}")
+    if not os.path.exists(os.path.join(directory, 'item_mapping.xlsx')):
+        print(f"生成测试数据: 库存 {n_inventory} 条, 已售 {n_sold} 条 ...")
+        write_portfolio(directory, n_inventory, n_sold, seed=seed)
+    return directory
+
+
+def _controller_stub(model, filters):
+    """_inventory_where只依赖current_filters和model，用简单对象代替完整的控制器；
+    返回按界面筛选条件查询一页库存的函数"""
+    try:
+        from controllers.main_controller import MainController
+    except ImportError:
+        return None
+    stub = SimpleNamespace(model=model, current_filters=filters)
+    return lambda: model.query('inventory', where=MainController._inventory_where(stub),
+                               limit=MainController.PAGE_SIZE)
+
+
+def run_size(n_inventory, n_sold, seed, repeat, write_repeat):
+    """对一个数据规模运行全部用例"""
+    source = prepare_portfolio(n_inventory, n_sold, seed)
+    workdir = tempfile.mkdtemp(prefix='cs2_bench_')
+    try:
+        inventory_path = os.path.join(workdir, 'inventory.xlsx')
+        mapping_path = os.path.join(workdir, 'item_mapping.xlsx')
+        shutil.copy(os.path.join(source, 'inventory.xlsx'), inventory_path)
+        shutil.copy(os.path.join(source, 'item_mapping.xlsx'), mapping_path)
+
+        # 第一次创建模型时会把往年的已售记录归档，之后的加载只读取今年的分区
+        model = ItemModel(inventory_path)
+        results = {}
+        results['ItemModel.load'] = harness.measure(
+            lambda: ItemModel(inventory_path), repeat=write_repeat)
+        results['get_sold_summary'] = harness.measure(model.get_sold_summary, repeat=repeat)
+        results['get_sold_items.all'] = harness.measure(model.get_sold_items, repeat=repeat)
+
+        inventory = model.get_inventory_items()
+
+        results['get_inventory_items'] = harness.measure(model.get_inventory_items, repeat=repeat)
+        results['get_data_statistics'] = harness.measure(model.get_data_statistics, repeat=repeat)
+
+        # 冷却期检查：每次运行前恢复冷却状态，测量扫描+写入的完整成本
+        original_inventory = model._inventory_cache
+
+        def reset_cooling():
+            model._inventory_cache = original_inventory
+
+        results['check_cooling_items'] = harness.measure(
+            model.check_cooling_items, repeat=write_repeat, setup=reset_cooling)
+        model._inventory_cache = original_inventory
+        model.check_cooling_items()
+
+        counter = iter(range(10 ** 9))
+        results['add_item'] = harness.measure(
+            lambda: model.add_item('基准测试', '步枪', 'AK-47', '久经沙场',
+                                   0.2 + next(counter) * 1e-4, False, 100.0),
+            repeat=write_repeat)
+
+        holding_ids = iter(inventory.loc[inventory['goods_state'] == model.STATUS_HOLDING,
+                                         'inventory_id'].tolist())
+        results['sell_item'] = harness.measure(
+            lambda: model.sell_item(next(holding_ids), 120.0), repeat=write_repeat)
+
+        mapping = ItemMapping(mapping_path)
+        results['portfolio_analytics'] = harness.measure(
+            lambda: compute_portfolio_analytics(model, mapping), repeat=repeat)
+        key = inventory.iloc[0]
+        results['ItemMapping.get_mapping_id'] = harness.measure(
+            lambda: mapping.get_mapping_id(key['goods_name'], key['sub_type'],
+                                           key['goods_wear'], key['is_stattrak']),
+            repeat=write_repeat)
+
+        apply_type_filter = _controller_stub(model, {
+            'name': '', 'goods_type': '步枪', 'sub_type': '全部', 'wear': '久经沙场',
+            'state': '持有中', 'price_min': 50, 'price_max': float('inf'),
+        })
+        if apply_type_filter is not None:
+            results['query.filtered_page'] = harness.measure(apply_type_filter, repeat=repeat)
+        else:
+            print("未安装PyQt5，跳过 query.filtered_page")
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ItemModel/ItemMapping/筛选 基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='库存记录条数（可到1000000）')
+    parser.add_argument('--sold-ratio', type=float, default=1.0, help='已售记录数 = 库存条数 × 该比例')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='只读用例的重复次数')
+    parser.add_argument('--write-repeat', type=int, default=3, help='写文件用例的重复次数')
+    parser.add_argument('--output', help='保存结果的JSON文件')
+    parser.add_argument('--compare', help='作为基线的JSON结果文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定退化的相对阈值')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        n_sold = int(size * args.sold_ratio)
+        results[str(size)] = run_size(size, n_sold, args.seed, args.repeat, args.write_repeat)
+
+    report = harness.build_report('model', results)
+    harness.print_results(results)
+    if args.output:
+        harness.save_report(report, args.output)
+        print(f"\n结果已保存到 {args.output}")
+    if args.compare:
+        rows, regressed = harness.compare_reports(report, harness.load_report(args.compare),
+                                                  args.threshold)
+        harness.print_comparison(rows)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""确定性的模拟数据生成器
+
+按照GOODS_TYPES的分类生成库存、已售商品和商品映射数据，
+相同的参数和随机种子总是生成完全相同的数据，便于对比不同版本的性能。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from config.goods_types import GOODS_TYPES
+
+# 磨损等级及其磨损值区间
+WEAR_RANGES = [
+    ('崭新出厂', 0.00, 0.07),
+    ('略有磨损', 0.07, 0.15),
+    ('久经沙场', 0.15, 0.38),
+    ('破损不堪', 0.38, 0.45),
+    ('战痕累累', 0.45, 1.00),
+]
+WEAR_WEIGHTS = [0.2, 0.3, 0.35, 0.08, 0.07]
+
+# 各大类的对数价格均值（手套、匕首远贵于枪械）
+TYPE_PRICE_LOG_MEAN = {'步枪': 5.0, '手枪': 4.0, '手套': 8.0, '匕首': 8.3}
+
+SKIN_NAMES = ['黑色魅影', '黑莲花', '王蛇', '夜愿', '伽马多普勒', '红线', '二西莫夫', '火神',
+              '血腥运动', '深红之网', '渐变之色', '表面淬火', '森林之夜', '都市伪装', '暴怒野兽',
+              '霓虹骑士', '皇后', '水栽竹', '荒野反叛', '抽象派']
+
+TIME_END = pd.Timestamp('2025-01-01 00:00:00')
+TIME_SPAN_DAYS = 3 * 365
+
+
+def _taxonomy():
+    """展开 (大类, 子类型) 列表"""
+    return [(main_type, sub_type)
+            for main_type, sub_types in GOODS_TYPES.items() if main_type != '全部'
+            for sub_type in sub_types[1:]]
+
+
+def _base_rows(rng, n):
+    """生成库存表和已售表共用的列"""
+    taxonomy = _taxonomy()
+    pick = rng.integers(0, len(taxonomy), n)
+    goods_type = np.array([taxonomy[i][0] for i in range(len(taxonomy))], dtype=object)[pick]
+    sub_type = np.array([taxonomy[i][1] for i in range(len(taxonomy))], dtype=object)[pick]
+    goods_name = np.array(SKIN_NAMES, dtype=object)[rng.integers(0, len(SKIN_NAMES), n)]
+
+    wear_pick = rng.choice(len(WEAR_RANGES), size=n, p=WEAR_WEIGHTS)
+    low = np.array([w[1] for w in WEAR_RANGES])[wear_pick]
+    high = np.array([w[2] for w in WEAR_RANGES])[wear_pick]
+    wear_value = np.round(low + rng.random(n) * (high - low), 4)
+    goods_wear = np.array([w[0] for w in WEAR_RANGES], dtype=object)[wear_pick]
+
+    log_mean = np.array([TYPE_PRICE_LOG_MEAN[t] for t in goods_type])
+    buy_price = np.round(np.exp(rng.normal(log_mean, 0.6)), 2)
+    is_stattrak = (rng.random(n) < 0.15) & np.isin(goods_type, ['步枪', '手枪', '匕首'])
+
+    # 秒级随机购买时间，保证inventory_id基本不重复
+    seconds = rng.integers(0, TIME_SPAN_DAYS * 86400, n)
+    buy_time = TIME_END - pd.to_timedelta(seconds, unit='s')
+
+    inventory_id = [f"{t.strftime('%Y%m%d%H%M%S')}_{w:.4f}" for t, w in zip(buy_time, wear_value)]
+    return pd.DataFrame({
+        'inventory_id': inventory_id,
+        'goods_name': goods_name,
+        'goods_type': goods_type,
+        'sub_type': sub_type,
+        'goods_wear': goods_wear,
+        'goods_wear_value': wear_value,
+        'is_stattrak': is_stattrak,
+        'buy_price': buy_price,
+        'buy_time': buy_time,
+    })
+
+
+def generate_inventory(n, seed=0, now=TIME_END):
+    """生成n条库存记录，最近8天内购买的商品处于冷却期"""
+    rng = np.random.default_rng(seed)
+    df = _base_rows(rng, n)
+    cooling = df['buy_time'] > now - pd.Timedelta(days=8)
+    df['goods_state'] = np.where(cooling, 0, 1)
+    return df
+
+
+def generate_sold_items(n, seed=1):
+    """生成n条已售商品记录"""
+    rng = np.random.default_rng(seed)
+    df = _base_rows(rng, n)
+    hold_days = rng.integers(7, 120, n)
+    sell_time = df['buy_time'] + pd.to_timedelta(hold_days, unit='D') + \
+        pd.to_timedelta(rng.integers(0, 86400, n), unit='s')
+    sell_price = np.round(df['buy_price'].to_numpy() * (1 + rng.normal(0.03, 0.1, n)), 2)
+    extra_income = np.where(rng.random(n) < 0.05, np.round(rng.random(n) * 20, 2), 0.0)
+    df['sell_price'] = sell_price
+    df['sell_time'] = sell_time
+    df['extra_income'] = extra_income
+    df['hold_days'] = hold_days
+    df['total_profit'] = np.round(sell_price + extra_income - df['buy_price'].to_numpy(), 2)
+    return df
+
+
+def generate_data_gather(inventory_df, sold_df, total_investment=None):
+    """根据生成的表计算与之一致的数据统计表"""
+    total_profit = float(sold_df['total_profit'].sum())
+    in_stock = float(inventory_df['buy_price'].sum())
+    if total_investment is None:
+        total_investment = in_stock
+    return pd.DataFrame({
+        'name': ['total_investment', 'total_profit', 'remaining_amount', 'total_fee'],
+        'value': [total_investment, total_profit, total_investment + total_profit - in_stock, 0.0],
+    })
+
+
+def generate_cash_flows(inventory_df, sold_df, total_investment, tranches=12):
+    """把总投资拆成若干笔，按购买时间的分位点投入，生成资金流水表"""
+    buy_times = pd.concat([inventory_df['buy_time'], sold_df['buy_time']], ignore_index=True)
+    if buy_times.empty or total_investment <= 0:
+        return pd.DataFrame(columns=['time', 'kind', 'amount'])
+    times = buy_times.quantile(np.linspace(0, 1, tranches, endpoint=False)).to_numpy()
+    amounts = np.full(tranches, round(total_investment / tranches, 2))
+    amounts[-1] = round(total_investment - amounts[:-1].sum(), 2)
+    return pd.DataFrame({'time': times, 'kind': 'investment', 'amount': amounts})
+
+
+def generate_mapping(inventory_df, seed=2):
+    """从库存中提取商品类别生成映射表"""
+    rng = np.random.default_rng(seed)
+    keys = inventory_df[['goods_name', 'sub_type', 'goods_wear', 'is_stattrak']].drop_duplicates()
+    keys = keys.reset_index(drop=True)
+    return pd.DataFrame({
+        'mapping_id': np.arange(1, len(keys) + 1),
+        'item_name': keys['goods_name'],
+        'goods_type': keys['sub_type'],
+        'item_wear': keys['goods_wear'],
+        'is_stattrak': keys['is_stattrak'],
+        'last_used': TIME_END,
+        'current_price': np.round(np.exp(rng.normal(5.0, 1.0, len(keys))), 2),
+    })
+
+
+def write_portfolio(directory, n_inventory, n_sold, seed=0):
+    """生成库存文件和映射文件，返回 (库存文件路径, 映射文件路径)"""
+    os.makedirs(directory, exist_ok=True)
+    inventory_df = generate_inventory(n_inventory, seed=seed)
+    sold_df = generate_sold_items(n_sold, seed=seed + 1)
+    data_gather_df = generate_data_gather(inventory_df, sold_df)
+    total_investment = float(data_gather_df.loc[data_gather_df['name'] == 'total_investment', 'value'].iloc[0])
+    cash_flows_df = generate_cash_flows(inventory_df, sold_df, total_investment)
+
+    inventory_path = os.path.join(directory, 'inventory.xlsx')
+    with pd.ExcelWriter(inventory_path, engine='openpyxl') as writer:
+        inventory_df.to_excel(writer, sheet_name='inventory', index=False)
+        sold_df.to_excel(writer, sheet_name='sold_items', index=False)
+        data_gather_df.to_excel(writer, sheet_name='data_gather', index=False)
+        cash_flows_df.to_excel(writer, sheet_name='cash_flows', index=False)
+
+    mapping_path = os.path.join(directory, 'item_mapping.xlsx')
+    generate_mapping(inventory_df, seed=seed + 2).to_excel(mapping_path, index=False)
+    return inventory_path, mapping_path
@@ -0,0 +1,117 @@
+"""基准测试的计时、内存统计、结果保存与对比"""
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+
+def measure(func, repeat=5, setup=None, track_memory=True):
+    """多次运行func并统计耗时（秒），另外单独运行一次统计峰值内存。
+    setup在每次运行前调用，不计入耗时。
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    result = {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+        'repeat': repeat,
+    }
+
+    if track_memory:
+        # tracemalloc会明显拖慢Python代码，因此与计时分开运行
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['peak_mb'] = peak / (1024 * 1024)
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(suite, results):
+    """生成带环境信息的结果字典，results结构为 {规模: {用例: 统计}}"""
+    import pandas as pd
+    return {
+        'suite': suite,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_reports(current, baseline, threshold=0.2, metric='median'):
+    """对比两次结果，返回 (对比行列表, 是否存在性能退化)。
+    耗时超过基线 (1 + threshold) 倍视为退化。
+    """
+    rows = []
+    regressed = False
+    for size, cases in current['results'].items():
+        base_cases = baseline['results'].get(size, {})
+        for case, stats in cases.items():
+            base = base_cases.get(case)
+            if not base or not base.get(metric):
+                rows.append((size, case, stats[metric], None, None, ''))
+                continue
+            ratio = stats[metric] / base[metric]
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '退化'
+                regressed = True
+            elif ratio < 1 / (1 + threshold):
+                flag = '提升'
+            rows.append((size, case, stats[metric], base[metric], ratio, flag))
+    return rows, regressed
+
+
+def print_results(results):
+    for size, cases in results.items():
+        print(f"\n== 规模 {size} ==")
+        for case, stats in cases.items():
+            memory = f"  峰值 {stats['peak_mb']:.1f}MB" if 'peak_mb' in stats else ''
+            print(f"  {case:<28} 中位数 {stats['median'] * 1000:10.2f}ms  "
+                  f"最小 {stats['min'] * 1000:10.2f}ms{memory}")
+
+
+def print_comparison(rows):
+    print(f"\n{'规模':<10}{'用例':<30}{'当前(ms)':>12}{'基线(ms)':>12}{'比值':>8}")
+    for size, case, value, base, ratio, flag in rows:
+        base_text = f"{base * 1000:12.2f}" if base is not None else f"{'-':>12}"
+        ratio_text = f"{ratio:8.2f}" if ratio is not None else f"{'-':>8}"
+        print(f"{size:<10}{case:<30}{value * 1000:12.2f}{base_text}{ratio_text}  {flag}")
@@ -0,0 +1,457 @@
+"""命令行批处理工具（不依赖PyQt5）
+
+用法示例：
+    python -m cli import-purchases purchases.csv
+    python -m cli apply-prices prices.csv
+    python -m cli stats --recompute
+    python -m cli analytics --holdings holdings.csv
+    python -m cli export-report report.xlsx
+    python -m cli export sold_items sold.csv --start 2023-01-01 --end 2023-12-31
+    python -m cli cooling-sweep
+    python -m cli import-price-history history.csv
+    python -m cli backtest --take-profit 1.1:1.5:0.1 --trailing 0.1,0.2 --workers 4
+    python -m cli alerts add --scope portfolio --kind gain_pct --threshold 0.2
+    python -m cli import-floats floats.csv
+    python -m cli float-rank 黑色魅影 略有磨损 0.1381 --epsilon 0.001
+    python -m cli nav --rebuild --output nav.csv
+    python -m cli reconcile trades.csv --window-hours 24 --output reconcile.xlsx --apply
+    python -m cli statements --period month --year 2025 --output-dir reports
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from models.backtest import prepare_backtest, run_sweep, strategy_grid
+from models.item_mapping import ItemMapping
+from models.exporter import export_sources, export_table
+from models.item_model import ItemModel
+from models.nav_series import nav_frame
+from models.portfolio_analytics import compute_portfolio_analytics
+from models.price_alerts import PriceAlertEngine, PriceAlertRules, format_alert
+from models.reconcile import apply_missing, read_trade_log, reconcile
+from models.skin_catalog import get_catalog
+from models.statements import build_statements, write_statements_html
+
+# 导入购买记录时需要的列（与ItemModel.add_item参数一致）
+PURCHASE_COLUMNS = ['goods_name', 'goods_type', 'sub_type', 'goods_wear',
+                    'goods_wear_value', 'buy_price']
+
+
+def _read_table(path):
+    """读取CSV或Excel文件"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xls'):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def cmd_import_purchases(args):
+    """批量导入购买记录"""
+    df = _read_table(args.file)
+    missing = [col for col in PURCHASE_COLUMNS if col not in df.columns]
+    if missing:
+        print(f"文件缺少列: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    items = []
+    for row in df.to_dict('records'):
+        buy_time = row.get('buy_time')
+        items.append({
+            'goods_name': row['goods_name'],
+            'goods_type': row['goods_type'],
+            'sub_type': row['sub_type'],
+            'goods_wear': row['goods_wear'],
+            'goods_wear_value': float(row['goods_wear_value']),
+            'is_stattrak': bool(row.get('is_stattrak', False)),
+            'buy_price': float(row['buy_price']),
+            'buy_time': None if pd.isna(buy_time) else pd.to_datetime(buy_time).to_pydatetime(),
+        })
+
+    model = ItemModel(args.data)
+    added = model.add_items(items)
+    print(f"已导入 {added}/{len(items)} 条购买记录")
+    return 0
+
+
+def cmd_apply_prices(args):
+    """从价格文件批量更新当前价格（列: mapping_id, current_price 或 price）"""
+    df = _read_table(args.file)
+    price_column = 'current_price' if 'current_price' in df.columns else 'price'
+    if 'mapping_id' not in df.columns or price_column not in df.columns:
+        print("价格文件需要包含 mapping_id 和 current_price(或price) 列", file=sys.stderr)
+        return 1
+
+    df = df.dropna(subset=['mapping_id', price_column])
+    prices = dict(zip(df['mapping_id'].astype(int), df[price_column].astype(float)))
+    mapping = ItemMapping(args.mapping)
+    engine = PriceAlertEngine(ItemModel(args.data), mapping).attach()
+    engine.queue.seek_end()
+    updated = mapping.update_prices(prices)
+    print(f"已更新 {updated}/{len(prices)} 个商品类别的价格")
+    for alert in engine.queue.read_new():
+        print(f"价格提醒: {format_alert(alert)}")
+    return 0
+
+
+def cmd_stats(args):
+    """输出数据统计，可选择根据表格重新计算"""
+    model = ItemModel(args.data)
+    if args.recompute:
+        deltas = model.recompute_data_gather()
+        if deltas:
+            for name, delta in deltas.items():
+                print(f"修正 {name}: {delta:+.2f}")
+        else:
+            print("数据统计与表格一致，无需修正")
+
+    stats = model.get_data_statistics()
+    for name, value in stats.items():
+        print(f"{name}: {float(value):.2f}")
+    print(f"inventory_count: {len(model.get_inventory_items())}")
+    print(f"sold_count: {model.get_sold_summary()['count']}")
+    return 0
+
+
+def cmd_analytics(args):
+    """输出收益分析，可导出每件持有商品和每笔交易的明细"""
+    model = ItemModel(args.data)
+    mapping = ItemMapping(args.mapping) if os.path.exists(args.mapping) else None
+    analytics = compute_portfolio_analytics(model, mapping)
+    for name in ('realized_pnl', 'unrealized_pnl', 'total_pnl', 'current_market_value'):
+        print(f"{name}: {analytics[name]:.2f}")
+    for name in ('avg_annualized_return', 'twr', 'twr_annualized'):
+        print(f"{name}: {analytics[name] * 100:.2f}%")
+    print(f"priced: {analytics['priced_count']}/{analytics['holding_count']}")
+    if args.holdings:
+        analytics['holdings'].to_csv(args.holdings, index=False, encoding='utf-8-sig')
+        print(f"持有明细已导出到 {args.holdings}")
+    if args.trades:
+        analytics['trades'].to_csv(args.trades, index=False, encoding='utf-8-sig')
+        print(f"交易明细已导出到 {args.trades}")
+    return 0
+
+
+def cmd_export_report(args):
+    """导出库存、已售商品和统计数据报表"""
+    model = ItemModel(args.data)
+    stats = model.get_data_statistics()
+    stats_df = pd.DataFrame({
+        'name': list(stats.keys()),
+        'value': [float(value) for value in stats.values()],
+    })
+    tables = {
+        'inventory': model.get_inventory_items(),
+        'sold_items': model.get_sold_items(),
+        'statistics': stats_df,
+    }
+
+    if args.output.lower().endswith('.xlsx'):
+        with pd.ExcelWriter(args.output, engine='openpyxl') as writer:
+            for name, df in tables.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+    else:
+        # 其他路径视为目录，每张表导出为一个CSV文件
+        os.makedirs(args.output, exist_ok=True)
+        for name, df in tables.items():
+            df.to_csv(os.path.join(args.output, f"{name}.csv"), index=False, encoding='utf-8-sig')
+    print(f"报表已导出到 {args.output}")
+    return 0
+
+
+def cmd_export(args):
+    """分块流式导出一张表（CSV/JSONL/Parquet，按扩展名判断格式）"""
+    model = ItemModel(args.data)
+
+    def progress(written, total):
+        print(f"\r已导出 {written}/{total} 行", end='', flush=True)
+
+    sources = export_sources(model, args.table, args.start, args.end)
+    written = export_table(sources, args.table, args.output, chunk_size=args.chunk_size,
+                           start=args.start, end=args.end, goods_type=args.goods_type,
+                           progress=progress)
+    print(f"\n共导出 {written} 行到 {args.output}")
+    return 0
+
+
+def cmd_cooling_sweep(args):
+    """检查冷却期，将到期商品转为持有中"""
+    model = ItemModel(args.data)
+    count = model.check_cooling_items()
+    print(f"{count} 件商品冷却期结束，已转为持有中")
+    return 0
+
+
+def cmd_import_price_history(args):
+    """导入历史价格记录（列: time, mapping_id, price 或 current_price）"""
+    df = _read_table(args.file)
+    if 'price' not in df.columns and 'current_price' in df.columns:
+        df = df.rename(columns={'current_price': 'price'})
+    missing = [col for col in ('time', 'mapping_id', 'price') if col not in df.columns]
+    if missing:
+        print(f"历史价格文件缺少列: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    df['time'] = pd.to_datetime(df['time']).dt.floor('s').map(lambda t: t.isoformat())
+    count = ItemMapping(args.mapping).price_history.append_frame(df)
+    print(f"已导入 {count} 条历史价格记录")
+    return 0
+
+
+def cmd_import_floats(args):
+    """导入磨损值数据（列: goods_name, goods_wear, goods_wear_value），用于磨损值排名"""
+    df = _read_table(args.file)
+    missing = [col for col in ('goods_name', 'goods_wear', 'goods_wear_value') if col not in df.columns]
+    if missing:
+        print(f"磨损值文件缺少列: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    count = ItemModel(args.data).float_dataset.append_frame(df)
+    print(f"已导入 {count} 条磨损值记录")
+    return 0
+
+
+def cmd_float_rank(args):
+    """查询磨损值在同类饰品中的排名，以及相近的磨损值"""
+    index = ItemModel(args.data).get_float_index()
+    rank, count, percentile = index.rank(args.goods_name, args.goods_wear, args.value)
+    if count == 0:
+        print(f"没有 {args.goods_name}（{args.goods_wear}）的磨损值记录")
+        return 0
+    print(f"{args.goods_name}（{args.goods_wear}）磨损值 {args.value}: 第 {rank}/{count} 名，"
+          f"低于它的占 {percentile * 100:.1f}%")
+    if args.epsilon:
+        nearby = index.within(args.goods_name, args.goods_wear, args.value, args.epsilon)
+        print(f"±{args.epsilon} 范围内共 {len(nearby)} 条: " + ', '.join(f"{value:.6f}" for value in nearby[:50]))
+    return 0
+
+
+def cmd_nav(args):
+    """更新并输出每日净值序列"""
+    mapping = ItemMapping(args.mapping) if os.path.exists(args.mapping) else None
+    frame = nav_frame(ItemModel(args.data).get_nav_series(mapping, rebuild=args.rebuild))
+    if frame.empty:
+        print("没有净值记录")
+        return 0
+    if args.output:
+        frame.to_csv(args.output)
+        print(f"已导出 {len(frame)} 天的净值到 {args.output}")
+    else:
+        print(frame.tail(args.tail).to_string())
+    return 0
+
+
+def cmd_reconcile(args):
+    """把交易市场导出的买入/卖出记录与账本对账，可选择补录缺少的记录"""
+    try:
+        log = read_trade_log(args.file)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    model = ItemModel(args.data)
+    result = reconcile(model, log, window=pd.Timedelta(hours=args.window_hours))
+    summary = result.summary()
+    print(f"共 {len(log)} 条记录: 已匹配 {summary['matched']}，缺少买入 {summary['missing_buy']}，"
+          f"缺少卖出 {summary['missing_sell']}，重复 {summary['duplicated']}，不一致 {summary['mismatched']}")
+    if args.output:
+        with pd.ExcelWriter(args.output) as writer:
+            for name in ('missing', 'duplicated', 'mismatched', 'matched'):
+                getattr(result, name).to_excel(writer, sheet_name=name, index=False)
+        print(f"对账结果已导出到 {args.output}")
+    if args.apply:
+        try:
+            applied = apply_missing(model, result, get_catalog())
+        except ValueError as e:
+            print(f"补录记录失败: {str(e)}", file=sys.stderr)
+            return 1
+        print(f"已补录 {applied['added']} 条买入、{applied['sold']} 条卖出，"
+              f"{applied['skipped']} 条卖出在库存中找不到对应商品")
+    return 0
+
+
+def cmd_statements(args):
+    """生成月度/年度对账单（HTML，PDF在界面中生成）"""
+    model = ItemModel(args.data)
+    years = args.year or None
+    statements = build_statements(model.get_sold_items(years=years), model.get_cash_flows(),
+                                  model.nav_store.load(), args.period, years)
+    if not statements:
+        print("没有已售记录")
+        return 0
+    paths = write_statements_html(statements, args.output_dir)
+    print(f"已生成 {len(paths)} 份对账单到 {args.output_dir}")
+    return 0
+
+
+def _parse_values(text):
+    """解析参数取值：逗号分隔的列表（1.1,1.2）或 起始:结束:步长（1.1:1.5:0.1，包含结束值）"""
+    if not text:
+        return [None]
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 10) for i in range(max(count, 0))]
+    return [float(part) for part in text.split(',') if part.strip()]
+
+
+def cmd_backtest(args):
+    """用历史价格回测一组卖出策略，输出每个策略的收益和换手率"""
+    model = ItemModel(args.data)
+    mapping = ItemMapping(args.mapping)
+    try:
+        data = prepare_backtest(model, mapping, include_sold=not args.no_sold, freq=args.freq,
+                                start=args.start, end=args.end)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    strategies = strategy_grid(take_profit=_parse_values(args.take_profit),
+                               trailing=_parse_values(args.trailing),
+                               stop_loss=_parse_values(args.stop_loss),
+                               max_hold_days=_parse_values(args.max_hold_days))
+    if not strategies:
+        print("请至少指定一种卖出规则（--take-profit/--trailing/--stop-loss/--max-hold-days）",
+              file=sys.stderr)
+        return 1
+
+    print(f"回测 {len(data)} 件商品 × {len(data.grid)} 个时间点 × {len(strategies)} 个策略")
+    results = run_sweep(data, strategies, workers=args.workers, fee_rate=args.fee_rate)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(results.head(args.top).to_string(index=False))
+    if args.output:
+        results.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"回测结果已导出到 {args.output}")
+    return 0
+
+
+def cmd_alerts(args):
+    """管理价格提醒规则"""
+    rules = PriceAlertRules(os.path.join(os.path.dirname(args.mapping), 'price_alerts.json'))
+    if args.action == 'add':
+        try:
+            alert_id = rules.add_rule(args.scope, args.kind, args.threshold,
+                                      target=args.target, note=args.note or '')
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        print(f"已添加价格提醒 {alert_id}")
+    elif args.action == 'remove':
+        if not rules.remove_rule(args.alert_id):
+            print(f"价格提醒 {args.alert_id} 不存在", file=sys.stderr)
+            return 1
+        print(f"已删除价格提醒 {args.alert_id}")
+    else:
+        df = rules.list_rules()
+        print(df.to_string(index=False) if not df.empty else "没有价格提醒")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description='CS2饰品交易系统命令行工具')
+    parser.add_argument('--data', default='data/inventory.xlsx', help='库存数据文件')
+    parser.add_argument('--mapping', default='data/item_mapping.xlsx', help='商品映射文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('import-purchases', help='批量导入购买记录（CSV/Excel）')
+    p.add_argument('file')
+    p.set_defaults(func=cmd_import_purchases)
+
+    p = subparsers.add_parser('apply-prices', help='从价格文件更新当前价格')
+    p.add_argument('file')
+    p.set_defaults(func=cmd_apply_prices)
+
+    p = subparsers.add_parser('stats', help='输出数据统计')
+    p.add_argument('--recompute', action='store_true', help='根据表格重新计算总收益和剩余金额')
+    p.set_defaults(func=cmd_stats)
+
+    p = subparsers.add_parser('analytics', help='收益分析（已实现/未实现收益、年化收益率、时间加权收益率）')
+    p.add_argument('--holdings', help='导出每件持有商品的收益明细（CSV）')
+    p.add_argument('--trades', help='导出每笔交易的收益明细（CSV）')
+    p.set_defaults(func=cmd_analytics)
+
+    p = subparsers.add_parser('export-report', help='导出报表（.xlsx文件或CSV目录）')
+    p.add_argument('output')
+    p.set_defaults(func=cmd_export_report)
+
+    p = subparsers.add_parser('export', help='分块导出库存或已售商品（.csv/.jsonl/.parquet）')
+    p.add_argument('table', choices=['inventory', 'sold_items'])
+    p.add_argument('output')
+    p.add_argument('--start', help='开始日期（inventory按购买时间，sold_items按售出时间）')
+    p.add_argument('--end', help='结束日期（只有日期时包括当天全天）')
+    p.add_argument('--goods-type', help='只导出该商品类型')
+    p.add_argument('--chunk-size', type=int, default=5000)
+    p.set_defaults(func=cmd_export)
+
+    p = subparsers.add_parser('cooling-sweep', help='更新冷却期状态')
+    p.set_defaults(func=cmd_cooling_sweep)
+
+    p = subparsers.add_parser('import-price-history', help='导入历史价格记录（CSV/Excel）')
+    p.add_argument('file')
+    p.set_defaults(func=cmd_import_price_history)
+
+    p = subparsers.add_parser('backtest', help='用历史价格回测卖出策略（参数取值: 1.1,1.2 或 1.1:1.5:0.1）')
+    p.add_argument('--take-profit', help='价格达到买入价的倍数时卖出')
+    p.add_argument('--trailing', help='从最高点回撤的比例达到该值时卖出')
+    p.add_argument('--stop-loss', help='亏损比例达到该值时卖出')
+    p.add_argument('--max-hold-days', help='持有天数达到该值时卖出')
+    p.add_argument('--fee-rate', type=float, default=0.0, help='卖出手续费率')
+    p.add_argument('--freq', default='D', help='价格对齐周期（D=天, h=小时）')
+    p.add_argument('--start', help='回测开始日期')
+    p.add_argument('--end', help='回测结束日期')
+    p.add_argument('--no-sold', action='store_true', help='不重放已售出的交易，只回测当前库存')
+    p.add_argument('--workers', type=int, help='并行进程数，默认为CPU核数')
+    p.add_argument('--top', type=int, default=20, help='输出收益最高的前N个策略')
+    p.add_argument('--output', help='导出全部回测结果（CSV）')
+    p.set_defaults(func=cmd_backtest)
+
+    p = subparsers.add_parser('import-floats', help='导入磨损值数据（goods_name, goods_wear, goods_wear_value）')
+    p.add_argument('file')
+    p.set_defaults(func=cmd_import_floats)
+
+    p = subparsers.add_parser('float-rank', help='查询磨损值在同类饰品中的排名')
+    p.add_argument('goods_name')
+    p.add_argument('goods_wear')
+    p.add_argument('value', type=float)
+    p.add_argument('--epsilon', type=float, help='同时列出相差不超过该值的磨损值')
+    p.set_defaults(func=cmd_float_rank)
+
+    p = subparsers.add_parser('nav', help='更新并输出每日净值（现金 + 持仓市值）')
+    p.add_argument('--rebuild', action='store_true', help='按当前数据重新回填全部历史')
+    p.add_argument('--output', help='导出到CSV文件')
+    p.add_argument('--tail', type=int, default=30, help='不导出时显示最近的天数')
+    p.set_defaults(func=cmd_nav)
+
+    p = subparsers.add_parser('reconcile', help='与交易市场导出的买入/卖出记录对账（CSV/Excel/JSONL）')
+    p.add_argument('file')
+    p.add_argument('--window-hours', type=float, default=24, help='时间相差不超过该小时数视为同一笔交易')
+    p.add_argument('--output', help='导出对账结果（.xlsx，每类记录一张表）')
+    p.add_argument('--apply', action='store_true', help='补录缺少的买入和卖出记录')
+    p.set_defaults(func=cmd_reconcile)
+
+    p = subparsers.add_parser('statements', help='生成月度/年度对账单（HTML）')
+    p.add_argument('--period', choices=['month', 'year'], default='month')
+    p.add_argument('--year', type=int, action='append', help='只生成该年份的对账单（可以重复指定）')
+    p.add_argument('--output-dir', default='reports', help='输出目录')
+    p.set_defaults(func=cmd_statements)
+
+    p = subparsers.add_parser('alerts', help='管理价格提醒规则（apply-prices更新价格时检查）')
+    actions = p.add_subparsers(dest='action', required=True)
+    a = actions.add_parser('add', help='添加规则')
+    a.add_argument('--scope', required=True, choices=['inventory', 'mapping', 'portfolio'])
+    a.add_argument('--kind', required=True, choices=['above', 'below', 'gain_pct', 'loss_pct'])
+    a.add_argument('--threshold', type=float, required=True, help='价格，或涨跌幅（0.2表示20%%）')
+    a.add_argument('--target', help='inventory_id 或 mapping_id（portfolio规则不需要）')
+    a.add_argument('--note', help='备注')
+    a = actions.add_parser('remove', help='删除规则')
+    a.add_argument('alert_id', type=int)
+    actions.add_parser('list', help='列出全部规则')
+    p.set_defaults(func=cmd_alerts)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 数据文件可以只给出文件名（相对于当前目录）
+    args.data = os.path.abspath(args.data)
+    args.mapping = os.path.abspath(args.mapping)
+    sys.exit(args.func(args))
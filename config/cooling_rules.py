@@ -0,0 +1,17 @@
+"""冷却期（交易暂挂）规则配置
+
+规则：在截止时间（含）之前购买，冷却期在第 hold_days 天的截止时间结束；
+在截止时间之后购买，再多等一天。
+"""
+
+COOLING_RULES = {
+    'cutoff_hour': 16,      # 每天的截止时间（时）
+    'cutoff_minute': 0,     # 每天的截止时间（分）
+    'hold_days': 7,         # 截止时间前购买时的冷却天数
+    # 截止时间所在的时区（如 'Asia/Shanghai'），None表示直接按购买时间的本地时钟计算
+    'timezone': None,
+    # 购买时间记录所用的时区，None表示本机时区（只在设置了timezone时使用）
+    'local_timezone': None,
+    # 按商品类型覆盖上面的规则，例如 {'匕首': {'hold_days': 8}}
+    'overrides': {},
+}
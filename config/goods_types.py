@@ -1,8 +1,6 @@
 # 商品类型和子类型的映射关系
-GOODS_TYPES = {
-    '全部': ['全部'],
-    '步枪': ['全部', 'AK-47', 'M4A4', 'M4A1消音型', 'AWP', '加利尔AR', 'AUG'],
-    '手套': ['全部', '运动手套', '摩托手套', '专业手套', '驾驶手套', '裹手'],
-    '匕首': ['全部', '折叠刀', '爪子刀', '蝴蝶刀', 'M9刺刀', '刺刀', '锯齿爪刀', '海豹短刀'],
-    '手枪': ['全部', '沙漠之鹰', 'USP消音版', '格洛克18型', 'FN57']
-}
+# 分类保存在 data/goods_types.csv 中，新增武器只需编辑该文件（见 models/goods_taxonomy.py）；
+# 这里保留 {大类: ['全部', 子类型...]} 形式的字典，供只需要名称的代码使用
+from models.goods_taxonomy import get_taxonomy
+
+GOODS_TYPES = get_taxonomy().as_dict()
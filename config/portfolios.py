@@ -0,0 +1,4 @@
+# 账户名称 -> 库存数据文件（每个账户一个文件，第一个为启动时显示的账户）
+PORTFOLIOS = {
+    '默认账户': 'data/inventory.xlsx',
+}
@@ -0,0 +1,91 @@
+import heapq
+from datetime import datetime
+import pandas as pd
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+class CoolingScheduler(QObject):
+    """冷却期结束调度器。
+
+    用最小堆保存冷却中商品的冷却期结束时间，只为最近的一次到期设置单次定时器，
+    到期时只把到期的商品转为持有中，不再在每次刷新时扫描所有冷却中的商品。
+    另有一个对齐到整分钟的定时器，用于刷新界面上的倒计时文字。
+    """
+    released = pyqtSignal(list)  # 本次转为持有中的inventory_id
+    tick = pyqtSignal()          # 每分钟触发一次
+
+    # 单次等待的最长时间，超过后重新检查（系统休眠或修改时钟后也能及时恢复）
+    MAX_WAIT_MS = 60 * 60 * 1000
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        # (冷却期结束时间的纳秒时间戳, inventory_id)
+        self._heap = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+        self._tick_timer = QTimer(self)
+        self._tick_timer.setSingleShot(True)
+        self._tick_timer.setTimerType(Qt.PreciseTimer)
+        self._tick_timer.timeout.connect(self._on_tick)
+
+    def start(self):
+        """开始每分钟的倒计时刷新"""
+        self._arm_tick()
+
+    def stop(self):
+        self._timer.stop()
+        self._tick_timer.stop()
+
+    def reschedule(self):
+        """根据当前库存重建堆（库存被修改或从文件重新加载后调用）。
+        已经到期的商品立即转为持有中，返回这些商品的inventory_id。
+        """
+        schedule = self.model.get_cooling_schedule()
+        ends = schedule.to_numpy(dtype='datetime64[ns]').view('int64')
+        self._heap = [(int(end), inventory_id) for end, inventory_id in zip(ends, schedule.index)]
+        heapq.heapify(self._heap)
+        released = self._release_due()
+        self._arm()
+        return released
+
+    def next_transition(self):
+        """下一次冷却期结束的时间，没有冷却中的商品时为None"""
+        return pd.Timestamp(self._heap[0][0]) if self._heap else None
+
+    def _release_due(self):
+        now = pd.Timestamp(datetime.now()).value
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        if not due:
+            return []
+        # 只检查到期的商品，模型中已不在冷却期的（被出售、删除）会被忽略
+        return self.model.release_cooling_items(due)
+
+    def _arm(self):
+        self._timer.stop()
+        if not self._heap:
+            return
+        delay_ms = (self._heap[0][0] - pd.Timestamp(datetime.now()).value) // 1_000_000
+        self._timer.start(int(min(max(delay_ms, 0), self.MAX_WAIT_MS)))
+
+    def _on_timeout(self):
+        try:
+            released = self._release_due()
+        except Exception as e:
+            print(f"更新冷却期状态时出错: {str(e)}")
+            released = []
+        self._arm()
+        if released:
+            self.released.emit(released)
+
+    def _arm_tick(self):
+        now = datetime.now()
+        # 对齐到下一个整分钟
+        self._tick_timer.start(60000 - (now.second * 1000 + now.microsecond // 1000))
+
+    def _on_tick(self):
+        self._arm_tick()
+        self.tick.emit()
@@ -0,0 +1,36 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from models.exporter import ExportCancelled, export_table
+
+class ExportWorker(QThread):
+    """在后台线程中分块导出数据，通过信号报告进度，不阻塞界面线程。
+    要导出的数据（export_sources 的结果）由界面线程准备好后传入，后台线程不访问模型。
+    """
+    progress = pyqtSignal(int, int)   # 已写入行数, 总行数
+    succeeded = pyqtSignal(int, str)  # 写入行数, 文件路径
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, sources, params, chunk_size=5000, parent=None):
+        super().__init__(parent)
+        self.sources = sources
+        self.params = params
+        self.chunk_size = chunk_size
+        self._cancel_requested = False
+
+    def cancel(self):
+        """请求取消，当前数据块写完后停止"""
+        self._cancel_requested = True
+
+    def _on_progress(self, written, total):
+        self.progress.emit(written, total)
+        return not self._cancel_requested
+
+    def run(self):
+        try:
+            written = export_table(self.sources, chunk_size=self.chunk_size,
+                                   progress=self._on_progress, **self.params)
+            self.succeeded.emit(written, self.params['path'])
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
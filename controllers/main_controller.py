@@ -1,11 +1,25 @@
-from PyQt5.QtWidgets import QPushButton, QTableWidgetItem, QMessageBox, QHeaderView, QDialog, QTableWidget
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QPushButton, QTableWidgetItem, QMessageBox, QHeaderView, QDialog, QTableWidget,
+                             QProgressDialog, QFileDialog)
+from PyQt5.QtCore import Qt, QPointF
 from PyQt5.QtGui import QColor, QPainter
 from PyQt5.QtChart import QChart, QPieSeries, QChartView, QLineSeries, QDateTimeAxis, QValueAxis
 from datetime import datetime
 import pandas as pd
+import os
 from views.sell_item_dialog import SellItemDialog
-from config.goods_types import GOODS_TYPES
+from views.export_dialog import ExportDialog
+from views.reconcile_dialog import ReconcileDialog
+from views.report_dialog import ReportDialog
+from controllers.export_worker import ExportWorker
+from controllers.report_worker import ReportWorker
+from controllers.cooling_scheduler import CoolingScheduler
+from models.exporter import export_sources
+from models.portfolio_analytics import compute_portfolio_analytics
+from models.price_alerts import PriceAlertEngine, format_alert
+from models.float_index import format_float_rank
+from models.reconcile import apply_missing, read_trade_log, reconcile
+from models.skin_catalog import get_catalog
+from models.goods_taxonomy import get_taxonomy
 
 class MainController:
     # 定义状态颜色（深色和浅色）
@@ -44,10 +58,35 @@ class MainController:
         """,
     }
 
-    def __init__(self, model, view):
+    # 表格每页显示的行数
+    PAGE_SIZE = 200
+
+    # 库存表格中状态列和操作列的位置
+    STATUS_COLUMN = 9
+    ACTION_COLUMN = 10
+
+    def __init__(self, model, view, mapping=None, portfolios=None):
         self.model = model
         self.view = view
+        # 多账户时的账户管理器（切换账户只换用已加载的模型）
+        self.portfolios = portfolios
+        # 商品映射提供当前参考价，用于计算未实现收益和当前市值
+        self.mapping = mapping
         self.view.controller = self
+        self._export_worker = None
+        self._report_worker = None
+        # 冷却期到期时只转换到期的商品；每分钟只刷新可见行的状态列
+        self.cooling_scheduler = CoolingScheduler(model, parent=view)
+        self.cooling_scheduler.released.connect(self._on_cooling_released)
+        self.cooling_scheduler.tick.connect(self._update_visible_status)
+        # 价格提醒：本进程的价格更新直接评估，其他进程（接口服务、命令行）触发的提醒从队列文件读取
+        self.alerts = PriceAlertEngine(model, mapping).attach() if mapping is not None else None
+        if self.alerts is not None:
+            self.cooling_scheduler.tick.connect(self._poll_alerts)
+        # 库存表格当前显示的数据（与表格行一一对应）
+        self._inventory_rows = pd.DataFrame()
+        # 各表格的当前页码
+        self.pages = {'inventory': 0, 'sold': 0}
         # 初始化筛选条件
         self.current_filters = {
             'name': '',
@@ -58,44 +97,98 @@ class MainController:
             'price_min': 0,
             'price_max': float('inf')
         }
+        if portfolios is not None:
+            self.view.set_portfolios(portfolios.names(), portfolios.active)
         self._update_tables()
         self._update_analysis()
         self._update_statistics()  # 添加统计信息更新
+        self._update_undo_actions()
+        self.cooling_scheduler.start()
+
+    def switch_portfolio(self, name):
+        """切换显示的账户（或全部账户的合并视图）"""
+        if self.portfolios is None or name == self.portfolios.active:
+            return
+        try:
+            self.model = self.portfolios.switch(name)
+        except Exception as e:
+            self.view.show_error(f'切换账户失败: {str(e)}')
+            return
+        self.cooling_scheduler.model = self.model
+        if self.alerts is not None:
+            self.alerts.model = self.model
+        self.pages = {'inventory': 0, 'sold': 0}
+        self._update_tables()
+        self._update_analysis()
+        self._update_statistics()
+        self._update_undo_actions()
+        self.view.show_status(f"当前账户: {name}")
+
+    def _require_single_portfolio(self):
+        """合并视图只能查看和出售，添加、调整资金和导出需要先选择一个账户"""
+        if getattr(self.model, 'read_only', False):
+            self.view.show_error('请先选择一个账户')
+            return False
+        return True
 
     def _update_tables(self):
         """更新所有表格数据"""
-        self.model.check_cooling_items()
+        # 其他进程（如后台价格更新）修改了数据文件时，只重新加载变化的工作表
+        self.model.reload_if_changed()
+        self.cooling_scheduler.reschedule()
         self._update_inventory_table()
         self._update_sold_items_table()
+        self._poll_alerts()
+
+    def _poll_alerts(self, limit=500):
+        """显示提醒队列中新增的价格提醒"""
+        if self.alerts is None:
+            return
+        try:
+            alerts = self.alerts.queue.read_new(limit)
+        except Exception as e:
+            print(f"读取价格提醒时出错: {str(e)}")
+            return
+        if not alerts:
+            return
+        self.view.add_alerts([format_alert(alert) for alert in alerts])
+        self.view.show_status(f"{len(alerts)} 条新的价格提醒: {format_alert(alerts[-1])}", 10000)
+
+    def clear_alerts(self):
+        """清空提醒队列和列表"""
+        if self.alerts is not None:
+            self.alerts.queue.clear()
+        self.view.clear_alerts()
 
     def _update_analysis(self):
         """更新数据分析"""
-        # 获取已售商品数据
-        sold_df = self.model.get_sold_items()
-        if sold_df.empty:
+        self._update_nav_chart()
+        # 获取已售商品汇总（往年归档使用预计算的汇总，不加载明细）
+        summary = self.model.get_sold_summary()
+        if summary['count'] == 0:
             self._update_summary_labels(0, 0, 0, 0)
             self._clear_charts()
             return
 
         # 计算汇总数据
-        total_profit = sold_df['total_profit'].sum()
-        total_items = len(sold_df)
+        total_profit = summary['total_profit']
+        total_items = summary['count']
         avg_profit = total_profit / total_items if total_items > 0 else 0
-        avg_days = sold_df['hold_days'].mean() if total_items > 0 else 0
+        avg_days = summary['hold_days_sum'] / total_items if total_items > 0 else 0
 
         # 更新标签
         self._update_summary_labels(total_profit, total_items, avg_profit, avg_days)
 
         # 更新图表
-        self._update_profit_by_type_chart(sold_df)
-        self._update_profit_trend_chart(sold_df)
+        self._update_profit_by_type_chart(summary['profit_by_type'])
+        self._update_profit_trend_chart(summary['profit_by_day'])
 
     def _update_summary_labels(self, total_profit, total_items, avg_profit, avg_days):
         """更新汇总标签"""
         self.view.label_total_profit.setText(f"¥{total_profit:.2f}")
         self.view.label_total_items.setText(str(total_items))
 
-    def _update_profit_by_type_chart(self, df):
+    def _update_profit_by_type_chart(self, profit_by_type):
         """更新按类型分布的饼图"""
         # 创建新的图表
         chart = QChart()
@@ -105,10 +198,7 @@ class MainController:
         # 创建饼图系列
         series = QPieSeries()
 
-        # 按商品类型分组计算总利润
-        profit_by_type = df.groupby('goods_type')['total_profit'].sum()
-
-        # 添加数据到饼图
+        # 添加数据到饼图（按商品类型汇总的总利润）
         for goods_type, profit in profit_by_type.items():
             slice = series.append(f"{goods_type}\n¥{profit:.2f}", profit)
             slice.setLabelVisible(True)
@@ -125,7 +215,7 @@ class MainController:
         self._clear_layout(layout)
         layout.addWidget(chart_view)
 
-    def _update_profit_trend_chart(self, df):
+    def _update_profit_trend_chart(self, profit_by_day):
         """更新利润趋势折线图"""
         # 创建新的图表
         chart = QChart()
@@ -136,14 +226,11 @@ class MainController:
         series = QLineSeries()
         series.setName("利润")
 
-        # 按售出时间排序
-        df = df.sort_values('sell_time')
-        
-        # 添加数据点
+        # 按售出日期排序，每天一个累计利润点
         cumulative_profit = 0
-        for _, row in df.iterrows():
-            sell_time = pd.to_datetime(row['sell_time'])
-            cumulative_profit += row['total_profit']
+        for day in sorted(profit_by_day):
+            sell_time = pd.to_datetime(day)
+            cumulative_profit += profit_by_day[day]
             # 将日期时间转换为 QDateTime 可接受的时间戳
             timestamp = sell_time.timestamp() * 1000  # 转换为毫秒
             series.append(timestamp, cumulative_profit)
@@ -172,45 +259,75 @@ class MainController:
         self._clear_layout(layout)
         layout.addWidget(chart_view)
 
+    def _update_nav_chart(self):
+        """更新每日净值折线图（历史日期读取已保存的序列，只重新计算今天）"""
+        try:
+            records = self.model.get_nav_series(self.mapping)
+        except Exception as e:
+            print(f"更新净值序列时出错: {str(e)}")
+            return
+        layout = self.view.layout_nav
+        self._clear_layout(layout)
+        if not len(records):
+            return
+
+        chart = QChart()
+        chart.setTitle("每日净值")
+        # 数据点较多（每天一个），不使用动画
+        nav_series = QLineSeries()
+        nav_series.setName("净值")
+        value_series = QLineSeries()
+        value_series.setName("持仓市值")
+        timestamps = (records['day'].astype('datetime64[D]').astype('datetime64[ms]').astype('int64')
+                      .astype(float))
+        nav = records['cash'] + records['market_value']
+        nav_series.replace([QPointF(x, y) for x, y in zip(timestamps.tolist(), nav.tolist())])
+        value_series.replace([QPointF(x, y) for x, y in zip(timestamps.tolist(), records['market_value'].tolist())])
+        chart.addSeries(nav_series)
+        chart.addSeries(value_series)
+
+        axis_x = QDateTimeAxis()
+        axis_x.setFormat("yyyy-MM-dd")
+        axis_x.setTitleText("日期")
+        chart.addAxis(axis_x, Qt.AlignBottom)
+        axis_y = QValueAxis()
+        axis_y.setTitleText("金额 (¥)")
+        chart.addAxis(axis_y, Qt.AlignLeft)
+        for series in (nav_series, value_series):
+            series.attachAxis(axis_x)
+            series.attachAxis(axis_y)
+
+        chart_view = QChartView(chart)
+        chart_view.setRenderHint(QPainter.Antialiasing)
+        layout.addWidget(chart_view)
+
     def _clear_charts(self):
         """清除所有图表"""
         self._clear_layout(self.view.layout_profit_by_type)
         self._clear_layout(self.view.layout_profit_trend)
 
     def _update_inventory_table(self):
-        """更新库存表格"""
-        # 获取并过滤数据
-        df = self.model.get_inventory_items()
-        if df.empty:
-            self.view.inventory_table.setRowCount(0)
-            return
-
-        filtered_df = self._apply_filters(df)
-        if filtered_df.empty:
-            self.view.inventory_table.setRowCount(0)
-            return
-
-        # 清空表格
-        self.view.inventory_table.setRowCount(0)
+        """更新库存表格（只查询并显示当前页）"""
+        table = self.view.inventory_table
+        filtered_df, total = self._query_page('inventory', where=self._inventory_where())
+        self._inventory_rows = filtered_df
+        self._begin_fill(table, len(filtered_df))
 
         # 记录每个状态的行数，用于交替显示深浅色
         status_row_counts = {0: 0, 1: 0, 2: 0}
+        # 当前页一次性批量计算时间信息和磨损值排名
+        time_infos = self.model.get_time_infos(filtered_df)
+        float_ranks = self.model.get_float_ranks(filtered_df)
 
         # 填充数据
-        for _, item in filtered_df.iterrows():
-            row = self.view.inventory_table.rowCount()
-            self.view.inventory_table.insertRow(row)
-            
+        for row, (index, item) in enumerate(filtered_df.iterrows()):
             # 设置基本信息
             name = item['goods_name']
             if item['is_stattrak']:
                 name += " (StatTrak™)"
             
             # 获取状态和时间信息（拼接显示）
-            status_text = self.model.get_item_status_text(item['goods_state'])
-            time_info = self.model.get_time_info(item['inventory_id'])
-            if time_info:
-                status_text = f"{status_text} {time_info}"
+            status_text = self._status_text(item['goods_state'], time_infos[index])
             
             # 确定是否使用深色
             state = item['goods_state']
@@ -225,6 +342,7 @@ class MainController:
                 f" {item['sub_type']} ",
                 f" {item['goods_wear']} ",
                 f" {item['goods_wear_value']:.4f} ",
+                f" {format_float_rank(float_ranks.at[index, 'rank'], float_ranks.at[index, 'count'])} ",
                 f" ¥{item['buy_price']:.2f} ",
                 f" {pd.to_datetime(item['buy_time']).strftime('%Y-%m-%d %H:%M')} ",
                 f" ¥{self.model.get_current_price(item['inventory_id']):.2f} ",
@@ -235,7 +353,7 @@ class MainController:
                 cell_item.setBackground(self.STATUS_COLORS[state][color_key])
                 # 设置文本居中对齐
                 cell_item.setTextAlignment(Qt.AlignCenter)
-                self.view.inventory_table.setItem(row, col, cell_item)
+                table.setItem(row, col, cell_item)
             
             # 添加操作按钮
             if item['goods_state'] == self.model.STATUS_HOLDING:
@@ -243,26 +361,89 @@ class MainController:
                 sell_btn = QPushButton("出售")
                 sell_btn.setStyleSheet(self.BUTTON_STYLES["出售"])
                 sell_btn.clicked.connect(lambda checked, id=item['inventory_id']: self.sell_item(id))
-                self.view.inventory_table.setCellWidget(row, 9, sell_btn)
-
-        # 调整列宽
-        self.view.inventory_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-
-    def _update_sold_items_table(self):
-        """更新已售商品表格"""
-        df = self.model.get_sold_items()
-        if df.empty:
-            self.view.sold_items_table.setRowCount(0)
+                table.setCellWidget(row, self.ACTION_COLUMN, sell_btn)
+
+        self._end_fill(table)
+        self.view.set_page_info('inventory', self.pages['inventory'], total, self.PAGE_SIZE)
+
+    def _query_page(self, table, **kwargs):
+        """查询表格当前页的数据；页码超出范围时（如删除或筛选后）退回最后一页"""
+        model_table = 'inventory' if table == 'inventory' else 'sold_items'
+        page, total = self.model.query(model_table, offset=self.pages[table] * self.PAGE_SIZE,
+                                       limit=self.PAGE_SIZE, **kwargs)
+        last_page = max((total - 1) // self.PAGE_SIZE, 0)
+        if self.pages[table] > last_page:
+            self.pages[table] = last_page
+            page, total = self.model.query(model_table, offset=last_page * self.PAGE_SIZE,
+                                           limit=self.PAGE_SIZE, **kwargs)
+        return page, total
+
+    def _begin_fill(self, table, row_count):
+        """开始填充表格：暂停重绘和按内容调整列宽（逐个单元格调整列宽会使填充变成平方复杂度）"""
+        table.setUpdatesEnabled(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        table.setRowCount(0)
+        table.setRowCount(row_count)
+
+    def _end_fill(self, table):
+        """填充完成后一次性调整列宽并恢复重绘"""
+        table.resizeColumnsToContents()
+        table.setUpdatesEnabled(True)
+
+    def set_page(self, table, page):
+        """切换表格（inventory/sold）的页码并刷新"""
+        self.pages[table] = max(page, 0)
+        if table == 'inventory':
+            self._update_inventory_table()
+        else:
+            self._update_sold_items_table()
+
+    def change_page(self, table, step):
+        """上一页/下一页"""
+        self.set_page(table, self.pages[table] + step)
+
+    def _status_text(self, state, time_info):
+        """状态列显示的文字：状态 + 时间信息"""
+        status_text = self.model.get_item_status_text(state)
+        if time_info:
+            status_text = f"{status_text} {time_info}"
+        return status_text
+
+    def _update_visible_status(self):
+        """只刷新库存表格中当前可见行的状态列（倒计时/持有时长）"""
+        table = self.view.inventory_table
+        if not table.isVisible() or self._inventory_rows.empty:
+            return
+        first = table.rowAt(0)
+        if first < 0:
             return
+        last = table.rowAt(table.viewport().height() - 1)
+        if last < 0:
+            last = table.rowCount() - 1
+        rows = self._inventory_rows.iloc[first:last + 1]
+        time_infos = self.model.get_time_infos(rows)
+        for offset, (index, item) in enumerate(rows.iterrows()):
+            cell_item = table.item(first + offset, self.STATUS_COLUMN)
+            text = f" {self._status_text(item['goods_state'], time_infos[index])} "
+            if cell_item is not None and cell_item.text() != text:
+                cell_item.setText(text)
+
+    def _on_cooling_released(self, inventory_ids):
+        """定时器到期，部分商品冷却期结束"""
+        self._update_inventory_table()
+        self.view.show_status(f"{len(inventory_ids)} 件商品冷却期结束，已转为持有中")
 
-        # 清空表格
-        self.view.sold_items_table.setRowCount(0)
+    def _update_sold_items_table(self):
+        """更新已售商品表格（只查询并显示当前页）"""
+        self.view.set_sold_years(self.model.get_sold_years())
+        # 只加载选中年份的记录，选择"全部"时才加载所有归档分区
+        year = self.view.sold_year_filter.currentText()
+        table = self.view.sold_items_table
+        df, total = self._query_page('sold', years=None if year in ('', '全部') else [int(year)])
+        self._begin_fill(table, len(df))
 
         # 填充数据
-        for _, item in df.iterrows():
-            row = self.view.sold_items_table.rowCount()
-            self.view.sold_items_table.insertRow(row)
-            
+        for row, (_, item) in enumerate(df.iterrows()):
             # 设置基本信息
             name = item['goods_name']
             if item['is_stattrak']:
@@ -285,28 +466,22 @@ class MainController:
                 cell_item = QTableWidgetItem(str(value))
                 # 设置文本居中对齐
                 cell_item.setTextAlignment(Qt.AlignCenter)
-                self.view.sold_items_table.setItem(row, col, cell_item)
+                table.setItem(row, col, cell_item)
 
-        # 调整列宽
-        self.view.sold_items_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self._end_fill(table)
+        self.view.set_page_info('sold', self.pages['sold'], total, self.PAGE_SIZE)
 
-    def _apply_filters(self, df):
-        """应用筛选条件"""
-        filtered_df = df.copy()
+    def _inventory_where(self):
+        """把筛选条件转换为ItemModel.query的条件"""
+        where = {}
 
-        # 应用商品类型筛选
-        if self.current_filters['goods_type'] != '全部':
-            if self.current_filters['sub_type'] != '全部':
-                # 如果选择了具体子类型，直接用子类型筛选
-                filtered_df = filtered_df[filtered_df['sub_type'] == self.current_filters['sub_type']]
-            else:
-                # 如果选择了全部，使用该大类下的所有子类型筛选
-                subtypes = GOODS_TYPES[self.current_filters['goods_type']][1:]  # 排除"全部"选项
-                filtered_df = filtered_df[filtered_df['sub_type'].isin(subtypes)]
+        # 应用商品类型筛选（按查询缓存中的类型编码列比较整数）
+        where.update(get_taxonomy().filter_where(self.current_filters['goods_type'],
+                                                 self.current_filters['sub_type']))
 
         # 应用磨损等级筛选
         if self.current_filters['wear'] != '全部':
-            filtered_df = filtered_df[filtered_df['goods_wear'] == self.current_filters['wear']]
+            where['goods_wear'] = self.current_filters['wear']
 
         # 应用状态筛选
         if self.current_filters['state'] != '全部':
@@ -315,40 +490,75 @@ class MainController:
                 '持有中': self.model.STATUS_HOLDING,
                 '已售出': self.model.STATUS_SOLD
             }
-            filtered_df = filtered_df[filtered_df['goods_state'] == state_map[self.current_filters['state']]]
+            where['goods_state'] = state_map[self.current_filters['state']]
 
         # 应用价格范围筛选
+        price_range = {}
         if self.current_filters['price_min'] > 0:
-            filtered_df = filtered_df[filtered_df['buy_price'] >= self.current_filters['price_min']]
+            price_range['min'] = self.current_filters['price_min']
         if self.current_filters['price_max'] < float('inf'):
-            filtered_df = filtered_df[filtered_df['buy_price'] <= self.current_filters['price_max']]
-
-        return filtered_df
+            price_range['max'] = self.current_filters['price_max']
+        if price_range:
+            where['buy_price'] = price_range
+
+        return where
+
+    def apply_filters(self, goods_type='全部', sub_type='全部', wear='全部', state='全部',
+                      price_min=0, price_max=0):
+        """更新筛选条件并刷新库存表格（price_max为0表示不限制）"""
+        self.current_filters.update({
+            'goods_type': goods_type,
+            'sub_type': sub_type or '全部',
+            'wear': wear,
+            'state': state,
+            'price_min': price_min,
+            'price_max': price_max if price_max > 0 else float('inf'),
+        })
+        self.pages['inventory'] = 0
+        self._update_inventory_table()
 
     def _update_statistics(self):
         """更新统计信息"""
         stats = self.model.get_data_statistics()
+        try:
+            # 已售部分使用预计算的汇总，不加载往年归档；合并视图合并各账户的结果
+            if getattr(self.model, 'read_only', False):
+                analytics = self.model.compute_analytics(self.mapping)
+            else:
+                analytics = compute_portfolio_analytics(self.model, self.mapping, detail=False)
+            stats.update({key: analytics[key] for key in (
+                'realized_pnl', 'unrealized_pnl', 'avg_annualized_return', 'twr', 'twr_annualized')})
+            if self.mapping is not None:
+                stats['current_market_value'] = analytics['current_market_value']
+        except Exception as e:
+            print(f"计算收益分析时出错: {str(e)}")
         self.view.update_statistics_labels(stats)
 
     def update_total_investment(self, amount_change):
         """更新总投资额"""
+        if not self._require_single_portfolio():
+            return
         try:
             self.model.update_total_investment(amount_change)
-            self._update_statistics()
+            self._refresh_after_change({'data_gather'})
             self.view.show_success('总投资更新成功')
         except Exception as e:
             self.view.show_error(f'更新总投资失败: {str(e)}')
 
     def add_fee(self, fee_amount):
         """添加手续费"""
+        if not self._require_single_portfolio():
+            return
         try:
             self.model.add_fee(fee_amount)
-            self._update_statistics()
+            self._refresh_after_change({'data_gather'})
             self.view.show_success('手续费添加成功')
         except Exception as e:
             self.view.show_error(f'添加手续费失败: {str(e)}')
 
     def add_item(self):
+        if not self._require_single_portfolio():
+            return
         data = self.view.show_add_dialog()
         if data:
             try:
@@ -363,8 +573,7 @@ class MainController:
                     buy_time=data['buy_time']
                 )
                 self.view.show_success('商品添加成功')
-                self._update_tables()
-                self._update_statistics()  # 更新统计信息
+                self._refresh_after_change({'inventory', 'data_gather'})
             except Exception as e:
                 self.view.show_error(f'添加商品失败: {str(e)}')
 
@@ -395,12 +604,177 @@ class MainController:
             
             if success:
                 self.view.show_success(message)
-                self._update_tables()
-                self._update_analysis()
-                self._update_statistics()  # 更新统计信息
+                self._refresh_after_change({'inventory', 'sold_items', 'data_gather'})
             else:
                 self.view.show_error(message)
 
+    def export_data(self):
+        """导出库存或已售商品（后台线程分块写入，显示进度）"""
+        if self._export_worker is not None and self._export_worker.isRunning():
+            self.view.show_error('正在导出，请等待当前导出完成')
+            return
+        if not self._require_single_portfolio():
+            return
+        dialog = ExportDialog(self.view, os.path.dirname(os.path.abspath(self.model.file_path)))
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        params = dialog.get_data()
+        # 在界面线程中取得数据快照并加载需要的归档年份，后台线程只写文件
+        try:
+            sources = export_sources(self.model, params['table'], params['start'], params['end'])
+        except Exception as e:
+            self.view.show_error(f'导出失败: {str(e)}')
+            return
+
+        progress = QProgressDialog('正在导出...', '取消', 0, 100, self.view)
+        progress.setWindowTitle('导出数据')
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        worker = ExportWorker(sources, params, parent=self.view)
+
+        def on_progress(written, total):
+            progress.setValue(int(written * 100 / total) if total else 100)
+            progress.setLabelText(f'正在导出... {written}/{total} 行')
+
+        def on_finished():
+            progress.close()
+            self._export_worker = None
+            worker.deleteLater()
+
+        worker.progress.connect(on_progress)
+        worker.succeeded.connect(lambda written, path: self.view.show_success(f'已导出 {written} 行到 {path}'))
+        worker.failed.connect(lambda message: self.view.show_error(f'导出失败: {message}'))
+        worker.cancelled.connect(lambda: self.view.show_status('导出已取消'))
+        worker.finished.connect(on_finished)
+        progress.canceled.connect(worker.cancel)
+        self._export_worker = worker
+        worker.start()
+
+    def generate_reports(self):
+        """生成月度/年度对账单（后台线程生成HTML或PDF，显示进度）"""
+        if self._report_worker is not None and self._report_worker.isRunning():
+            self.view.show_error('正在生成对账单，请等待当前任务完成')
+            return
+        if not self._require_single_portfolio():
+            return
+        years = self.model.get_sold_years()
+        if not years:
+            self.view.show_error('没有已售记录，无法生成对账单')
+            return
+        dialog = ReportDialog(years, self.view, os.path.dirname(os.path.abspath(self.model.file_path)))
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        params = dialog.get_data()
+        # 在界面线程中读取数据（只加载需要的年份的归档分区），后台线程不访问模型
+        try:
+            sold = self.model.get_sold_items(years=params['years'])
+            flows = self.model.get_cash_flows()
+            nav_records = self.model.nav_store.load()
+        except Exception as e:
+            self.view.show_error(f'生成对账单失败: {str(e)}')
+            return
+
+        progress = QProgressDialog('正在生成对账单...', '取消', 0, 100, self.view)
+        progress.setWindowTitle('生成对账单')
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        worker = ReportWorker(sold, flows, nav_records, params, parent=self.view)
+
+        def on_progress(done, total):
+            progress.setValue(int(done * 100 / total) if total else 100)
+            progress.setLabelText(f'正在生成对账单... {done}/{total}')
+
+        def on_finished():
+            progress.close()
+            self._report_worker = None
+            worker.deleteLater()
+
+        worker.progress.connect(on_progress)
+        worker.succeeded.connect(lambda count, directory: self.view.show_success(f'已生成 {count} 份对账单到 {directory}'))
+        worker.failed.connect(lambda message: self.view.show_error(f'生成对账单失败: {message}'))
+        worker.cancelled.connect(lambda: self.view.show_status('已取消生成对账单'))
+        worker.finished.connect(on_finished)
+        progress.canceled.connect(worker.cancel)
+        self._report_worker = worker
+        worker.start()
+
+    def reconcile_trades(self):
+        """选择交易市场导出的记录文件，与账本对账，确认后补录缺少的记录"""
+        if not self._require_single_portfolio():
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self.view, '选择交易记录', os.path.dirname(os.path.abspath(self.model.file_path)),
+            "交易记录 (*.csv *.xlsx *.jsonl)")
+        if not path:
+            return
+        try:
+            result = reconcile(self.model, read_trade_log(path))
+        except Exception as e:
+            self.view.show_error(f'对账失败: {str(e)}')
+            return
+
+        dialog = ReconcileDialog(result, self.view)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        try:
+            applied = apply_missing(self.model, result, get_catalog())
+        except Exception as e:
+            self.view.show_error(f'补录记录失败: {str(e)}')
+            return
+        self._refresh_after_change({'inventory', 'sold_items', 'data_gather'})
+        message = f"已补录 {applied['added']} 条买入、{applied['sold']} 条卖出"
+        if applied['skipped']:
+            message += f"，{applied['skipped']} 条卖出在库存中找不到对应商品"
+        self.view.show_success(message)
+
+    def undo(self):
+        """撤销上一步操作"""
+        try:
+            change = self.model.undo()
+        except Exception as e:
+            self.view.show_error(f'撤销失败: {str(e)}')
+            return
+        if change is None:
+            self.view.show_status('没有可撤销的操作')
+            return
+        self._refresh_after_change(change['sheets'])
+        self.view.show_status(f"已撤销: {change['description']}")
+
+    def redo(self):
+        """重做被撤销的操作"""
+        try:
+            change = self.model.redo()
+        except Exception as e:
+            self.view.show_error(f'重做失败: {str(e)}')
+            return
+        if change is None:
+            self.view.show_status('没有可重做的操作')
+            return
+        self._refresh_after_change(change['sheets'])
+        self.view.show_status(f"已重做: {change['description']}")
+
+    def _refresh_after_change(self, sheets):
+        """数据修改后只刷新受影响的界面部分（不从文件重新加载）"""
+        if 'inventory' in sheets:
+            self.cooling_scheduler.reschedule()
+            self._update_inventory_table()
+        if 'sold_items' in sheets:
+            self._update_sold_items_table()
+            self._update_analysis()
+        if 'data_gather' in sheets:
+            self._update_statistics()
+        self._update_undo_actions()
+
+    def _update_undo_actions(self):
+        """同步撤销/重做按钮状态"""
+        self.view.set_undo_redo_enabled(self.model.can_undo(), self.model.can_redo())
+
     def _clear_layout(self, layout):
         """清除布局中的所有部件"""
         if layout is not None:
@@ -0,0 +1,81 @@
+from PyQt5.QtCore import QThread, pyqtSignal, QByteArray, QUrl, Qt
+from PyQt5.QtGui import QTextDocument, QImage, QPainter, QPdfWriter, QPagedPaintDevice
+from PyQt5.QtSvg import QSvgRenderer
+import os
+from models.statements import (build_statements, render_statement_html, statement_charts,
+                               statement_file_name)
+
+# PDF中的图表按2倍分辨率绘制
+CHART_SCALE = 2
+
+class ReportWorker(QThread):
+    """在后台线程中生成月度/年度对账单（HTML或PDF），通过信号报告进度，不阻塞界面线程。
+    已售记录、资金流水和净值由界面线程读取后传入，后台线程不访问模型。
+    """
+    progress = pyqtSignal(int, int)   # 已生成份数, 总份数
+    succeeded = pyqtSignal(int, str)  # 生成份数, 输出目录
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, sold, flows, nav_records, params, parent=None):
+        """
+        Args:
+            sold (DataFrame): 需要的年份的已售记录（get_sold_items 的结果）
+            flows (DataFrame): 资金流水（get_cash_flows 的结果）
+            nav_records (ndarray): 每日净值记录（NavStore.load 的结果）
+            params (dict): period（'month'/'year'）、years（年份列表或None）、fmt（'html'/'pdf'）、directory
+        """
+        super().__init__(parent)
+        self.sold = sold
+        self.flows = flows
+        self.nav_records = nav_records
+        self.params = params
+        self._cancel_requested = False
+
+    def cancel(self):
+        """请求取消，当前对账单写完后停止"""
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            params = self.params
+            statements = build_statements(self.sold, self.flows, self.nav_records,
+                                          params['period'], params['years'])
+            os.makedirs(params['directory'], exist_ok=True)
+            self.progress.emit(0, len(statements))
+            for index, statement in enumerate(statements):
+                if self._cancel_requested:
+                    self.cancelled.emit()
+                    return
+                path = os.path.join(params['directory'], statement_file_name(statement, params['fmt']))
+                if params['fmt'] == 'pdf':
+                    write_statement_pdf(statement, path)
+                else:
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(render_statement_html(statement))
+                self.progress.emit(index + 1, len(statements))
+            self.succeeded.emit(len(statements), params['directory'])
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def write_statement_pdf(statement, path):
+    """把对账单写成PDF：SVG图表绘制为图片作为文档资源，HTML用QTextDocument排版
+    （QTextDocument、QImage和QPdfWriter都可以在后台线程中使用）
+    """
+    charts = statement_charts(statement)
+    document = QTextDocument()
+    for name, svg in charts.items():
+        renderer = QSvgRenderer(QByteArray(svg.encode('utf-8')))
+        image = QImage(renderer.defaultSize() * CHART_SCALE, QImage.Format_ARGB32)
+        image.fill(Qt.white)
+        painter = QPainter(image)
+        renderer.render(painter)
+        painter.end()
+        document.addResource(QTextDocument.ImageResource, QUrl(f"chart:{name}"), image)
+    document.setHtml(render_statement_html(statement, charts, image_src=lambda name: f"chart:{name}"))
+
+    writer = QPdfWriter(path)
+    writer.setPageSize(QPagedPaintDevice.A4)
+    writer.setTitle(statement['title'])
+    document.print_(writer)
@@ -1,17 +1,23 @@
 import sys
 from PyQt5.QtWidgets import QApplication
-from models.item_model import ItemModel
+from models.item_mapping import ItemMapping
+from models.portfolio_manager import PortfolioManager
 from views.main_view import MainView
 from controllers.main_controller import MainController
+from utils.metrics import install_from_env
 
 def main():
     app = QApplication(sys.argv)
     
-    # 创建 MVC 组件
-    model = ItemModel()
+    # 创建 MVC 组件（各账户的数据文件在config/portfolios.py中配置，启动时并发加载）
+    portfolios = PortfolioManager()
+    model = portfolios.get()
+    mapping = ItemMapping()
     view = MainView()
-    controller = MainController(model, view)  # 创建控制器实例
+    controller = MainController(model, view, mapping, portfolios)  # 创建控制器实例
     view.controller = controller  # 设置视图的控制器引用
+    # 设置了CS2_METRICS环境变量时启用性能指标收集
+    install_from_env(mapping=mapping, controller=controller, portfolios=portfolios)
     
     # 显示主窗口
     view.show()
@@ -0,0 +1,228 @@
+"""卖出策略回测
+
+用历史价格重放持仓和过去的交易，评估诸如
+"冷却期结束后价格超过 买入价 × k 时卖出"、"回撤超过一定比例时卖出（移动止损）" 等规则。
+
+价格按固定周期（默认每天）对齐成 商品类别 × 时间 的矩阵，
+每个策略对所有商品一次性向量化求出卖出时点；参数网格分批交给进程池并行计算。
+商品只有在冷却期（ItemModel.get_cooling_end_times）结束后才能卖出。
+
+用法：
+    data = prepare_backtest(model, mapping)
+    grid = strategy_grid(take_profit=[1.1, 1.2, 1.5], trailing=[0.1, 0.2])
+    results = run_sweep(data, grid, workers=4)
+"""
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from models.portfolio_analytics import match_price_rows
+
+# 每个数据块的商品数，控制 商品数 × 时间点 的临时矩阵大小
+BLOCK_SIZE = 2048
+
+
+class BacktestData:
+    """回测输入：价格矩阵和每个持仓的买入信息（只包含NumPy数组，可以传给子进程）"""
+
+    def __init__(self, grid, prices, rows, buy_price, buy_index, start_index, position_ids):
+        self.grid = grid                  # 时间点 (T,)
+        self.prices = prices              # 商品类别 × 时间点 的价格，向前填充 (M, T)
+        self.rows = rows                  # 每个持仓对应的价格矩阵行号 (N,)
+        self.buy_price = buy_price        # 买入价格 (N,)
+        self.buy_index = buy_index        # 买入时所在的时间点 (N,)
+        self.start_index = start_index    # 冷却期结束后第一个可卖出的时间点 (N,)，T表示窗口内不可卖
+        self.position_ids = position_ids  # inventory_id (N,)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def step_days(self):
+        if len(self.grid) < 2:
+            return 1.0
+        return float((self.grid[1] - self.grid[0]) / np.timedelta64(1, 'D'))
+
+
+def price_matrix(history, freq='D'):
+    """把价格记录对齐到固定周期：每个周期取最后一个价格，缺失时沿用之前的价格。
+    返回 (时间点, mapping_id数组, 价格矩阵)。
+    """
+    bucket = history['time'].dt.floor(freq)
+    last = history.assign(bucket=bucket).groupby(['mapping_id', 'bucket'])['price'].last()
+    table = last.unstack('bucket')
+    grid = pd.date_range(bucket.min(), bucket.max(), freq=freq)
+    table = table.reindex(columns=grid).ffill(axis=1)
+    return grid.to_numpy(), table.index.to_numpy(), table.to_numpy(dtype=float)
+
+
+def prepare_backtest(model, mapping, include_sold=True, freq='D', start=None, end=None):
+    """从模型、映射和历史价格构造回测数据。
+
+    Args:
+        include_sold (bool): 是否同时重放已售出的交易（按原买入时间和价格）
+        freq (str): 价格对齐周期，如 'D'、'h'
+        start, end (datetime, optional): 只使用该时间范围内的价格
+
+    Returns:
+        BacktestData
+    """
+    history = mapping.price_history.load()
+    if start is not None:
+        history = history[history['time'] >= pd.Timestamp(start)]
+    if end is not None:
+        history = history[history['time'] <= pd.Timestamp(end)]
+    if history.empty:
+        raise ValueError("没有历史价格记录，无法回测")
+
+    positions = model.get_inventory_items()
+    if include_sold:
+        sold = model.get_sold_items()
+        if not sold.empty:
+            positions = pd.concat([positions, sold[positions.columns.intersection(sold.columns)]],
+                                  ignore_index=True)
+    if positions.empty:
+        raise ValueError("没有可回测的商品")
+
+    price_table, table_rows = match_price_rows(positions, mapping.get_price_table())
+    grid, mapping_ids, prices = price_matrix(history, freq)
+    # 持仓 -> 价格表中的mapping_id -> 价格矩阵的行
+    matrix_index = pd.Index(mapping_ids)
+    rows = np.full(len(positions), -1)
+    matched = table_rows >= 0
+    rows[matched] = matrix_index.get_indexer(price_table['mapping_id'].to_numpy()[table_rows[matched]])
+    keep = rows >= 0
+    positions = positions[keep]
+
+    buy_times = pd.to_datetime(positions['buy_time']).to_numpy(dtype='datetime64[ns]')
+    cooling_end = model.get_cooling_end_times(positions['buy_time'], positions['goods_type']) \
+        .to_numpy(dtype='datetime64[ns]')
+    step = grid[1] - grid[0] if len(grid) > 1 else np.timedelta64(1, 'D')
+    # 第t个周期的价格在周期结束时可用，冷却期在周期结束前结束即可在该周期卖出
+    start_index = np.searchsorted(grid + step, cooling_end, side='left')
+    buy_index = np.clip(np.searchsorted(grid + step, buy_times, side='left'), 0, len(grid))
+
+    return BacktestData(
+        grid=grid,
+        prices=prices,
+        rows=rows[keep],
+        buy_price=pd.to_numeric(positions['buy_price'], errors='coerce').to_numpy(dtype=float),
+        buy_index=buy_index,
+        start_index=np.maximum(start_index, buy_index),
+        position_ids=positions['inventory_id'].to_numpy(),
+    )
+
+
+def sell_points(data, strategy):
+    """求出每个持仓在该策略下的卖出时点（T表示到回测结束也没有卖出）。
+
+    strategy 字段：
+        take_profit (float): 价格 ≥ 买入价 × take_profit 时卖出
+        trailing (float): 价格从可卖出后的最高点回撤超过该比例时卖出
+        stop_loss (float): 价格 ≤ 买入价 × (1 - stop_loss) 时卖出
+        max_hold_days (float): 持有超过该天数后卖出
+    """
+    n_times = len(data.grid)
+    sell = np.full(len(data), n_times)
+    t = np.arange(n_times)
+    for begin in range(0, len(data), BLOCK_SIZE):
+        block = slice(begin, begin + BLOCK_SIZE)
+        prices = data.prices[data.rows[block]]
+        buy_price = data.buy_price[block, None]
+        valid = (t >= data.start_index[block, None]) & ~np.isnan(prices)
+        cond = np.zeros_like(valid)
+
+        if strategy.get('take_profit'):
+            cond |= prices >= buy_price * strategy['take_profit']
+        if strategy.get('trailing'):
+            peak = np.fmax.accumulate(np.where(valid, prices, -np.inf), axis=1)
+            cond |= prices <= peak * (1 - strategy['trailing'])
+        if strategy.get('stop_loss'):
+            cond |= prices <= buy_price * (1 - strategy['stop_loss'])
+        if strategy.get('max_hold_days'):
+            max_steps = np.ceil(strategy['max_hold_days'] / data.step_days)
+            cond |= t >= data.buy_index[block, None] + max_steps
+
+        cond &= valid
+        hit = cond.any(axis=1)
+        sell[block] = np.where(hit, cond.argmax(axis=1), n_times)
+    return sell
+
+
+def evaluate(data, strategy, fee_rate=0.0):
+    """评估一个策略：已实现收益、期末未卖出商品按最后价格计的未实现收益和换手率"""
+    sell = sell_points(data, strategy)
+    sold = sell < len(data.grid)
+    sell_price = np.where(sold, data.prices[data.rows, np.minimum(sell, len(data.grid) - 1)], np.nan)
+    proceeds = sell_price[sold] * (1 - fee_rate)
+
+    last_price = data.prices[data.rows, -1]
+    held = ~sold
+    mark = np.where(np.isnan(last_price[held]), data.buy_price[held], last_price[held])
+
+    cost = data.buy_price.sum()
+    realized = float((proceeds - data.buy_price[sold]).sum())
+    unrealized = float((mark - data.buy_price[held]).sum())
+    hold_days = (sell[sold] - data.buy_index[sold]) * data.step_days
+    return {
+        **strategy,
+        'fee_rate': fee_rate,
+        'positions': len(data),
+        'sold': int(sold.sum()),
+        'realized_pnl': realized,
+        'unrealized_pnl': unrealized,
+        'total_pnl': realized + unrealized,
+        'return': (realized + unrealized) / cost if cost > 0 else 0.0,
+        'turnover': float(proceeds.sum() / cost) if cost > 0 else 0.0,
+        'avg_hold_days': float(hold_days.mean()) if len(hold_days) else 0.0,
+    }
+
+
+def strategy_grid(take_profit=(None,), trailing=(None,), stop_loss=(None,), max_hold_days=(None,)):
+    """参数网格的笛卡尔积（None表示不使用该规则），跳过没有任何规则的组合"""
+    grid = []
+    for values in itertools.product(take_profit, trailing, stop_loss, max_hold_days):
+        strategy = {name: value for name, value in
+                    zip(('take_profit', 'trailing', 'stop_loss', 'max_hold_days'), values)
+                    if value is not None}
+        if strategy:
+            grid.append(strategy)
+    return grid
+
+
+# 子进程中的回测数据（由进程池初始化函数设置，每个进程只传输一次）
+_WORKER_DATA = None
+
+
+def _init_worker(data):
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+
+def _evaluate_batch(strategies, fee_rate):
+    return [evaluate(_WORKER_DATA, strategy, fee_rate) for strategy in strategies]
+
+
+def run_sweep(data, strategies, workers=None, fee_rate=0.0, batch_size=None):
+    """并行评估一组策略，返回每个策略一行的DataFrame（按总收益降序）。
+
+    Args:
+        workers (int, optional): 进程数，默认为CPU核数；为1时在当前进程中计算
+        batch_size (int, optional): 每个任务包含的策略数
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(strategies) < 2:
+        results = [evaluate(data, strategy, fee_rate) for strategy in strategies]
+    else:
+        batch_size = batch_size or max(1, len(strategies) // (workers * 4))
+        batches = [strategies[i:i + batch_size] for i in range(0, len(strategies), batch_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data,)) as executor:
+            results = [row for batch in executor.map(_evaluate_batch, batches,
+                                                     itertools.repeat(fee_rate))
+                       for row in batch]
+    df = pd.DataFrame(results)
+    if df.empty:
+        return df
+    return df.sort_values('total_pnl', ascending=False, kind='stable').reset_index(drop=True)
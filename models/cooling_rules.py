@@ -0,0 +1,148 @@
+"""冷却期规则引擎
+
+冷却期结束时间只取决于购买时间所在的分钟（以及商品类型对应的规则），
+因此每条规则预先计算一张 购买分钟 -> 解锁时间 的日历数组，
+批量计算时只需把购买时间换算成分钟序号再查表，时区换算也只在建表时做一次。
+日历按需扩展到覆盖查询的时间范围。
+"""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config.cooling_rules import COOLING_RULES
+
+NS_PER_MINUTE = 60 * 10**9
+NAT = np.iinfo(np.int64).min
+# 扩展日历时在查询范围两侧多算的天数，避免时间稍有变化就重建
+CALENDAR_PAD_DAYS = 30
+
+
+class CoolingRule:
+    """一条冷却规则：截止时间、冷却天数和截止时间所在的时区"""
+
+    FIELDS = ('cutoff_hour', 'cutoff_minute', 'hold_days', 'timezone')
+
+    def __init__(self, cutoff_hour=16, cutoff_minute=0, hold_days=7, timezone=None):
+        if not 0 <= cutoff_hour < 24 or not 0 <= cutoff_minute < 60:
+            raise ValueError(f"无效的截止时间: {cutoff_hour}:{cutoff_minute:02d}")
+        if hold_days < 0:
+            raise ValueError("冷却天数不能为负数")
+        self.cutoff_hour = int(cutoff_hour)
+        self.cutoff_minute = int(cutoff_minute)
+        self.hold_days = int(hold_days)
+        self.timezone = timezone
+
+    def key(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def unlock_times(self, buy_times, local_timezone=None):
+        """直接计算一组（本地时钟的）购买时间的冷却结束时间"""
+        wall = pd.DatetimeIndex(buy_times)
+        convert = self.timezone is not None and str(self.timezone) != str(local_timezone)
+        if convert:
+            wall = wall.tz_localize(local_timezone, ambiguous='NaT', nonexistent='shift_forward') \
+                .tz_convert(self.timezone).tz_localize(None)
+        cutoff = wall.normalize() + pd.Timedelta(hours=self.cutoff_hour, minutes=self.cutoff_minute)
+        days = np.where(wall <= cutoff, self.hold_days, self.hold_days + 1)
+        unlock = cutoff + pd.to_timedelta(days, unit='D')
+        if convert:
+            unlock = unlock.tz_localize(self.timezone, ambiguous='NaT', nonexistent='shift_forward') \
+                .tz_convert(local_timezone).tz_localize(None)
+        return unlock
+
+
+class CoolingCalendar:
+    """一条规则的 购买分钟 -> 解锁时间 查找表"""
+
+    def __init__(self, rule, local_timezone=None):
+        self.rule = rule
+        self.local_timezone = local_timezone
+        self._start = 0                            # 第一项对应的分钟序号（自1970年起）
+        self._unlock = np.empty(0, dtype=np.int64)  # 解锁时间（纳秒）
+
+    def lookup(self, minutes):
+        """minutes: 购买时间向上取整后的分钟序号数组，返回解锁时间（纳秒）"""
+        if len(minutes) == 0:
+            return np.empty(0, dtype=np.int64)
+        self._ensure(int(minutes.min()), int(minutes.max()))
+        return self._unlock[minutes - self._start]
+
+    def _ensure(self, first, last):
+        end = self._start + len(self._unlock)
+        if len(self._unlock) and self._start <= first and last < end:
+            return
+        day = 24 * 60
+        if len(self._unlock):
+            first, last = min(first, self._start), max(last, end - 1)
+        start = (first // day - CALENDAR_PAD_DAYS) * day
+        stop = (last // day + CALENDAR_PAD_DAYS + 1) * day
+        minutes = pd.DatetimeIndex(np.arange(start, stop, dtype=np.int64) * NS_PER_MINUTE)
+        # 夏令时切换时无法换算的个别分钟沿用前一分钟的结果
+        unlock = pd.Series(self.rule.unlock_times(minutes, self.local_timezone)).ffill().bfill()
+        self._start = start
+        self._unlock = unlock.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+class CoolingRules:
+    """按商品类型选择冷却规则，并用预先计算的日历批量求冷却结束时间"""
+
+    def __init__(self, config=None):
+        config = COOLING_RULES if config is None else config
+        base = {name: config[name] for name in CoolingRule.FIELDS if name in config}
+        local_timezone = config.get('local_timezone')
+        if base.get('timezone') and local_timezone is None:
+            local_timezone = datetime.now().astimezone().tzinfo
+        self.local_timezone = local_timezone
+        self.default_rule = CoolingRule(**base)
+        self.overrides = {
+            goods_type: CoolingRule(**{**base, **override})
+            for goods_type, override in config.get('overrides', {}).items()
+        }
+        # 规则相同的商品类型共用一张日历
+        self._calendars = {}
+
+    def rule_for(self, goods_type=None):
+        return self.overrides.get(goods_type, self.default_rule)
+
+    def _calendar(self, rule):
+        calendar = self._calendars.get(rule.key())
+        if calendar is None:
+            calendar = CoolingCalendar(rule, self.local_timezone)
+            self._calendars[rule.key()] = calendar
+        return calendar
+
+    def end_times(self, buy_times, goods_types=None):
+        """批量计算冷却结束时间。
+
+        Args:
+            buy_times: 购买时间序列
+            goods_types: 与buy_times等长的商品类型（为None时全部使用默认规则）
+
+        Returns:
+            DatetimeIndex: 与buy_times等长，购买时间无效时为NaT
+        """
+        ns = pd.DatetimeIndex(pd.to_datetime(buy_times)).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        valid = ns != NAT
+        # 向上取整到分钟：截止时间恰好整分，"不晚于截止时间"的判断不受影响
+        minutes = -(-ns // NS_PER_MINUTE)
+        result = np.full(len(ns), NAT, dtype=np.int64)
+
+        if goods_types is None or not self.overrides:
+            groups = [(self.default_rule, valid)]
+        else:
+            goods_types = np.asarray(goods_types, dtype=object)
+            overridden = np.zeros(len(ns), dtype=bool)
+            groups = []
+            for goods_type, rule in self.overrides.items():
+                mask = goods_types == goods_type
+                overridden |= mask
+                groups.append((rule, valid & mask))
+            groups.append((self.default_rule, valid & ~overridden))
+
+        for rule, mask in groups:
+            if mask.any():
+                result[mask] = self._calendar(rule).lookup(minutes[mask])
+        return pd.DatetimeIndex(result.view('datetime64[ns]'))
+
+    def end_time(self, buy_time, goods_type=None):
+        """单个商品的冷却结束时间"""
+        return self.end_times([buy_time], None if goods_type is None else [goods_type])[0]
@@ -0,0 +1,183 @@
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import os
+from utils.atomic_file import atomic_write_path
+
+# 支持的导出格式（文件扩展名 -> 格式）
+EXPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.parquet': 'parquet'}
+
+# 各表按哪一列做日期筛选
+DATE_COLUMNS = {'inventory': 'buy_time', 'sold_items': 'sell_time'}
+
+
+class ExportCancelled(Exception):
+    """导出被进度回调取消"""
+
+
+def export_sources(model, table, start=None, end=None):
+    """准备要导出的数据来源（DataFrame列表，不复制）。
+
+    inventory为模型快照中的库存表，sold_items为各归档年份的分区加上快照中今年的记录，
+    不会把整个历史拼接成一个大表；整年都在日期范围外的归档分区不会被加载。
+    在后台线程中导出时，应在界面线程中调用本函数，后台线程只处理返回的数据，不访问模型。
+    """
+    if table not in DATE_COLUMNS:
+        raise ValueError(f"未知的表: {table}")
+    snapshot = model.snapshot()
+    if table == 'inventory':
+        return [snapshot.inventory]
+    frames = []
+    for year in model._archive.years():
+        if start is not None and year < pd.Timestamp(start).year:
+            continue
+        if end is not None and year > pd.Timestamp(end).year:
+            continue
+        frames.append(model._archive.load(year))
+    frames.append(snapshot.sold_items)
+    return frames
+
+
+def iter_export_chunks(sources, table, chunk_size=5000, start=None, end=None,
+                       goods_type=None, sub_type=None):
+    """按固定大小分块生成要导出的记录。
+    每块只复制本块的行，内存占用与chunk_size成正比。
+
+    Args:
+        sources (list): export_sources 的结果
+        table (str): 'inventory' 或 'sold_items'
+        chunk_size (int): 每块的行数
+        start, end (datetime, optional): 日期范围（含两端），inventory按购买时间，sold_items按售出时间；
+            end只有日期（如'2025-01-03'）时包括当天全天
+        goods_type, sub_type (str, optional): 商品类型筛选，None或'全部'表示不筛选
+
+    Yields:
+        pandas.DataFrame: 不超过chunk_size行的数据块
+    """
+    if table not in DATE_COLUMNS:
+        raise ValueError(f"未知的表: {table}")
+    for frame in sources:
+        positions = np.flatnonzero(_filter_mask(frame, DATE_COLUMNS[table], start, end,
+                                                goods_type, sub_type))
+        for offset in range(0, len(positions), chunk_size):
+            yield frame.iloc[positions[offset:offset + chunk_size]]
+
+
+def count_export_rows(sources, table, start=None, end=None, goods_type=None, sub_type=None):
+    """要导出的总行数（用于显示进度）"""
+    total = 0
+    for frame in sources:
+        total += int(_filter_mask(frame, DATE_COLUMNS[table], start, end, goods_type, sub_type).sum())
+    return total
+
+
+def export_table(sources, table, path, fmt=None, chunk_size=5000, start=None, end=None,
+                 goods_type=None, sub_type=None, progress=None):
+    """把一张表分块流式写入CSV、JSONL或Parquet文件。
+
+    Args:
+        sources (list): export_sources 的结果
+        fmt (str, optional): 'csv'、'jsonl' 或 'parquet'，默认根据扩展名判断
+        progress (callable, optional): progress(已写入行数, 总行数)，每写完一块调用一次；
+            返回False时取消导出（不会留下不完整的文件）
+
+    Returns:
+        int: 写入的行数
+    """
+    fmt = fmt or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in EXPORT_FORMATS.values():
+        raise ValueError(f"不支持的导出格式: {path}")
+
+    total = count_export_rows(sources, table, start, end, goods_type, sub_type) if progress else None
+    chunks = iter_export_chunks(sources, table, chunk_size, start, end, goods_type, sub_type)
+    written = 0
+    with atomic_write_path(path) as tmp_path:
+        with _ChunkWriter(fmt, tmp_path) as write:
+            for chunk in chunks:
+                write(chunk)
+                written += len(chunk)
+                if progress is not None and progress(written, total) is False:
+                    raise ExportCancelled()
+            if written == 0:
+                # 没有数据时也写出表头/空文件
+                # 最后一个来源总是主数据文件中的表
+                write(sources[-1].iloc[0:0])
+    return written
+
+
+def _filter_mask(frame, date_column, start, end, goods_type, sub_type):
+    """计算筛选条件的布尔掩码"""
+    mask = np.ones(len(frame), dtype=bool)
+    if frame.empty:
+        return mask
+    if start is not None or end is not None:
+        dates = pd.to_datetime(frame[date_column])
+        if start is not None:
+            mask &= (dates >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (dates <= _end_time(end)).to_numpy()
+    if goods_type and goods_type != '全部':
+        mask &= (frame['goods_type'] == goods_type).to_numpy()
+    if sub_type and sub_type != '全部':
+        mask &= (frame['sub_type'] == sub_type).to_numpy()
+    return mask
+
+
+def _end_time(end):
+    """结束时间，只有日期（date或不含时间的字符串）时为当天的最后时刻"""
+    date_only = (isinstance(end, str) and ':' not in end) or \
+        (isinstance(end, date) and not isinstance(end, datetime))
+    end = pd.Timestamp(end)
+    return end.normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns') if date_only else end
+
+
+class _ChunkWriter:
+    """按格式打开分块写入器，返回write(chunk)函数"""
+
+    def __init__(self, fmt, path):
+        self.fmt = fmt
+        self.path = path
+        self._file = None
+        self._parquet = None
+        self._schema = None
+
+    def __enter__(self):
+        if self.fmt == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("导出Parquet需要安装pyarrow: pip install pyarrow")
+            self._pa = pyarrow
+            self._pq = pyarrow.parquet
+        else:
+            # utf-8-sig便于Excel直接打开CSV
+            encoding = 'utf-8-sig' if self.fmt == 'csv' else 'utf-8'
+            self._file = open(self.path, 'w', encoding=encoding, newline='')
+        return self.write
+
+    def write(self, chunk):
+        if self.fmt == 'csv':
+            chunk.to_csv(self._file, index=False, header=self._file.tell() == 0)
+        elif self.fmt == 'jsonl':
+            if not chunk.empty:
+                text = chunk.to_json(orient='records', lines=True, force_ascii=False, date_format='iso')
+                self._file.write(text if text.endswith('\n') else text + '\n')
+        else:
+            batch = self._pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._schema = batch.schema
+                self._parquet = self._pq.ParquetWriter(self.path, self._schema)
+            self._parquet.write_table(batch.cast(self._schema))
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._file is not None:
+            self._file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        return False
+
+
+def default_export_name(table, fmt):
+    """默认导出文件名，如 sold_items_20250101_120000.csv"""
+    return f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
@@ -0,0 +1,134 @@
+"""磨损值排名索引
+
+同一饰品（goods_name + goods_wear）的磨损值越低通常越值钱。索引把库存、已售记录和
+导入的磨损值数据按饰品分组，每组一个排好序的数组，查询时用二分查找（np.searchsorted）：
+- 某个磨损值在同类中的排名和百分位（排名1为最低磨损）
+- 与某个磨损值相差不超过ε的记录
+批量查询时按饰品分组，每组一次向量化的二分查找，整页表格的排名一次算完。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.file_lock import FileLock
+
+KEY_COLUMNS = ['goods_name', 'goods_wear']
+
+
+class FloatDataset:
+    """导入的磨损值数据（只追加的CSV文件，列: goods_name, goods_wear, goods_wear_value）"""
+
+    COLUMNS = KEY_COLUMNS + ['goods_wear_value']
+
+    def __init__(self, file_path='data/float_dataset.csv'):
+        self.file_path = file_path
+        self._lock = FileLock(file_path)
+        # 读取缓存：(文件修改时间, 大小) -> DataFrame
+        self._cache = (None, None)
+
+    def signature(self):
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def append_frame(self, df):
+        """追加包含goods_name、goods_wear、goods_wear_value列的DataFrame"""
+        df = df[self.COLUMNS].dropna()
+        if df.empty:
+            return 0
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            write_header = not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0
+            df.to_csv(self.file_path, mode='a', header=write_header, index=False)
+        return len(df)
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return pd.DataFrame({column: [] for column in self.COLUMNS})
+        with self._lock.shared():
+            signature = self.signature()
+            if self._cache[0] == signature:
+                return self._cache[1]
+            df = pd.read_csv(self.file_path)
+        self._cache = (signature, df)
+        return df
+
+
+class FloatIndex:
+    """按饰品分组的有序磨损值数组"""
+
+    def __init__(self, frames):
+        """
+        Args:
+            frames (list): 包含goods_name、goods_wear、goods_wear_value列的DataFrame
+        """
+        frames = [frame[KEY_COLUMNS + ['goods_wear_value']] for frame in frames
+                  if frame is not None and not frame.empty]
+        self._groups = {}
+        if not frames:
+            return
+        df = pd.concat(frames, ignore_index=True)
+        values = pd.to_numeric(df['goods_wear_value'], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        codes, uniques = pd.MultiIndex.from_frame(df[KEY_COLUMNS][valid].astype(str)).factorize()
+        values = values[valid]
+        # 先按饰品、再按磨损值排序，每个饰品是排序结果中连续的一段
+        order = np.lexsort((values, codes))
+        codes, values = codes[order], values[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate([[0], bounds])
+        stops = np.concatenate([bounds, [len(codes)]])
+        for start, stop in zip(starts, stops):
+            self._groups[uniques[codes[start]]] = values[start:stop]
+
+    def __len__(self):
+        return sum(len(values) for values in self._groups.values())
+
+    def values(self, goods_name, goods_wear):
+        """某个饰品的全部磨损值（升序）"""
+        return self._groups.get((str(goods_name), str(goods_wear)), np.empty(0))
+
+    def rank(self, goods_name, goods_wear, value):
+        """返回 (排名, 总数, 百分位)：排名为比它低的记录数+1，百分位为比它低的记录所占比例"""
+        values = self.values(goods_name, goods_wear)
+        below = int(np.searchsorted(values, value, side='left'))
+        return below + 1, len(values), below / len(values) if len(values) else np.nan
+
+    def within(self, goods_name, goods_wear, value, epsilon):
+        """与value相差不超过epsilon的磨损值（升序）"""
+        values = self.values(goods_name, goods_wear)
+        start = np.searchsorted(values, value - epsilon, side='left')
+        stop = np.searchsorted(values, value + epsilon, side='right')
+        return values[start:stop]
+
+    def ranks(self, df):
+        """批量计算df中每一行的排名，返回与df同索引的DataFrame（rank, count, percentile）"""
+        rank = np.zeros(len(df), dtype=np.int64)
+        count = np.zeros(len(df), dtype=np.int64)
+        percentile = np.full(len(df), np.nan)
+        if len(df) and self._groups:
+            values = pd.to_numeric(df['goods_wear_value'], errors='coerce').to_numpy(dtype=float)
+            keys = df[KEY_COLUMNS].astype(str)
+            for key, positions in keys.groupby(KEY_COLUMNS, sort=False).indices.items():
+                group = self._groups.get(key)
+                if group is None:
+                    continue
+                below = np.searchsorted(group, values[positions], side='left')
+                rank[positions] = below + 1
+                count[positions] = len(group)
+                percentile[positions] = below / len(group)
+            missing = np.isnan(values)
+            rank[missing], count[missing], percentile[missing] = 0, 0, np.nan
+        return pd.DataFrame({'rank': rank, 'count': count, 'percentile': percentile}, index=df.index)
+
+
+def format_float_rank(rank, count):
+    """排名的文字描述，如 "3/120（前2.5%）"；没有其他同类记录时为空"""
+    if count <= 1 or rank <= 0:
+        return ""
+    return f"{rank}/{count}（前{rank / count * 100:.1f}%）"
@@ -0,0 +1,145 @@
+"""商品分类（大类 -> 子类型）
+
+分类来自随程序提供的 data/goods_types.csv（列: goods_type, sub_type, stattrak），
+新增武器或大类只需编辑该文件，不需要修改代码；stattrak 为 1 表示该大类有暗金版本。
+
+加载时把大类和子类型名称各编号一次（按文件中出现的顺序），得到两级索引：
+子类型编号 -> 所属大类编号。库存和已售表的查询缓存中保存 type_code / sub_type_code
+两个小整数列，按大类筛选只需比较一次整数，不再为每次筛选构造子类型列表做 isin。
+文件中没有的子类型编码为 -1（只能在"全部"中看到）。
+分类在第一次使用时才加载，之后在进程内共用。
+"""
+import csv
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TAXONOMY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'data', 'goods_types.csv')
+# 下拉框中表示不筛选的选项
+ALL = '全部'
+UNKNOWN_CODE = -1
+
+_taxonomies = {}
+_taxonomies_lock = threading.Lock()
+
+
+class GoodsTaxonomy:
+    """大类和子类型的编号索引"""
+
+    def __init__(self, entries, stattrak_types=()):
+        """
+        Args:
+            entries (list): (goods_type, sub_type) 元组列表，顺序即下拉框中的顺序
+            stattrak_types (iterable): 有暗金版本的大类
+        """
+        self.types = []
+        self.sub_types = []
+        self._type_codes = {}
+        self._sub_type_codes = {}
+        parents = []
+        for goods_type, sub_type in entries:
+            if goods_type not in self._type_codes:
+                self._type_codes[goods_type] = len(self.types)
+                self.types.append(goods_type)
+            # 同名子类型只属于第一次出现的大类
+            if sub_type and sub_type not in self._sub_type_codes:
+                self._sub_type_codes[sub_type] = len(self.sub_types)
+                self.sub_types.append(sub_type)
+                parents.append(self._type_codes[goods_type])
+        # 子类型编号 -> 大类编号
+        self.parents = np.array(parents, dtype=np.int16)
+        self.stattrak_types = frozenset(stattrak_types)
+        self._sub_type_index = pd.Index(self.sub_types, dtype=object)
+
+    @classmethod
+    def from_file(cls, file_path=DEFAULT_TAXONOMY):
+        """从CSV文件加载分类，文件不存在时为空分类"""
+        entries = []
+        stattrak_types = set()
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    goods_type = row['goods_type'].strip()
+                    if not goods_type:
+                        continue
+                    entries.append((goods_type, row.get('sub_type', '').strip()))
+                    if str(row.get('stattrak', '')).strip() in ('1', 'true', 'True', '是'):
+                        stattrak_types.add(goods_type)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"加载商品分类出错: {str(e)}")
+        return cls(entries, stattrak_types)
+
+    def type_names(self, include_all=False):
+        """大类名称列表"""
+        return ([ALL] if include_all else []) + list(self.types)
+
+    def sub_type_names(self, goods_type, include_all=False):
+        """某一大类（ALL表示全部大类）的子类型名称列表"""
+        if goods_type == ALL:
+            names = []
+        else:
+            code = self._type_codes.get(goods_type)
+            names = [] if code is None else [self.sub_types[i] for i in np.flatnonzero(self.parents == code)]
+        return ([ALL] if include_all else []) + names
+
+    def has_stattrak(self, goods_type):
+        return goods_type in self.stattrak_types
+
+    def type_code(self, goods_type):
+        return self._type_codes.get(goods_type, UNKNOWN_CODE)
+
+    def sub_type_code(self, sub_type):
+        return self._sub_type_codes.get(sub_type, UNKNOWN_CODE)
+
+    def sub_type_codes(self, sub_types):
+        """子类型列 -> 子类型编号数组（int16）"""
+        if not len(sub_types):
+            return np.empty(0, dtype=np.int16)
+        return self._sub_type_index.get_indexer(pd.Index(sub_types, dtype=object)).astype(np.int16)
+
+    def type_codes(self, sub_types):
+        """子类型列 -> 所属大类编号数组（int16），与按子类型列表筛选大类的结果一致"""
+        codes = self.sub_type_codes(sub_types)
+        known = codes >= 0
+        result = np.full(len(codes), UNKNOWN_CODE, dtype=np.int16)
+        result[known] = self.parents[codes[known]]
+        return result
+
+    def derived_columns(self):
+        """TableQuery 的派生列：type_code 和 sub_type_code"""
+        return {
+            'type_code': lambda frame: self.type_codes(frame['sub_type']),
+            'sub_type_code': lambda frame: self.sub_type_codes(frame['sub_type']),
+        }
+
+    def filter_where(self, goods_type=ALL, sub_type=ALL):
+        """下拉框的大类/子类型选择 -> 查询条件"""
+        if goods_type == ALL:
+            return {}
+        if sub_type and sub_type != ALL:
+            return {'sub_type_code': self.sub_type_code(sub_type)}
+        return {'type_code': self.type_code(goods_type)}
+
+    def as_dict(self):
+        """{大类: ['全部', 子类型...]}，第一项为 {'全部': ['全部']}"""
+        result = {ALL: [ALL]}
+        for goods_type in self.types:
+            result[goods_type] = self.sub_type_names(goods_type, include_all=True)
+        return result
+
+
+def get_taxonomy(file_path=DEFAULT_TAXONOMY):
+    """获取分类（第一次调用时加载）"""
+    taxonomy = _taxonomies.get(file_path)
+    if taxonomy is None:
+        with _taxonomies_lock:
+            taxonomy = _taxonomies.get(file_path)
+            if taxonomy is None:
+                taxonomy = GoodsTaxonomy.from_file(file_path)
+                _taxonomies[file_path] = taxonomy
+    return taxonomy
@@ -1,31 +1,59 @@
 import pandas as pd
 import os
+from utils.atomic_file import atomic_write_path
+from utils.excel_io import read_sheet, write_sheets
+from utils.file_lock import FileLock
+from utils.metrics import METRICS
+from models.price_history import PriceHistory
 
 class ItemMapping:
     def __init__(self, file_path='data/item_mapping.xlsx'):
         self.file_path = file_path
+        # 读-改-写期间持有文件锁，避免多个进程互相覆盖
+        self._lock = FileLock(file_path)
+        # 价格表缓存：(文件修改时间, 大小) -> DataFrame
+        self._price_cache = (None, None)
+        # 每次价格更新同时追加到映射文件旁的历史价格记录
+        self.price_history = PriceHistory(
+            os.path.join(os.path.dirname(file_path), 'price_history.csv'))
+        # 价格更新回调，参数为本批更新的 {mapping_id: 价格}（如价格提醒）
+        self._price_listeners = []
         self._ensure_file_exists()
         
     def _ensure_file_exists(self):
         """确保映射文件存在"""
-        if not os.path.exists(os.path.dirname(self.file_path)):
-            os.makedirs(os.path.dirname(self.file_path))
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
         
-        if not os.path.exists(self.file_path):
-            df = pd.DataFrame(columns=[
-                'mapping_id',       # 商品类别ID（相同属性的商品共享同一ID）
-                'item_name',        # 商品名称
-                'goods_type',        # 商品类型
-                'item_wear',        # 商品磨损
-                'is_stattrak',      # 是否暗金
-                'last_used',        # 最后使用时间
-                'current_price'     # 当前市场参考价格
-            ])
-            df.to_excel(self.file_path, index=False)
+        with self._lock:
+            if not os.path.exists(self.file_path):
+                df = pd.DataFrame(columns=[
+                    'mapping_id',       # 商品类别ID（相同属性的商品共享同一ID）
+                    'item_name',        # 商品名称
+                    'goods_type',        # 商品类型
+                    'item_wear',        # 商品磨损
+                    'is_stattrak',      # 是否暗金
+                    'last_used',        # 最后使用时间
+                    'current_price'     # 当前市场参考价格
+                ])
+                self._write(df)
     
+    def _write(self, df):
+        """写入映射文件（先写临时文件再替换）"""
+        with atomic_write_path(self.file_path) as tmp_path:
+            write_sheets(tmp_path, {'Sheet1': df})
+        if METRICS.enabled:
+            METRICS.count('bytes_written.item_mapping', os.path.getsize(self.file_path))
+
     def get_mapping_id(self, name, type_, wear, is_stattrak):
         """获取或创建商品类别ID"""
-        df = pd.read_excel(self.file_path)
+        with self._lock:
+            return self._get_or_create_mapping_id(name, type_, wear, is_stattrak)
+
+    def _get_or_create_mapping_id(self, name, type_, wear, is_stattrak):
+        """在持有文件锁的情况下查找或创建商品类别ID"""
+        df = read_sheet(self.file_path)
         
         # 查找匹配的商品类别
         mask = (
@@ -36,12 +64,14 @@ class ItemMapping:
         )
         matching_items = df[mask]
         
+        if METRICS.enabled:
+            METRICS.cache_hit('mapping_id', not matching_items.empty)
         if not matching_items.empty:
             # 更新最后使用时间
             mapping_id = matching_items.iloc[0]['mapping_id']
             idx = matching_items.index[0]
             df.at[idx, 'last_used'] = pd.Timestamp.now()
-            df.to_excel(self.file_path, index=False)
+            self._write(df)
             return mapping_id
         
         # 创建新ID
@@ -57,20 +87,80 @@ class ItemMapping:
         })
         
         df = pd.concat([df, new_item], ignore_index=True)
-        df.to_excel(self.file_path, index=False)
+        self._write(df)
         return new_id
     
+    def add_price_listener(self, callback):
+        """注册价格更新回调，每批价格写入后调用一次"""
+        self._price_listeners.append(callback)
+
+    def _notify_prices(self, prices):
+        for callback in self._price_listeners:
+            callback(prices)
+
     def update_current_price(self, mapping_id, price):
         """更新商品类别的当前市场参考价格"""
-        df = pd.read_excel(self.file_path)
-        mask = df['mapping_id'] == mapping_id
+        with self._lock:
+            df = read_sheet(self.file_path)
+            mask = df['mapping_id'] == mapping_id
+            if any(mask):
+                df['current_price'] = df['current_price'].astype(float)
+                df.loc[mask, 'current_price'] = price
+                self._write(df)
+                self.price_history.append({mapping_id: price})
         if any(mask):
-            df.loc[mask, 'current_price'] = price
-            df.to_excel(self.file_path, index=False)
+            self._notify_prices({mapping_id: price})
+
+    def update_prices(self, prices):
+        """批量更新多个商品类别的当前价格，只读写一次文件。
+        
+        Args:
+            prices (dict): mapping_id -> 当前价格
+        
+        Returns:
+            int: 实际更新的商品类别数量
+        """
+        if not prices:
+            return 0
+        with self._lock:
+            df = read_sheet(self.file_path)
+            new_prices = df['mapping_id'].map(pd.Series(prices, dtype=float))
+            mask = new_prices.notna()
+            if mask.any():
+                df['current_price'] = df['current_price'].astype(float)
+                df.loc[mask, 'current_price'] = new_prices[mask]
+                self._write(df)
+                self.price_history.append(dict(zip(df.loc[mask, 'mapping_id'], new_prices[mask])))
+        if mask.any():
+            self._notify_prices(dict(zip(df.loc[mask, 'mapping_id'], new_prices[mask])))
+        return int(mask.sum())
     
+    def get_price_table(self):
+        """获取所有商品类别的当前价格表。
+        返回的列为 mapping_id, item_name, goods_type, item_wear, is_stattrak, current_price，
+        用于按 (名称, 具体类型, 磨损, 暗金) 与库存表关联。
+        部分旧映射文件把具体类型存放在item_type列中，这里统一为goods_type。
+        """
+        with self._lock.shared():
+            st = os.stat(self.file_path)
+            signature = (st.st_mtime_ns, st.st_size)
+            cached_signature, cached = self._price_cache
+            if METRICS.enabled:
+                METRICS.cache_hit('price_table', cached_signature == signature)
+            if cached_signature == signature:
+                return cached
+            df = read_sheet(self.file_path)
+        if 'goods_type' not in df.columns and 'item_type' in df.columns:
+            df = df.rename(columns={'item_type': 'goods_type'})
+        columns = ['mapping_id', 'item_name', 'goods_type', 'item_wear', 'is_stattrak', 'current_price']
+        df = df[columns]
+        self._price_cache = (signature, df)
+        return df
+
     def get_item_details(self, mapping_id):
         """获取商品类别详细信息"""
-        df = pd.read_excel(self.file_path)
+        with self._lock.shared():
+            df = read_sheet(self.file_path)
         item = df[df['mapping_id'] == mapping_id]
         if not item.empty:
             return item.iloc[0].to_dict()
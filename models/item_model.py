@@ -1,6 +1,21 @@
-from datetime import datetime, timedelta
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
 import pandas as pd
+import json
 import os
+from utils.atomic_file import atomic_write_path
+from utils.excel_io import read_sheets, write_sheets
+from utils.file_lock import FileLock
+from utils.metrics import METRICS
+from models.sold_archive import SoldArchive, merge_summaries, summarize_sold
+from models.cooling_rules import CoolingRules
+from models.query import TableQuery
+from models.float_index import FloatDataset, FloatIndex
+from models.snapshot import ModelSnapshot, share_frame
+from models.nav_series import NavStore, update_nav
+from models.goods_taxonomy import get_taxonomy
 
 class ItemModel:
     # 商品状态常量
@@ -8,30 +23,100 @@ class ItemModel:
     STATUS_HOLDING = 1    # 持有中
     STATUS_SOLD = 2       # 已售出
 
-    def __init__(self, file_path='data/inventory.xlsx'):
+    # 库存表默认排序用的状态优先级：持有中 -> 冷却期 -> 已出售
+    STATUS_PRIORITY = {STATUS_HOLDING: 0, STATUS_COOLING: 1, STATUS_SOLD: 2}
+
+    # 撤销/重做历史的最大条数（每条只记录受影响的行和增量，占用很小）
+    UNDO_LIMIT = 200
+
+    # 各类操作会修改的工作表
+    _OP_SHEETS = {
+        'add_item': ('inventory', 'data_gather'),
+        'add_items': ('inventory', 'data_gather'),
+        'remove_items': ('inventory', 'data_gather'),
+        'sell_item': ('inventory', 'sold_items', 'data_gather'),
+        'unsell_item': ('inventory', 'sold_items', 'data_gather'),
+        'sell_items': ('inventory', 'sold_items', 'data_gather'),
+        'unsell_items': ('inventory', 'sold_items', 'data_gather'),
+        'set_state': ('inventory',),
+        'adjust_gather': ('data_gather',),
+        'update_investment': ('data_gather', 'cash_flows'),
+        'add_fee': ('data_gather', 'cash_flows'),
+    }
+
+    # 已售商品表特有的字段
+    SOLD_ONLY_COLUMNS = ('sell_price', 'sell_time', 'extra_income', 'hold_days', 'total_profit')
+
+    # 资金流水表的字段：时间、类型（investment/fee）、金额
+    CASH_FLOW_COLUMNS = ['time', 'kind', 'amount']
+
+    def __init__(self, file_path='data/inventory.xlsx', cooling_rules=None):
         """初始化商品模型，设置文件路径和工作表名称。
         该构造函数会初始化商品模型，并确保库存文件存在。
+        cooling_rules为冷却规则配置（格式同config/cooling_rules.py），默认使用配置文件中的规则。
         """ 
         self.file_path = file_path
+        self.cooling_rules = CoolingRules(cooling_rules)
         self.inventory_sheet = 'inventory'
         self.sold_items_sheet = 'sold_items'
         self.data_gather_sheet = 'data_gather'  # 新增数据统计表
+        self.cash_flows_sheet = 'cash_flows'    # 投资和手续费的流水记录
         # 添加内存缓存
         self._inventory_cache = None
         self._sold_items_cache = None
         self._data_gather_cache = None
+        self._cash_flows_cache = None
         self._cache_is_dirty = False
+        # 工作表名 -> 缓存属性名
+        self._sheet_caches = {
+            self.inventory_sheet: '_inventory_cache',
+            self.sold_items_sheet: '_sold_items_cache',
+            self.data_gather_sheet: '_data_gather_cache',
+            self.cash_flows_sheet: '_cash_flows_cache',
+        }
+        # 每个工作表的数据版本，缓存被修改或重新加载时加1；查询缓存按版本失效
+        self._versions = dict.fromkeys(self._sheet_caches, 0)
+        self._queries = {}
+        self._snapshot = None
+        # 多进程并发控制：文件锁、已同步的版本戳、未写入的操作
+        self._lock = FileLock(file_path)
+        self._stamp = None
+        self._pending_ops = []
+        self._dirty_sheets = set()
+        self._base_frames = {}
+        # 事务嵌套深度，大于0时修改只保留在内存中，提交时统一写入
+        self._transaction_depth = 0
+        # 撤销/重做栈，每个元素是一组操作（一个事务为一组）
+        self._undo_stack = deque(maxlen=self.UNDO_LIMIT)
+        self._redo_stack = deque(maxlen=self.UNDO_LIMIT)
+        self._undo_group = None
+        # 往年的已售记录按年份归档在数据文件旁的目录中，需要时才加载
+        root = os.path.splitext(os.path.basename(file_path))[0]
+        self._archive = SoldArchive(os.path.join(os.path.dirname(file_path), f"{root}_archive"))
+        # 磨损值排名：导入的磨损值数据保存在数据文件旁，索引在数据变化后才重建
+        self.float_dataset = FloatDataset(os.path.join(os.path.dirname(file_path), 'float_dataset.csv'))
+        self._float_index = (None, None)
+        # 每日净值序列保存在数据文件旁
+        self.nav_store = NavStore(os.path.join(os.path.dirname(file_path), f"{root}_nav.bin"))
+        # 商品分类：查询缓存中的 type_code / sub_type_code 列按它编码
+        self.taxonomy = get_taxonomy()
         self._ensure_file_exists()
         # 初始化时加载缓存
         self._load_cache()
+        # 主文件只保留今年的已售记录
+        try:
+            self.archive_sold_items()
+        except Exception as e:
+            print(f"归档已售记录时出错: {str(e)}")
 
     def _ensure_file_exists(self):
         """确保文件存在，不存在则创建。
         该方法会检查指定路径下的文件是否存在，
         如果文件或目录不存在，则会创建相应的目录和文件。
         """ 
-        if not os.path.exists(os.path.dirname(self.file_path)):
-            os.makedirs(os.path.dirname(self.file_path))
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
         
         if not os.path.exists(self.file_path):
             # 定义基础属性（两个表共用的属性）
@@ -73,29 +158,48 @@ class ItemModel:
             data_gather_df = pd.DataFrame(data_gather_columns)
             
             # 保存到Excel
-            with pd.ExcelWriter(self.file_path) as writer:
-                inventory_df.to_excel(writer, sheet_name=self.inventory_sheet, index=False)
-                sold_items_df.to_excel(writer, sheet_name=self.sold_items_sheet, index=False)
-                data_gather_df.to_excel(writer, sheet_name=self.data_gather_sheet, index=False)
+            write_sheets(self.file_path, {
+                self.inventory_sheet: inventory_df,
+                self.sold_items_sheet: sold_items_df,
+                self.data_gather_sheet: data_gather_df,
+                self.cash_flows_sheet: pd.DataFrame(columns=self.CASH_FLOW_COLUMNS),
+            })
 
-    def _load_cache(self):
-        """从文件加载数据到内存缓存"""
+    def _load_cache(self, sheets=None):
+        """从文件加载数据到内存缓存。
+        sheets为None时加载全部工作表，否则只重新加载指定的工作表。
+        """
         try:
-            with pd.ExcelFile(self.file_path) as xls:
-                self._inventory_cache = pd.read_excel(xls, self.inventory_sheet)
-                self._sold_items_cache = pd.read_excel(xls, self.sold_items_sheet)
-                
-                # 检查是否需要创建或迁移data_gather表
-                if self.data_gather_sheet not in xls.sheet_names:
-                    self._create_data_gather_sheet()
-                else:
-                    self._data_gather_cache = pd.read_excel(xls, self.data_gather_sheet)
-                    
-            self._cache_is_dirty = False
+            with self._lock.shared():
+                # 记录读取时的文件签名，外部程序修改文件但没有更新版本戳时，下次对比能识别出来
+                stamp = dict(self._read_stamp(), signature=self._file_signature())
+                requested = list(sheets or self._sheet_caches)
+                # 流式读取，多个工作表的大文件并行解析
+                frames = read_sheets(self.file_path, requested)
+            for sheet in requested:
+                if sheet == self.data_gather_sheet and sheet not in frames:
+                    continue
+                if sheet == self.cash_flows_sheet and sheet not in frames:
+                    # 旧数据文件没有流水表，下次保存时会创建
+                    self._cash_flows_cache = pd.DataFrame(columns=self.CASH_FLOW_COLUMNS)
+                    continue
+                setattr(self, self._sheet_caches[sheet], frames[sheet])
+                self._versions[sheet] += 1
+            # 只重新加载部分工作表时，数据统计表已在之前加载
+            has_data_gather = self.data_gather_sheet in frames or self.data_gather_sheet not in requested
+            self._stamp = stamp
+
+            # 检查是否需要创建或迁移data_gather表
+            if not has_data_gather:
+                self._create_data_gather_sheet()
+            else:
+                self._cache_is_dirty = bool(self._dirty_sheets)
         except Exception as e:
             print(f"加载缓存时出错: {str(e)}")
             self._inventory_cache = pd.DataFrame()
             self._sold_items_cache = pd.DataFrame()
+            self._cash_flows_cache = pd.DataFrame(columns=self.CASH_FLOW_COLUMNS)
+            self._bump_versions(self._sheet_caches)
             self._create_data_gather_sheet()
 
     def _create_data_gather_sheet(self):
@@ -104,20 +208,20 @@ class ItemModel:
             # 计算现有数据的统计信息
             total_investment = 0.0  # 初始总投资为0
             
-            # 计算总收益（从已售出商品）
-            total_profit = self._sold_items_cache['total_profit'].sum() if not self._sold_items_cache.empty else 0.0
+            # 计算总收益（从已售出商品，包括已归档的往年记录）
+            total_profit = self.get_sold_summary()['total_profit']
             
             # 计算剩余金额（总投资 + 总收益 - 在途资金）
             in_stock_amount = self._inventory_cache['buy_price'].sum() if not self._inventory_cache.empty else 0.0
             remaining_amount = total_investment + total_profit - in_stock_amount
             
             # 创建数据统计表
+            self._mark_dirty(self.data_gather_sheet)
             self._data_gather_cache = pd.DataFrame({
                 'name': ['total_investment', 'total_profit', 'remaining_amount', 'total_fee'],
                 'value': [total_investment, total_profit, remaining_amount, 0.0]
             })
             
-            self._cache_is_dirty = True
             self._save_cache_to_file()
         except Exception as e:
             print(f"创建统计数据表时出错: {str(e)}")
@@ -127,41 +231,534 @@ class ItemModel:
                 'value': [0.0, 0.0, 0.0, 0.0]
             })
 
-    def _save_cache_to_file(self):
-        """将缓存写入文件（仅在缓存被修改时）"""
-        if not self._cache_is_dirty:
+    def _save_cache_to_file(self, strict=False):
+        """将缓存写入文件（仅在缓存被修改时）。
+        写入前获取文件锁并检查版本戳，如果文件已被其他进程修改，
+        只重新加载发生变化的工作表，并在其上重放本地未写入的操作（乐观并发）。
+        先写入临时文件再替换原文件，写入中途出错不会留下损坏的数据文件。
+        事务进行中时不写入，由事务提交时统一写入。
+        strict为True时，重放中出现冲突会抛出ValueError而不是丢弃该操作。
+        """
+        if not self._cache_is_dirty or self._transaction_depth > 0:
             return
         
         try:
-            with pd.ExcelWriter(self.file_path, engine='openpyxl') as writer:
-                self._inventory_cache.to_excel(writer, sheet_name=self.inventory_sheet, index=False)
-                self._sold_items_cache.to_excel(writer, sheet_name=self.sold_items_sheet, index=False)
-                self._data_gather_cache.to_excel(writer, sheet_name=self.data_gather_sheet, index=False)
+            with self._lock:
+                changed_sheets = self._get_changed_sheets()
+                if changed_sheets:
+                    self._rebase_pending_ops(changed_sheets, strict)
+
+                with atomic_write_path(self.file_path) as tmp_path:
+                    write_sheets(tmp_path, {sheet: getattr(self, attr)
+                                            for sheet, attr in self._sheet_caches.items()})
+                self._write_stamp(self._dirty_sheets)
+            if METRICS.enabled:
+                METRICS.count('bytes_written.inventory', os.path.getsize(self.file_path))
+            self._pending_ops = []
+            self._dirty_sheets = set()
+            self._base_frames = {}
             self._cache_is_dirty = False
         except Exception as e:
             print(f"保存缓存到文件时出错: {str(e)}")
             raise
 
-    def _read_inventory(self):
-        """从缓存读取库存数据"""
-        return self._inventory_cache.copy()
+    def _stamp_path(self):
+        """版本戳文件路径"""
+        return f"{self.file_path}.version"
 
-    def _read_sold_items(self):
-        """从缓存读取已售商品数据"""
-        return self._sold_items_cache.copy()
+    def _file_signature(self):
+        """数据文件的修改时间和大小，用于识别未更新版本戳的外部修改"""
+        try:
+            st = os.stat(self.file_path)
+            return [st.st_mtime_ns, st.st_size]
+        except OSError:
+            return None
 
-    def _save_inventory(self, df):
-        """保存库存数据到缓存"""
-        self._inventory_cache = df.copy()
-        self._cache_is_dirty = True
-        self._save_cache_to_file()
+    def _read_stamp(self):
+        """读取版本戳，不存在时根据文件签名生成一个初始版本戳"""
+        try:
+            with open(self._stamp_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'version': 0, 'sheets': {}, 'signature': self._file_signature()}
+
+    def _write_stamp(self, changed_sheets):
+        """写入新的版本戳（只递增被修改的工作表的版本号）"""
+        stamp = self._read_stamp()
+        stamp['version'] = stamp.get('version', 0) + 1
+        sheets = stamp.setdefault('sheets', {})
+        for sheet in changed_sheets:
+            sheets[sheet] = sheets.get(sheet, 0) + 1
+        stamp['signature'] = self._file_signature()
+
+        with atomic_write_path(self._stamp_path()) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stamp, f)
+        self._stamp = stamp
+
+    def _get_changed_sheets(self):
+        """对比磁盘上的版本戳，返回被其他进程修改过的工作表集合"""
+        stamp = self._read_stamp()
+        if self._stamp is None:
+            return set(self._sheet_caches)
+        if stamp.get('version') == self._stamp.get('version'):
+            if self._stamp.get('signature') != self._file_signature():
+                # 文件被不遵守版本戳的程序（如Excel）修改，无法判断具体工作表
+                return set(self._sheet_caches)
+            return set()
+        if stamp.get('signature') != self._file_signature():
+            # 版本戳写入后文件又被外部程序修改
+            return set(self._sheet_caches)
+        old_sheets = self._stamp.get('sheets', {})
+        return {
+            sheet for sheet, version in stamp.get('sheets', {}).items()
+            if sheet in self._sheet_caches and old_sheets.get(sheet) != version
+        }
 
-    def _save_sold_items(self, df):
-        """保存已售商品数据到缓存"""
-        self._sold_items_cache = df.copy()
+    def reload_if_changed(self):
+        """检测其他进程写入的修改，只重新加载发生变化的工作表。
+        本地还有未写入的操作时，会在新数据上重放这些操作。
+        返回是否重新加载了数据。
+        """
+        with self._lock.shared():
+            changed_sheets = self._get_changed_sheets()
+        if METRICS.enabled:
+            METRICS.cache_hit('model_sheets', not changed_sheets)
+        if not changed_sheets:
+            return False
+        # 在共享锁之外加载：_load_cache 自己在共享锁内读取工作表和版本戳，
+        # 之后可能需要创建数据统计表并保存（获取独占锁）
+        if self._pending_ops:
+            self._rebase_pending_ops(changed_sheets)
+        else:
+            self._load_cache(changed_sheets)
+        return True
+
+    def _rebase_pending_ops(self, changed_sheets, strict=False):
+        """用磁盘上的最新数据替换变化的工作表，并重放本地未写入的操作"""
+        # 未被外部修改的工作表恢复到上次同步时的状态，避免操作被重复应用
+        for sheet, frame in self._base_frames.items():
+            if sheet not in changed_sheets:
+                setattr(self, self._sheet_caches[sheet], frame)
+                self._bump_versions([sheet])
+
+        pending_ops = self._pending_ops
+        self._pending_ops = []
+        self._base_frames = {}
+        self._dirty_sheets = set()
+        self._load_cache(changed_sheets)
+
+        for op in pending_ops:
+            try:
+                self._apply_op(op)
+            except ValueError as e:
+                if strict:
+                    raise
+                print(f"重放操作 {op['op']} 时发生冲突，已丢弃: {str(e)}")
+
+    def _mark_dirty(self, sheet):
+        """标记工作表已修改，并记录其上次同步时的状态用于冲突重放"""
+        if sheet not in self._base_frames:
+            # data_gather会被原地修改，保存写时复制的浅复制；其余表的修改总是生成新的DataFrame
+            frame = getattr(self, self._sheet_caches[sheet])
+            self._base_frames[sheet] = share_frame(frame) if sheet == self.data_gather_sheet else frame
+        self._dirty_sheets.add(sheet)
         self._cache_is_dirty = True
+        self._bump_versions([sheet])
+
+    def _bump_versions(self, sheets):
+        """工作表的内存缓存已（或即将）被修改"""
+        for sheet in sheets:
+            self._versions[sheet] += 1
+
+    def _adjust_gather(self, name, delta):
+        """按增量修改数据统计表中的某一项"""
+        df = self._data_gather_cache
+        if 'name' not in df.columns or not (df['name'] == name).any():
+            row = pd.DataFrame({'name': [name], 'value': [0.0]})
+            df = pd.concat([df, row], ignore_index=True) if not df.empty else row
+            self._data_gather_cache = df
+        idx = df[df['name'] == name].index[0]
+        df.at[idx, 'value'] += delta
+
+    def _apply_op(self, op):
+        """将一个操作应用到内存缓存。
+        所有修改数据的公开方法都通过操作实现，未写入文件的操作会被记录下来，
+        以便在其他进程修改了文件时重放。冲突时抛出ValueError。
+        """
+        kind = op['op']
+        if kind == 'add_item':
+            item = op['item']
+            df = self._inventory_cache
+            if not df.empty and (df['inventory_id'] == item['inventory_id']).any():
+                raise ValueError(f"商品已存在: {item['inventory_id']}")
+            self._mark_dirty(self.inventory_sheet)
+            self._mark_dirty(self.data_gather_sheet)
+            self._inventory_cache = pd.concat([df, pd.DataFrame([item])], ignore_index=True)
+            self._adjust_gather('remaining_amount', -item['buy_price'])
+
+        elif kind == 'add_items':
+            df = self._inventory_cache
+            existing_ids = set(df['inventory_id']) if not df.empty else set()
+            new_items = []
+            for item in op['items']:
+                if item['inventory_id'] in existing_ids:
+                    print(f"商品已存在，跳过: {item['inventory_id']}")
+                    continue
+                existing_ids.add(item['inventory_id'])
+                new_items.append(item)
+            # 只保留实际添加的商品，撤销时只删除这些商品
+            op['items'] = new_items
+            if new_items:
+                self._mark_dirty(self.inventory_sheet)
+                self._mark_dirty(self.data_gather_sheet)
+                self._inventory_cache = pd.concat([df, pd.DataFrame(new_items)], ignore_index=True)
+                self._adjust_gather('remaining_amount', -sum(item['buy_price'] for item in new_items))
+
+        elif kind == 'remove_items':
+            df = self._inventory_cache
+            ids = [item['inventory_id'] for item in op['items']]
+            present = set(df['inventory_id']) if not df.empty else set()
+            missing = [inventory_id for inventory_id in ids if inventory_id not in present]
+            if missing:
+                raise ValueError(f"商品不在库存中: {', '.join(missing)}")
+            self._mark_dirty(self.inventory_sheet)
+            self._mark_dirty(self.data_gather_sheet)
+            self._inventory_cache = df[~df['inventory_id'].isin(ids)]
+            self._adjust_gather('remaining_amount', sum(item['buy_price'] for item in op['items']))
+
+        elif kind == 'unsell_item':
+            sold_item = op['sold_item']
+            inventory_id = sold_item['inventory_id']
+            sold_df = self._sold_items_cache
+            sold_mask = (sold_df['inventory_id'] == inventory_id) & \
+                (pd.to_datetime(sold_df['sell_time']).dt.floor('s') ==
+                 pd.Timestamp(sold_item['sell_time']).floor('s'))
+            if not sold_mask.any():
+                raise ValueError(f"已售记录不存在: {inventory_id}")
+            df = self._inventory_cache
+            if not df.empty and (df['inventory_id'] == inventory_id).any():
+                raise ValueError(f"商品已存在: {inventory_id}")
+            self._mark_dirty(self.inventory_sheet)
+            self._mark_dirty(self.sold_items_sheet)
+            self._mark_dirty(self.data_gather_sheet)
+            # 去掉已售表特有的字段，恢复为库存记录
+            item = {key: value for key, value in sold_item.items() if key not in self.SOLD_ONLY_COLUMNS}
+            drop_position = sold_mask.to_numpy().nonzero()[0][-1]
+            self._sold_items_cache = sold_df.drop(index=sold_df.index[drop_position])
+            self._inventory_cache = pd.concat([df, pd.DataFrame([item])], ignore_index=True)
+            self._adjust_gather('total_profit', -sold_item['total_profit'])
+            self._adjust_gather('remaining_amount', -(sold_item['sell_price'] + sold_item['extra_income']))
+
+        elif kind == 'sell_item':
+            sold_item = op['sold_item']
+            inventory_id = sold_item['inventory_id']
+            df = self._inventory_cache
+            if df.empty or not (df['inventory_id'] == inventory_id).any():
+                raise ValueError(f"商品不存在: {inventory_id}")
+            self._mark_dirty(self.inventory_sheet)
+            self._mark_dirty(self.sold_items_sheet)
+            self._mark_dirty(self.data_gather_sheet)
+            self._sold_items_cache = pd.concat(
+                [self._sold_items_cache, pd.DataFrame([sold_item])], ignore_index=True)
+            self._inventory_cache = df[df['inventory_id'] != inventory_id]
+            self._adjust_gather('total_profit', sold_item['total_profit'])
+            self._adjust_gather('remaining_amount', sold_item['sell_price'] + sold_item['extra_income'])
+
+        elif kind == 'sell_items':
+            sold_items = op['sold_items']
+            ids = [sold_item['inventory_id'] for sold_item in sold_items]
+            df = self._inventory_cache
+            present = set(df['inventory_id']) if not df.empty else set()
+            missing = [inventory_id for inventory_id in ids if inventory_id not in present]
+            if missing:
+                raise ValueError(f"商品不存在: {', '.join(missing[:10])}")
+            self._mark_dirty(self.inventory_sheet)
+            self._mark_dirty(self.sold_items_sheet)
+            self._mark_dirty(self.data_gather_sheet)
+            new_rows = pd.DataFrame(sold_items)
+            sold_df = self._sold_items_cache
+            self._sold_items_cache = pd.concat([sold_df, new_rows], ignore_index=True) \
+                if not sold_df.empty else new_rows
+            self._inventory_cache = df[~df['inventory_id'].isin(ids)]
+            self._adjust_gather('total_profit', float(new_rows['total_profit'].sum()))
+            self._adjust_gather('remaining_amount',
+                                float((new_rows['sell_price'] + new_rows['extra_income']).sum()))
+
+        elif kind == 'unsell_items':
+            sold_items = op['sold_items']
+            sold_df = self._sold_items_cache
+            # 按 (inventory_id, 售出时间) 找到要删除的已售记录；时间按秒比较，
+            # 旧记录写入Excel时毫秒以下的部分会被舍入
+            keys = pd.MultiIndex.from_arrays([[sold_item['inventory_id'] for sold_item in sold_items],
+                                              pd.to_datetime([sold_item['sell_time'] for sold_item in sold_items])
+                                              .floor('s')])
+            existing = pd.MultiIndex.from_arrays([sold_df['inventory_id'],
+                                                  pd.to_datetime(sold_df['sell_time']).dt.floor('s')]) \
+                if not sold_df.empty else keys[:0]
+            sold_mask = existing.isin(keys)
+            if sold_mask.sum() < len(keys):
+                raise ValueError("部分已售记录不存在")
+            df = self._inventory_cache
+            ids = [sold_item['inventory_id'] for sold_item in sold_items]
+            if not df.empty and df['inventory_id'].isin(ids).any():
+                raise ValueError("部分商品已在库存中")
+            self._mark_dirty(self.inventory_sheet)
+            self._mark_dirty(self.sold_items_sheet)
+            self._mark_dirty(self.data_gather_sheet)
+            restored = pd.DataFrame(sold_items).drop(columns=list(self.SOLD_ONLY_COLUMNS), errors='ignore')
+            self._sold_items_cache = sold_df[~sold_mask]
+            self._inventory_cache = pd.concat([df, restored], ignore_index=True) if not df.empty else restored
+            self._adjust_gather('total_profit', -sum(sold_item['total_profit'] for sold_item in sold_items))
+            self._adjust_gather('remaining_amount', -sum(sold_item['sell_price'] + sold_item['extra_income']
+                                                         for sold_item in sold_items))
+
+        elif kind == 'set_state':
+            df = self._inventory_cache
+            mask = df['inventory_id'].isin(op['inventory_ids']) & (df['goods_state'] == op['prev_state'])
+            if mask.any():
+                self._mark_dirty(self.inventory_sheet)
+                # 写时复制：只复制被修改的列，其他列仍与快照共享
+                df = share_frame(df)
+                df.loc[mask, 'goods_state'] = op['state']
+                self._inventory_cache = df
+
+        elif kind == 'adjust_gather':
+            self._mark_dirty(self.data_gather_sheet)
+            for name, delta in op['deltas'].items():
+                self._adjust_gather(name, delta)
+
+        elif kind == 'update_investment':
+            self._mark_dirty(self.data_gather_sheet)
+            self._adjust_gather('total_investment', op['amount'])
+            self._adjust_gather('remaining_amount', op['amount'])
+            self._record_cash_flow(op, 'investment')
+
+        elif kind == 'add_fee':
+            self._mark_dirty(self.data_gather_sheet)
+            self._adjust_gather('total_fee', op['amount'])
+            self._adjust_gather('remaining_amount', -op['amount'])
+            self._record_cash_flow(op, 'fee')
+
+        else:
+            raise ValueError(f"未知操作: {kind}")
+
+        if METRICS.enabled:
+            METRICS.count(f"ops.{kind}")
+            METRICS.count('rows_touched', len(op.get('items') or op.get('sold_items')
+                                              or op.get('inventory_ids') or [None]))
+        self._pending_ops.append(op)
+
+    def _record_cash_flow(self, op, kind):
+        """记录一条资金流水；撤销操作（revert）删除对应的原流水"""
+        if op.get('time') is None:
+            return
+        self._mark_dirty(self.cash_flows_sheet)
+        df = self._cash_flows_cache
+        if op.get('revert') and not df.empty:
+            match = ((df['kind'] == kind) & (pd.to_datetime(df['time']) == pd.Timestamp(op['time']))
+                     & ((df['amount'] + op['amount']).abs() < 1e-9)).to_numpy().nonzero()[0]
+            if len(match):
+                self._cash_flows_cache = df.drop(index=df.index[match[-1]])
+                return
+        row = pd.DataFrame({'time': [op['time']], 'kind': [kind], 'amount': [op['amount']]})
+        self._cash_flows_cache = pd.concat([df, row], ignore_index=True) if not df.empty else row
+
+    def _execute(self, op, undoable=True):
+        """应用操作并写入文件，可撤销的操作会记入撤销历史"""
+        self._apply_op(op)
+        if undoable:
+            if self._undo_group is not None:
+                self._undo_group.append(op)
+            else:
+                self._undo_stack.append([op])
+                self._redo_stack.clear()
         self._save_cache_to_file()
 
+    def _inverse_op(self, op):
+        """根据操作中记录的行和增量构造其逆操作"""
+        kind = op['op']
+        if kind == 'add_item':
+            return {'op': 'remove_items', 'items': [op['item']]}
+        if kind == 'add_items':
+            return {'op': 'remove_items', 'items': op['items']}
+        if kind == 'sell_item':
+            return {'op': 'unsell_item', 'sold_item': op['sold_item']}
+        if kind == 'sell_items':
+            return {'op': 'unsell_items', 'sold_items': op['sold_items']}
+        if kind == 'set_state':
+            return {'op': 'set_state', 'inventory_ids': op['inventory_ids'],
+                    'prev_state': op['state'], 'state': op['prev_state']}
+        if kind == 'adjust_gather':
+            return {'op': 'adjust_gather', 'deltas': {name: -delta for name, delta in op['deltas'].items()}}
+        if kind in ('update_investment', 'add_fee'):
+            return {'op': kind, 'amount': -op['amount'], 'time': op.get('time'), 'revert': True}
+        raise ValueError(f"操作不支持撤销: {kind}")
+
+    def _describe_op(self, op):
+        """操作的简短描述，用于界面提示"""
+        kind = op['op']
+        if kind == 'add_item':
+            return f"添加商品 {op['item']['goods_name']}"
+        if kind == 'add_items':
+            return f"批量添加 {len(op['items'])} 件商品"
+        if kind == 'sell_item':
+            return f"出售商品 {op['sold_item']['goods_name']}"
+        if kind == 'sell_items':
+            return f"批量出售 {len(op['sold_items'])} 件商品"
+        if kind == 'update_investment':
+            return f"调整总投资 {op['amount']:+.2f}"
+        if kind == 'add_fee':
+            return f"添加手续费 {op['amount']:.2f}"
+        if kind == 'adjust_gather':
+            return "修正数据统计"
+        return kind
+
+    def _describe_change(self, group):
+        """汇总一组操作影响的工作表和商品，供界面按需刷新"""
+        sheets = set()
+        inventory_ids = []
+        for op in group:
+            sheets.update(self._OP_SHEETS.get(op['op'], ()))
+            if 'item' in op:
+                inventory_ids.append(op['item']['inventory_id'])
+            elif 'sold_item' in op:
+                inventory_ids.append(op['sold_item']['inventory_id'])
+            elif op['op'] == 'add_items':
+                inventory_ids.extend(item['inventory_id'] for item in op['items'])
+            elif op['op'] == 'sell_items':
+                inventory_ids.extend(sold_item['inventory_id'] for sold_item in op['sold_items'])
+        return {
+            'description': '、'.join(self._describe_op(op) for op in group),
+            'sheets': sheets,
+            'inventory_ids': inventory_ids,
+        }
+
+    def can_undo(self):
+        return bool(self._undo_stack)
+
+    def can_redo(self):
+        return bool(self._redo_stack)
+
+    def undo(self):
+        """撤销最近一组操作。
+        通过逆操作恢复数据（不保存DataFrame快照），并一次性写入文件。
+        没有可撤销的操作时返回None；数据已被其他操作改变而无法撤销时抛出ValueError。
+        返回值包含描述、受影响的工作表和商品ID。
+        """
+        if not self._undo_stack:
+            return None
+        group = self._undo_stack[-1]
+        with self.transaction():
+            for op in reversed(group):
+                self._apply_op(self._inverse_op(op))
+        self._undo_stack.pop()
+        self._redo_stack.append(group)
+        return self._describe_change(group)
+
+    def redo(self):
+        """重做最近一次撤销的操作，返回值同undo"""
+        if not self._redo_stack:
+            return None
+        group = self._redo_stack[-1]
+        with self.transaction():
+            for op in group:
+                self._apply_op(op)
+        self._redo_stack.pop()
+        self._undo_stack.append(group)
+        return self._describe_change(group)
+
+    @contextmanager
+    def transaction(self):
+        """将多个操作合并为一个原子事务。
+
+        事务内的修改（库存、已售商品、数据统计）只保存在内存中，
+        正常退出时一次性写入文件；抛出异常时全部回滚并重新抛出异常。
+        支持嵌套，只有最外层事务会写入文件。
+
+        用法：
+            with model.transaction():
+                model.update_total_investment(1000)
+                model.add_fee(5)
+                model.sell_item(...)
+        """
+        if self._transaction_depth > 0:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        saved_state = self._capture_state()
+        self._transaction_depth = 1
+        # 事务内的可撤销操作合并为一组，撤销时一起撤销
+        self._undo_group = []
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth = 0
+            self._undo_group = None
+            self._restore_state(saved_state)
+            raise
+        self._transaction_depth = 0
+        group, self._undo_group = self._undo_group, None
+        try:
+            # 其他进程的修改与事务冲突时整个事务失败，不会只写入一部分
+            self._save_cache_to_file(strict=True)
+        except Exception:
+            self._restore_state(saved_state)
+            raise
+        if group:
+            self._undo_stack.append(group)
+            self._redo_stack.clear()
+
+    def _capture_state(self):
+        """记录内存缓存和未写入操作的状态，用于事务回滚"""
+        caches = {sheet: getattr(self, attr) for sheet, attr in self._sheet_caches.items()}
+        # data_gather会被原地修改，保存写时复制的浅复制；其余表的修改总是生成新的DataFrame
+        caches[self.data_gather_sheet] = share_frame(caches[self.data_gather_sheet])
+        return {
+            'caches': caches,
+            'pending_ops': list(self._pending_ops),
+            'dirty_sheets': set(self._dirty_sheets),
+            'base_frames': dict(self._base_frames),
+            'cache_is_dirty': self._cache_is_dirty,
+            # 提交时可能先重新加载了其他进程修改的工作表，回滚后缓存又回到旧数据，
+            # 版本戳也要恢复，下次同步时才会重新加载这些工作表
+            'stamp': self._stamp,
+        }
+
+    def _restore_state(self, state):
+        """回滚到_capture_state记录的状态"""
+        for sheet, frame in state['caches'].items():
+            setattr(self, self._sheet_caches[sheet], frame)
+        self._bump_versions(self._sheet_caches)
+        self._pending_ops = state['pending_ops']
+        self._dirty_sheets = state['dirty_sheets']
+        self._base_frames = state['base_frames']
+        self._cache_is_dirty = state['cache_is_dirty']
+        self._stamp = state['stamp']
+
+    def _read_inventory(self):
+        """从缓存读取库存数据（写时复制的浅复制，不复制数据）"""
+        return share_frame(self._inventory_cache)
+
+    def _read_sold_items(self):
+        """从缓存读取已售商品数据（写时复制的浅复制，不复制数据）"""
+        return share_frame(self._sold_items_cache)
+
+    def snapshot(self):
+        """当前数据的只读快照（见 models/snapshot.py），数据修改前返回同一个对象"""
+        snapshot = self._snapshot
+        if METRICS.enabled:
+            METRICS.cache_hit('snapshot', snapshot is not None and snapshot.is_current(self._versions))
+        if snapshot is None or not snapshot.is_current(self._versions):
+            snapshot = ModelSnapshot(self._versions, {sheet: getattr(self, attr)
+                                                      for sheet, attr in self._sheet_caches.items()})
+            self._snapshot = snapshot
+        return snapshot
+
     def _generate_inventory_id(self, buy_time, goods_wear_value):
         """生成商品唯一ID。
         该方法根据购买时间和磨损值生成一个唯一的商品ID，
@@ -185,6 +782,41 @@ class ItemModel:
             buy_price (float): 购买价格
             buy_time (datetime, optional): 购买时间，默认为当前时间
         """
+        new_item = self._build_item(goods_name, goods_type, sub_type, goods_wear, goods_wear_value,
+                                    is_stattrak, buy_price, buy_time)
+        
+        try:
+            # 添加新商品并更新剩余金额
+            self._execute({'op': 'add_item', 'item': new_item})
+            return True
+        except Exception as e:
+            print(f"添加商品时出错: {str(e)}")
+            return False
+
+    def add_items(self, items):
+        """批量添加商品到库存，所有商品只写入一次文件。
+        
+        Args:
+            items (list[dict]): 每个元素的键与add_item的参数相同
+        
+        Returns:
+            int: 实际添加的商品数量（与库存中已有ID重复的商品会被跳过）
+        """
+        new_items = [self._build_item(**item) for item in items]
+        if not new_items:
+            return 0
+        
+        try:
+            count_before = len(self._inventory_cache)
+            self._execute({'op': 'add_items', 'items': new_items})
+            return len(self._inventory_cache) - count_before
+        except Exception as e:
+            print(f"批量添加商品时出错: {str(e)}")
+            return 0
+
+    def _build_item(self, goods_name, goods_type, sub_type, goods_wear, goods_wear_value,
+                    is_stattrak=False, buy_price=None, buy_time=None):
+        """构造一条新的库存记录"""
         if buy_time is None:
             buy_time = datetime.now()
             
@@ -192,7 +824,7 @@ class ItemModel:
         inventory_id = self._generate_inventory_id(buy_time, goods_wear_value)
         
         # 创建新商品数据
-        new_item = {
+        return {
             'inventory_id': inventory_id,
             'goods_name': goods_name,
             'goods_type': goods_type,
@@ -204,59 +836,50 @@ class ItemModel:
             'buy_time': buy_time,
             'goods_state': self.STATUS_COOLING,  # 新添加的商品默认为冷却期
         }
-        
-        try:
-            # 读取现有数据
-            df = self._read_inventory()
-            
-            # 添加新商品
-            df = pd.concat([df, pd.DataFrame([new_item])], ignore_index=True)
-            
-            # 保存数据
-            self._save_inventory(df)
-            
-            # 更新剩余金额
-            data_gather_df = self._data_gather_cache
-            remaining_amount_idx = data_gather_df[data_gather_df['name'] == 'remaining_amount'].index[0]
-            data_gather_df.at[remaining_amount_idx, 'value'] -= buy_price
-            self._cache_is_dirty = True
-            self._save_cache_to_file()
-                
-            return True
-        except Exception as e:
-            print(f"添加商品时出错: {str(e)}")
-            return False
 
     def check_cooling_items(self):
         """检查并更新冷却中的商品状态。
-        此方法会遍历所有冷却中的商品，
-        检查当前时间是否超过冷却期结束时间，
-        如果超过，则将商品状态更新为持有中。
+        此方法会批量计算所有冷却中商品的冷却期结束时间，
+        如果当前时间已超过结束时间，则将商品状态更新为持有中。
+        返回本次转为持有中的商品数量。
         
-        冷却期规则：
-        1. 如果在当天16:00前购买，冷却期在第7天的16:00结束
-        2. 如果在当天16:00后购买，冷却期在第8天的16:00结束
+        冷却期规则见 get_cooling_end_time。
         """ 
-        df = self._read_inventory()
-        
-        # 获取所有冷却中的商品
-        cooling_items = df[df['goods_state'] == self.STATUS_COOLING]
-        if cooling_items.empty:
-            return
-        
-        current_time = datetime.now()
-        updated = False
-        
-        for idx, item in cooling_items.iterrows():
-            buy_time = pd.to_datetime(item['buy_time'])
-            cooling_end = self.get_cooling_end_time(buy_time)
-            
-            if current_time >= cooling_end:
-                df.at[idx, 'goods_state'] = self.STATUS_HOLDING
-                updated = True
+        return len(self.release_cooling_items())
+
+    def get_cooling_schedule(self, inventory_ids=None):
+        """获取冷却中商品的冷却期结束时间。
+        返回以inventory_id为索引的Series，inventory_ids不为None时只包含其中仍在冷却的商品。
+        """
+        df = self._inventory_cache
+        if df is None or df.empty:
+            return pd.Series([], dtype='datetime64[ns]')
+        mask = df['goods_state'] == self.STATUS_COOLING
+        if inventory_ids is not None:
+            mask &= df['inventory_id'].isin(list(inventory_ids))
+        cooling_items = df[mask]
+        cooling_end = self.get_cooling_end_times(cooling_items['buy_time'], cooling_items['goods_type'])
+        return pd.Series(cooling_end, index=cooling_items['inventory_id'].to_numpy())
+
+    def release_cooling_items(self, inventory_ids=None, now=None):
+        """将冷却期已结束的商品转为持有中，返回转换的inventory_id列表。
+        inventory_ids为None时检查所有冷却中的商品，否则只检查给定的商品（定时器到期时使用）。
+        """
+        schedule = self.get_cooling_schedule(inventory_ids)
+        if schedule.empty:
+            return []
+        now = pd.Timestamp(now or datetime.now())
+        expired_ids = schedule.index[schedule.to_numpy() <= now.to_datetime64()].tolist()
         
-        if updated:
-            self._save_inventory(df)
+        if expired_ids:
+            # 冷却期结束是自动发生的，不记入撤销历史
+            self._execute({
+                'op': 'set_state',
+                'inventory_ids': expired_ids,
+                'prev_state': self.STATUS_COOLING,
+                'state': self.STATUS_HOLDING,
+            }, undoable=False)
+        return expired_ids
 
     def get_item_status_text(self, status_code):
         """获取商品状态的文本描述。
@@ -270,10 +893,10 @@ class ItemModel:
         }
         return status_map.get(status_code, "未知状态")
 
-    def get_cooling_end_time(self, buy_time):
+    def get_cooling_end_time(self, buy_time, goods_type=None):
         """
         计算冷却期结束时间
-        规则：
+        默认规则（可在config/cooling_rules.py中修改截止时间、天数、时区，并按商品类型覆盖）：
         1. 如果在当天16:00前购买，冷却期在第7天的16:00结束
         2. 如果在当天16:00后购买，冷却期在第8天的16:00结束
         
@@ -283,24 +906,11 @@ class ItemModel:
         - 1月1日17:23购买 -> 1月8日16:00结束
         - 1月2日15:00购买 -> 1月8日16:00结束
         """ 
-        if isinstance(buy_time, str):
-            buy_time = pd.to_datetime(buy_time)
-        
-        # 获取购买当天16:00的时间点
-        cutoff_time = buy_time.replace(hour=16, minute=0, second=0, microsecond=0)
-        
-        # 确定基础等待天数
-        if buy_time <= cutoff_time:
-            days_to_add = 7
-        else:
-            days_to_add = 8
-        
-        # 计算结束时间（第N天的16:00）
-        end_date = (buy_time + timedelta(days=days_to_add)).replace(
-            hour=16, minute=0, second=0, microsecond=0
-        )
-        
-        return end_date
+        return self.cooling_rules.end_time(pd.to_datetime(buy_time), goods_type)
+
+    def get_cooling_end_times(self, buy_times, goods_types=None):
+        """get_cooling_end_time的向量化版本（查预先计算的日历），返回与buy_times等长的DatetimeIndex"""
+        return self.cooling_rules.end_times(buy_times, goods_types)
 
     def can_sell_item(self, inventory_id):
         """检查商品是否可以出售。
@@ -326,10 +936,10 @@ class ItemModel:
         如果可以出售，则将商品信息复制到已售商品表中，
         并更新原商品状态为已售出。
         """ 
-        if sell_time is None:
-            sell_time = datetime.now()
+        # 售出时间精确到秒，写入Excel再读回后撤销操作仍能按时间找到这条记录
+        sell_time = self._flow_time(sell_time)
 
-        inventory_df = self._read_inventory()
+        inventory_df = self._inventory_cache
         item = inventory_df[inventory_df['inventory_id'] == inventory_id].iloc[0]
         
         # 计算持有天数和总收益
@@ -345,35 +955,122 @@ class ItemModel:
         sold_item['total_profit'] = total_profit
         
         try:
-            # 更新已售商品表
-            sold_df = self._read_sold_items()
-            sold_df = pd.concat([sold_df, pd.DataFrame([sold_item])], ignore_index=True)
-            self._save_sold_items(sold_df)
-            
-            # 从库存中删除
-            inventory_df = inventory_df[inventory_df['inventory_id'] != inventory_id]
-            self._save_inventory(inventory_df)
-            
-            # 更新数据统计
-            data_gather_df = self._data_gather_cache
-            total_profit_idx = data_gather_df[data_gather_df['name'] == 'total_profit'].index[0]
-            remaining_amount_idx = data_gather_df[data_gather_df['name'] == 'remaining_amount'].index[0]
-            
-            data_gather_df.at[total_profit_idx, 'value'] += total_profit
-            data_gather_df.at[remaining_amount_idx, 'value'] += sell_price + extra_income
-            
-            self._cache_is_dirty = True
-            self._save_cache_to_file()
-            
+            # 写入已售商品表、从库存中删除并更新数据统计
+            self._execute({'op': 'sell_item', 'sold_item': sold_item.to_dict()})
             return True, "商品售出成功"
         except Exception as e:
             return False, f"售出商品时出错: {str(e)}"
 
-    def get_sold_items(self):
+    def sell_items(self, sales):
+        """批量出售商品，所有记录只写入一次文件，作为一个可撤销的操作。
+
+        Args:
+            sales (list[dict]): 每个元素包含 inventory_id、sell_price，可选 extra_income、sell_time
+
+        Returns:
+            int: 实际出售的商品数量（不在库存中的商品会被跳过）
+        """
+        if not sales:
+            return 0
+        inventory_df = self._inventory_cache
+        sales_df = pd.DataFrame(sales).drop_duplicates('inventory_id', keep='last')
+        if 'extra_income' not in sales_df.columns:
+            sales_df['extra_income'] = 0
+        if 'sell_time' not in sales_df.columns:
+            sales_df['sell_time'] = datetime.now()
+        sales_df['extra_income'] = sales_df['extra_income'].fillna(0)
+        sales_df['sell_time'] = pd.to_datetime(sales_df['sell_time'].fillna(datetime.now())).dt.floor('s')
+        sold_df = inventory_df.merge(sales_df[['inventory_id', 'sell_price', 'extra_income', 'sell_time']],
+                                     on='inventory_id', how='inner')
+        skipped = len(sales_df) - len(sold_df)
+        if skipped:
+            print(f"{skipped} 件商品不在库存中，已跳过")
+        if sold_df.empty:
+            return 0
+
+        sold_df['hold_days'] = (pd.to_datetime(sold_df['sell_time']) - pd.to_datetime(sold_df['buy_time'])).dt.days
+        sold_df['total_profit'] = sold_df['sell_price'] + sold_df['extra_income'] - sold_df['buy_price']
+        try:
+            self._execute({'op': 'sell_items', 'sold_items': sold_df.to_dict('records')})
+            return len(sold_df)
+        except Exception as e:
+            print(f"批量出售商品时出错: {str(e)}")
+            return 0
+
+    def get_sold_items(self, years=None):
         """获取已售商品列表。
-        该方法从已售商品表中读取所有商品信息。
+        该方法从已售商品表中读取商品信息。
+        默认返回全部记录，往年的记录从归档分区按需加载；
+        years为年份列表时只返回这些年份的记录（只加载对应的分区）。
         """ 
-        return self._read_sold_items()
+        df = self._read_sold_items()
+        archive_years = self._archive.years()
+        if years is not None:
+            if not df.empty:
+                df = df[pd.to_datetime(df['sell_time']).dt.year.isin(years)]
+            archive_years = [year for year in archive_years if year in years]
+        if not archive_years:
+            return df
+        archived = self._archive.load_all(archive_years)
+        if df.empty:
+            return share_frame(archived)
+        return pd.concat([archived, df], ignore_index=True)
+
+    def get_sold_years(self):
+        """有售出记录的年份（降序）"""
+        years = set(self._archive.years())
+        if not self._sold_items_cache.empty:
+            years.update(int(year) for year in pd.to_datetime(self._sold_items_cache['sell_time']).dt.year.unique())
+        return sorted(years, reverse=True)
+
+    def get_sold_summary(self):
+        """已售商品的汇总数据：数量、总收益、持有天数之和、按类型和按天的收益。
+        归档分区使用索引中预先计算的汇总，不需要加载分区文件。
+        """
+        return merge_summaries([self._archive.aggregates(), summarize_sold(self._sold_items_cache)])
+
+    def archive_sold_items(self, before_year=None):
+        """把售出时间早于before_year（默认今年）的记录移到按年份分区的归档文件。
+        每个年份写入一个新的分区文件，主数据文件只保留较新的记录。
+        返回归档的记录条数。
+        """
+        if before_year is None:
+            before_year = datetime.now().year
+        df = self._sold_items_cache
+        if df is None or df.empty:
+            return 0
+
+        with self._lock:
+            # 先同步并写入其他修改，归档期间持有锁，不会有其他进程写入
+            self.reload_if_changed()
+            self._save_cache_to_file()
+            df = self._sold_items_cache
+            years = pd.to_datetime(df['sell_time']).dt.year
+            mask = years < before_year
+            if not mask.any():
+                return 0
+
+            archived = 0
+            for year, part in df[mask].groupby(years[mask]):
+                part = self._drop_already_archived(int(year), part)
+                if not part.empty:
+                    self._archive.write_partition(int(year), part)
+                    archived += len(part)
+
+            # 分区和索引写入后再从主文件删除，中途出错时最多留下重复记录，下次归档时去重
+            self._mark_dirty(self.sold_items_sheet)
+            self._sold_items_cache = df[~mask].reset_index(drop=True)
+            self._save_cache_to_file()
+        return archived
+
+    def _drop_already_archived(self, year, part):
+        """去掉已经存在于该年份归档中的记录（上次归档中途失败时会出现）"""
+        if year not in self._archive.years():
+            return part
+        existing = self._archive.load(year)
+        keys = set(zip(existing['inventory_id'], pd.to_datetime(existing['sell_time'])))
+        duplicated = [key in keys for key in zip(part['inventory_id'], pd.to_datetime(part['sell_time']))]
+        return part[[not flag for flag in duplicated]]
 
     def get_inventory_items(self):
         """获取库存商品列表。
@@ -381,31 +1078,95 @@ class ItemModel:
         状态排序顺序：持有中 -> 冷却期 -> 已出售
         时间排序：最近的在前
         """ 
-        df = self._read_inventory()
-        if df.empty:
-            return df
+        return share_frame(self.query(self.inventory_sheet)[0])
 
-        # 创建状态优先级映射
-        status_priority = {
-            self.STATUS_HOLDING: 0,  # 持有中排第一
-            self.STATUS_COOLING: 1,  # 冷却期排第二
-            self.STATUS_SOLD: 2      # 已出售排第三
-        }
-        
-        # 添加状态优先级列
-        df['status_priority'] = df['goods_state'].map(status_priority)
-        
-        # 确保buy_time是datetime类型
-        df['buy_time'] = pd.to_datetime(df['buy_time'])
-        
-        # 按状态优先级和购买时间排序（时间倒序）
-        df = df.sort_values(['status_priority', 'buy_time'], 
-                        ascending=[True, False])
-        
-        # 删除辅助列
-        df = df.drop('status_priority', axis=1)
-        
-        return df
+    def query(self, table='inventory', where=None, order_by=None, offset=0, limit=None, years=None):
+        """查询库存或已售商品，只返回需要的一页。
+
+        条件在缓存的等值索引和类型化的列上计算，排序结果在数据修改前一直复用，
+        条件和排序的写法见 models/query.py。
+
+        Args:
+            table (str): 'inventory' 或 'sold_items'
+            where (dict, optional): 筛选条件
+            order_by (list, optional): 排序方式；库存表默认按状态（持有中在前）和购买时间倒序，
+                已售表默认保持原顺序。库存表可以使用派生列 status_priority
+            offset (int): 跳过的行数
+            limit (int, optional): 最多返回的行数
+            years (list, optional): 已售表只查询这些售出年份（默认全部，需要时加载归档分区）
+
+        Returns:
+            tuple: (当前页的DataFrame, 满足条件的总行数)；返回的DataFrame不要原地修改
+        """
+        return self._table_query(table, years).run(where, order_by, offset, limit)
+
+    def _table_query(self, table, years=None):
+        """获取当前数据版本的查询缓存"""
+        if table == self.inventory_sheet:
+            key = (self._versions[table],)
+        elif table == self.sold_items_sheet:
+            partitions = tuple(partition['file'] for partition in self._archive.partitions())
+            key = (self._versions[table], None if years is None else tuple(sorted(years)), partitions)
+        else:
+            raise ValueError(f"不支持查询的表: {table}")
+
+        cached = self._queries.get(table)
+        if METRICS.enabled:
+            METRICS.cache_hit('query', cached is not None and cached[0] == key)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        if table == self.inventory_sheet:
+            df = share_frame(self._inventory_cache)
+            if not df.empty:
+                df['buy_time'] = pd.to_datetime(df['buy_time'])
+            query = TableQuery(
+                df,
+                derived={'status_priority': lambda frame: frame['goods_state'].map(self.STATUS_PRIORITY),
+                         **self.taxonomy.derived_columns()},
+                default_order=[('status_priority', True), ('buy_time', False)] if not df.empty else None,
+            )
+        else:
+            df = self.get_sold_items(years)
+            for column in ('buy_time', 'sell_time'):
+                if not df.empty:
+                    df[column] = pd.to_datetime(df[column])
+            query = TableQuery(df, derived=self.taxonomy.derived_columns())
+        self._queries[table] = (key, query)
+        return query
+
+    def _float_samples(self):
+        """参与磨损值排名的本账户记录（库存和已售记录中的同一件商品只计一次）"""
+        columns = ['inventory_id', 'goods_name', 'goods_wear', 'goods_wear_value']
+        frames = [df[columns] for df in (self._inventory_cache, self.get_sold_items())
+                  if df is not None and not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True).drop_duplicates('inventory_id')
+
+    def get_float_index(self):
+        """磨损值排名索引（库存、已售记录和导入的磨损值数据），数据修改前一直复用"""
+        partitions = tuple(partition['file'] for partition in self._archive.partitions())
+        key = (self._versions[self.inventory_sheet], self._versions[self.sold_items_sheet],
+               partitions, self.float_dataset.signature())
+        if METRICS.enabled:
+            METRICS.cache_hit('float_index', self._float_index[0] == key)
+        if self._float_index[0] != key:
+            self._float_index = (key, FloatIndex([self._float_samples(), self.float_dataset.load()]))
+        return self._float_index[1]
+
+    def get_float_ranks(self, df=None):
+        """批量计算每件商品的磨损值在同类饰品（名称+磨损等级）中的排名。
+        返回与df同索引的DataFrame：rank（1为最低磨损）、count（同类记录数）、percentile。
+        """
+        df = self._inventory_cache if df is None else df
+        return self.get_float_index().ranks(df)
+
+    def get_nav_series(self, mapping=None, now=None, rebuild=False):
+        """每日净值记录（见 models/nav_series.py），只计算缺少的日期和今天；
+        rebuild为True时按当前数据重新回填全部历史（如补录了以前的交易）。
+        """
+        return update_nav(self, mapping, self.nav_store, now, rebuild)
 
     def get_current_price(self, inventory_id):  
         """获取商品当前价格
@@ -422,47 +1183,55 @@ class ItemModel:
         item = self.get_item_by_id(item_id)
         if not item:
             return ""
+        return self.get_time_infos(pd.DataFrame([item])).iloc[0]
 
-        now = pd.Timestamp.now()
-        buy_time = pd.to_datetime(item['buy_time'])
-        cooling_end = self.get_cooling_end_time(buy_time)
-        
-        if item['goods_state'] == self.STATUS_COOLING:
-            remaining = cooling_end - now
-            if remaining.total_seconds() > 0:
-                days = remaining.days
-                hours = remaining.seconds // 3600
-                minutes = (remaining.seconds % 3600) // 60
+    def get_time_infos(self, df=None, now=None):
+        """批量获取商品的时间信息（冷却剩余时间或已持有时间），返回与df同索引的Series。
+        冷却期结束时间通过规则日历批量查表，库存表刷新时整表只计算一次。
+        """
+        df = self._inventory_cache if df is None else df
+        if df.empty:
+            return pd.Series([], index=df.index, dtype=object)
+
+        now = pd.Timestamp(now or datetime.now())
+        cooling_end = self.get_cooling_end_times(df['buy_time'], df['goods_type'])
+        # 冷却中为距冷却结束的时间，持有中为距冷却结束已过去的时间
+        delta = (cooling_end - now).to_numpy(dtype='timedelta64[s]').astype(np.int64)
+        states = df['goods_state'].to_numpy()
+
+        texts = []
+        for state, seconds in zip(states, delta):
+            if state == self.STATUS_COOLING:
+                if seconds > 0:
+                    days, rest = divmod(int(seconds), 86400)
+                    hours, minutes = rest // 3600, (rest % 3600) // 60
+                    if days > 0:
+                        texts.append(f"(剩余 {days}天{hours}小时)")
+                    elif hours > 0:
+                        texts.append(f"(剩余 {hours}小时{minutes}分)")
+                    else:
+                        texts.append(f"(剩余 {minutes}分钟)")
+                else:
+                    texts.append("(冷却已结束)")
+            elif state == self.STATUS_HOLDING:
+                # 从冷却期结束时间开始计算持有时长
+                days, rest = divmod(-int(seconds), 86400)
+                hours = rest // 3600
                 if days > 0:
-                    return f"(剩余 {days}天{hours}小时)"
-                elif hours > 0:
-                    return f"(剩余 {hours}小时{minutes}分)"
+                    texts.append(f"(已持有 {days}天{hours}小时)")
                 else:
-                    return f"(剩余 {minutes}分钟)"
+                    texts.append(f"(已持有 {hours}小时)")
             else:
-                return "(冷却已结束)"
-        
-        elif item['goods_state'] == self.STATUS_HOLDING:
-            # 从冷却期结束时间开始计算持有时长
-            holding_time = now - cooling_end
-            days = holding_time.days
-            hours = holding_time.seconds // 3600
-            if days > 0:
-                return f"(已持有 {days}天{hours}小时)"
-            else:
-                return f"(已持有 {hours}小时)"
-        
-        return ""
+                texts.append("")
+        return pd.Series(texts, index=df.index, dtype=object)
 
     def get_item_by_id(self, item_id):
         """获取商品信息"""
-        df = self._read_inventory()
-        item_mask = df['inventory_id'] == item_id
-        
-        if not item_mask.any():
+        items, total = self.query(self.inventory_sheet, where={'inventory_id': item_id}, order_by=[], limit=1)
+        if total == 0:
             return None
             
-        return df[item_mask].iloc[0].to_dict()
+        return items.iloc[0].to_dict()
 
     def get_data_statistics(self):
         """获取数据统计信息"""
@@ -491,26 +1260,43 @@ class ItemModel:
         
         return stats
 
-    def update_total_investment(self, amount_change):
-        """更新总投资额"""
-        df = self._data_gather_cache
-        total_investment_idx = df[df['name'] == 'total_investment'].index[0]
-        remaining_amount_idx = df[df['name'] == 'remaining_amount'].index[0]
-        
-        df.at[total_investment_idx, 'value'] += amount_change
-        df.at[remaining_amount_idx, 'value'] += amount_change
-        
-        self._cache_is_dirty = True
-        self._save_cache_to_file()
+    def recompute_data_gather(self):
+        """根据库存表和已售商品表重新计算总收益和剩余金额。
+        总投资和手续费无法从表中推导，保持不变。
+        以增量的形式写入，与其他进程的修改可以正确合并。
+        返回各项的修正量。
+        """
+        stats = self.get_data_statistics()
+        total_profit = self.get_sold_summary()['total_profit']
+        remaining_amount = (stats['total_investment'] + total_profit
+                            - stats['total_fee'] - float(stats['purchase_market_value']))
+        deltas = {
+            'total_profit': total_profit - stats['total_profit'],
+            'remaining_amount': remaining_amount - stats['remaining_amount'],
+        }
+        deltas = {name: delta for name, delta in deltas.items() if abs(delta) > 1e-9}
+        if deltas:
+            self._execute({'op': 'adjust_gather', 'deltas': deltas})
+        return deltas
 
-    def add_fee(self, fee_amount):
-        """添加手续费"""
-        df = self._data_gather_cache
-        total_fee_idx = df[df['name'] == 'total_fee'].index[0]
-        remaining_amount_idx = df[df['name'] == 'remaining_amount'].index[0]
-        
-        df.at[total_fee_idx, 'value'] += fee_amount
-        df.at[remaining_amount_idx, 'value'] -= fee_amount
-        
-        self._cache_is_dirty = True
-        self._save_cache_to_file()
+    def update_total_investment(self, amount_change, time=None):
+        """更新总投资额（同时记录一条资金流水）"""
+        self._execute({'op': 'update_investment', 'amount': amount_change,
+                       'time': self._flow_time(time)})
+
+    def add_fee(self, fee_amount, time=None):
+        """添加手续费（同时记录一条资金流水）"""
+        self._execute({'op': 'add_fee', 'amount': fee_amount, 'time': self._flow_time(time)})
+
+    def _flow_time(self, time=None):
+        """流水时间精确到秒，保证写入Excel再读回后仍能与撤销操作中的时间匹配"""
+        return pd.Timestamp(time or datetime.now()).floor('s').to_pydatetime()
+
+    def get_cash_flows(self):
+        """获取资金流水（按时间排序）"""
+        df = self._cash_flows_cache
+        if df.empty:
+            return share_frame(df)
+        df = share_frame(df)
+        df['time'] = pd.to_datetime(df['time'])
+        return df.sort_values('time', kind='stable').reset_index(drop=True)
@@ -0,0 +1,258 @@
+"""每日净值（NAV）序列
+
+每天一个点：净值 = 现金（数据统计表中的 remaining_amount）+ 持有商品按当天参考价计算的市值
+（当天还没有报价的商品按买入价计）。
+
+序列保存在数据文件旁的 `<数据文件名>_nav.bin` 中，每天一条定长记录（日期序号、现金、市值），
+读取时直接映射为NumPy数组，多年的数据也能立即显示。
+- 第一次使用（或重建）时用一次向量化计算回填所有历史日期：
+  现金从当前余额倒推（减去之后发生的买入、卖出、投资和手续费），
+  持仓市值按 商品类别 × 日期 的持有数量和成本矩阵与价格矩阵相乘得到，不逐天重放交易
+- 之后每天只追加一条记录；当天的记录在价格或交易变化后覆盖更新，
+  程序有几天没有运行时只回填缺少的日期
+"""
+from datetime import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from models.portfolio_analytics import holding_analytics, lookup_current_prices, match_price_rows
+from utils.atomic_file import atomic_write_path
+from utils.file_lock import FileLock
+
+# 每条记录：日期（1970-01-01起的天数）、当天结束时的现金和持仓市值
+NAV_DTYPE = np.dtype([('day', '<i4'), ('cash', '<f8'), ('market_value', '<f8')])
+
+
+class NavStore:
+    """净值序列文件（定长记录，只追加，当天的记录可以覆盖）"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = FileLock(file_path)
+        # 读取缓存：(文件修改时间, 大小) -> 记录数组
+        self._cache = (None, None)
+
+    def signature(self):
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self):
+        """全部记录（按日期升序），文件不存在时为空数组"""
+        if not os.path.exists(self.file_path):
+            return np.empty(0, dtype=NAV_DTYPE)
+        with self._lock.shared():
+            signature = self.signature()
+            if self._cache[0] == signature:
+                return self._cache[1]
+            records = np.fromfile(self.file_path, dtype=NAV_DTYPE)
+        records.flags.writeable = False
+        self._cache = (signature, records)
+        return records
+
+    def append(self, records):
+        """追加记录；第一条记录与文件中最后一天相同时覆盖最后一条"""
+        records = np.asarray(records, dtype=NAV_DTYPE)
+        if not len(records):
+            return
+        with self._lock:
+            with open(self.file_path, 'ab') as f:
+                size = f.tell()
+                if size >= NAV_DTYPE.itemsize:
+                    last = np.fromfile(self.file_path, dtype=NAV_DTYPE, count=1,
+                                       offset=size - NAV_DTYPE.itemsize)
+                    if last['day'][0] >= records['day'][0]:
+                        f.truncate(size - NAV_DTYPE.itemsize)
+                f.write(records.tobytes())
+
+    def replace(self, records):
+        """用records替换整个文件（重建）"""
+        records = np.asarray(records, dtype=NAV_DTYPE)
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            with atomic_write_path(self.file_path) as tmp_path:
+                records.tofile(tmp_path)
+
+
+def day_number(time):
+    """时间所在的日期序号（1970-01-01起的天数）"""
+    return int(np.datetime64(pd.Timestamp(time).normalize().to_datetime64(), 'D').astype(np.int64))
+
+
+def nav_frame(records):
+    """把记录数组转换为以日期为索引的DataFrame（cash, market_value, nav）"""
+    days = records['day'].astype('datetime64[D]').astype('datetime64[ns]')
+    cash = records['cash'].astype(float)
+    market_value = records['market_value'].astype(float)
+    return pd.DataFrame({'cash': cash, 'market_value': market_value, 'nav': cash + market_value},
+                        index=pd.DatetimeIndex(days, name='day'))
+
+
+def backfill_nav(model, mapping=None, start=None, end=None):
+    """一次向量化计算 [start, end] 每天的净值记录。
+
+    Args:
+        model (ItemModel): 数据模型（已售记录包括往年归档）
+        mapping (ItemMapping, optional): 提供商品类别和历史价格，未提供时持仓按买入价计
+        start (int, optional): 第一天的日期序号，默认最早一笔交易或流水的日期
+        end (int, optional): 最后一天的日期序号，默认今天
+    """
+    inventory = model.snapshot().inventory
+    sold = model.get_sold_items()
+    flows = model.get_cash_flows()
+    stats = model.get_data_statistics()
+    end = day_number(datetime.now()) if end is None else end
+
+    # 所有买入过的商品：买入日起持有，卖出当天结束时不再持有（库存中的商品一直持有）
+    columns = ['goods_name', 'sub_type', 'goods_wear', 'is_stattrak', 'buy_price', 'buy_time']
+    frames = []
+    if not inventory.empty:
+        frames.append(inventory[columns].assign(sell_day=np.iinfo(np.int32).max))
+    if not sold.empty:
+        frames.append(sold[columns].assign(sell_day=_days(sold['sell_time'])))
+    items = pd.concat(frames, ignore_index=True) if frames else None
+    buy_days = _days(items['buy_time']) if items is not None else np.empty(0, dtype=np.int64)
+    buy_price = pd.to_numeric(items['buy_price'], errors='coerce').fillna(0).to_numpy(dtype=float) \
+        if items is not None else np.empty(0)
+
+    # 改变现金的事件：买入、卖出（售价+额外收入）、投资、手续费
+    event_days = [buy_days]
+    event_amounts = [-buy_price]
+    if not sold.empty:
+        event_days.append(_days(sold['sell_time']))
+        event_amounts.append(pd.to_numeric(sold['sell_price'], errors='coerce').fillna(0).to_numpy(dtype=float)
+                             + pd.to_numeric(sold['extra_income'], errors='coerce').fillna(0).to_numpy(dtype=float))
+    if not flows.empty:
+        sign = np.where(flows['kind'] == 'fee', -1.0, 1.0)
+        event_days.append(_days(flows['time']))
+        event_amounts.append(sign * pd.to_numeric(flows['amount'], errors='coerce').fillna(0).to_numpy(dtype=float))
+    event_days = np.concatenate(event_days)
+    event_amounts = np.concatenate(event_amounts)
+
+    if start is None:
+        start = int(event_days.min()) if len(event_days) else end
+    if end < start:
+        return np.empty(0, dtype=NAV_DTYPE)
+    days = np.arange(start, end + 1)
+
+    # 现金：当前余额减去每天之后发生的事件
+    order = np.argsort(event_days, kind='stable')
+    sorted_days = event_days[order]
+    suffix = np.concatenate([np.cumsum(event_amounts[order][::-1])[::-1], [0.0]])
+    cash = float(stats['remaining_amount']) - suffix[np.searchsorted(sorted_days, days, side='right')]
+
+    market_value = _holding_values(items, buy_days, buy_price, days, mapping)
+    records = np.empty(len(days), dtype=NAV_DTYPE)
+    records['day'] = days
+    records['cash'] = cash
+    records['market_value'] = market_value
+    return records
+
+
+def current_nav_point(model, mapping=None, now=None):
+    """按当前余额和当前参考价计算今天的记录"""
+    inventory = model.snapshot().inventory
+    market_value = 0.0
+    if not inventory.empty:
+        price_table = mapping.get_price_table() if mapping is not None else None
+        holdings = holding_analytics(inventory, lookup_current_prices(inventory, price_table), now)
+        market_value = float(holdings['market_value'].sum())
+    record = np.empty(1, dtype=NAV_DTYPE)
+    record['day'] = day_number(now or datetime.now())
+    record['cash'] = float(model.get_data_statistics()['remaining_amount'])
+    record['market_value'] = market_value
+    return record
+
+
+def update_nav(model, mapping=None, store=None, now=None, rebuild=False):
+    """更新净值序列并返回全部记录。
+    文件为空（或rebuild为True）时回填全部历史；之后只回填缺少的日期，并更新今天的记录。
+    """
+    store = store or model.nav_store
+    today = day_number(now or datetime.now())
+    records = store.load()
+    if rebuild or not len(records):
+        store.replace(backfill_nav(model, mapping, end=today - 1))
+    else:
+        last = int(records['day'][-1])
+        if last < today - 1:
+            store.append(backfill_nav(model, mapping, start=last + 1, end=today - 1))
+    point = current_nav_point(model, mapping, now)
+    records = store.load()
+    # 今天的记录没有变化时不写文件
+    if not len(records) or records[-1] != point[0]:
+        store.append(point)
+    return store.load()
+
+
+def merge_nav(record_sets):
+    """把多个账户的记录按日期相加（账户开始之前的日期计为0）"""
+    record_sets = [records for records in record_sets if len(records)]
+    if not record_sets:
+        return np.empty(0, dtype=NAV_DTYPE)
+    start = min(int(records['day'][0]) for records in record_sets)
+    end = max(int(records['day'][-1]) for records in record_sets)
+    merged = np.zeros(end - start + 1, dtype=NAV_DTYPE)
+    merged['day'] = np.arange(start, end + 1)
+    for records in record_sets:
+        positions = records['day'] - start
+        merged['cash'][positions] += records['cash']
+        merged['market_value'][positions] += records['market_value']
+    return merged
+
+
+def _days(times):
+    return pd.to_datetime(times).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def _holding_values(items, buy_days, buy_price, days, mapping):
+    """每天结束时持有商品的市值（商品类别 × 日期 的矩阵运算）"""
+    if items is None or not len(days):
+        return np.zeros(len(days))
+    start = int(days[0])
+    span = len(days)
+    # 每件商品的持有区间在 days 中的位置 [first, stop)
+    first = np.clip(buy_days - start, 0, span)
+    stop = np.clip(items['sell_day'].to_numpy(dtype=np.int64) - start, 0, span)
+    keep = stop > first
+
+    # 商品 -> 价格矩阵的行（没有商品类别或历史价格的商品在最后一行，只按成本计）
+    prices = np.empty((0, span))
+    rows = np.zeros(len(items), dtype=np.int64)
+    history = mapping.price_history.load() if mapping is not None else None
+    if history is not None and not history.empty:
+        price_table, table_rows = match_price_rows(items, mapping.get_price_table())
+        last = history.assign(day=_days(history['time'])).groupby(['mapping_id', 'day'])['price'].last()
+        table = last.unstack('day')
+        matched = table_rows >= 0
+        rows[:] = -1
+        rows[matched] = table.index.get_indexer(price_table['mapping_id'].to_numpy()[table_rows[matched]])
+        # 每天取当天或之前最后一个价格
+        price_days = table.columns.to_numpy(dtype=np.int64)
+        table = table.ffill(axis=1).to_numpy(dtype=float)
+        columns = np.searchsorted(price_days, days, side='right') - 1
+        prices = table[:, np.maximum(columns, 0)]
+        prices[:, columns < 0] = np.nan
+        prices[~(prices > 0)] = np.nan
+    unpriced_row = len(prices)
+    rows = np.where(rows >= 0, rows, unpriced_row)
+
+    # 持有数量和成本：在区间两端做差分，按日期累加
+    count = np.zeros((unpriced_row + 1, span + 1))
+    cost = np.zeros((unpriced_row + 1, span + 1))
+    rows, first, stop, price = rows[keep], first[keep], stop[keep], buy_price[keep]
+    np.add.at(count, (rows, first), 1.0)
+    np.add.at(count, (rows, stop), -1.0)
+    np.add.at(cost, (rows, first), price)
+    np.add.at(cost, (rows, stop), -price)
+    count = np.cumsum(count, axis=1)[:, :span]
+    cost = np.cumsum(cost, axis=1)[:, :span]
+
+    priced_value = np.where(np.isnan(prices), cost[:unpriced_row], count[:unpriced_row] * prices)
+    return priced_value.sum(axis=0) + cost[unpriced_row]
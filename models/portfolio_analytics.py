@@ -0,0 +1,251 @@
+"""投资组合收益分析
+
+在完整的库存表、已售表和资金流水上用NumPy向量化计算：
+已实现收益、按最新参考价计算的未实现收益、每件商品/每笔交易的年化收益率，
+以及按投资流水切分区间的时间加权收益率（TWR）。
+"""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# 价格表与库存表关联使用的键
+PRICE_KEYS = ['item_name', 'goods_type', 'item_wear', 'is_stattrak']
+INVENTORY_KEYS = ['goods_name', 'sub_type', 'goods_wear', 'is_stattrak']
+# 持有不足这个天数的交易不计入平均年化收益率：几天的短线交易换算成年化会放大成几千倍，
+# 按成本加权后仍会主导平均值
+MIN_ANNUALIZE_DAYS = 30
+
+
+def match_price_rows(inventory_df, price_table):
+    """按 (名称, 具体类型, 磨损, 暗金) 把库存（或已售）记录关联到价格表。
+    返回去重后的价格表和每条记录在其中的行号（-1表示没有对应的商品类别）。
+    """
+    prices = price_table.drop_duplicates(PRICE_KEYS, keep='last').reset_index(drop=True)
+    index = pd.MultiIndex.from_arrays(
+        [prices[key].astype(bool) if key == 'is_stattrak' else prices[key] for key in PRICE_KEYS])
+    positions = index.get_indexer(pd.MultiIndex.from_arrays(
+        [inventory_df[key].astype(bool) if key == 'is_stattrak' else inventory_df[key]
+         for key in INVENTORY_KEYS]))
+    return prices, positions
+
+
+def lookup_current_prices(inventory_df, price_table):
+    """查找每件库存商品的当前参考价。
+    没有报价或报价不大于0时为NaN。
+    """
+    if inventory_df.empty or price_table is None or price_table.empty:
+        return np.full(len(inventory_df), np.nan)
+    prices, positions = match_price_rows(inventory_df, price_table)
+    values = pd.to_numeric(prices['current_price'], errors='coerce').to_numpy(dtype=float)
+    current = np.where(positions >= 0, values[np.maximum(positions, 0)], np.nan)
+    current[current <= 0] = np.nan
+    return current
+
+
+def annualize(returns, days):
+    """把持有days天的收益率换算为年化收益率（持有不足1天按1天计）"""
+    returns = np.asarray(returns, dtype=float)
+    days = np.maximum(np.asarray(days, dtype=float), 1.0)
+    growth = 1.0 + returns
+    with np.errstate(over='ignore', invalid='ignore'):
+        result = np.power(np.where(growth > 0, growth, 1.0), 365.0 / days) - 1.0
+    return np.where(growth > 0, result, -1.0)
+
+
+def annualized_weights(trades):
+    """计算平均年化收益率时每笔交易的权重：成本，持有不足MIN_ANNUALIZE_DAYS天的交易为0"""
+    return np.where(trades['hold_days'].to_numpy() >= MIN_ANNUALIZE_DAYS, trades['buy_price'].to_numpy(), 0.0)
+
+
+def holding_analytics(inventory_df, current_prices, now=None):
+    """每件持有商品的未实现收益、持有天数和年化收益率。
+    没有参考价的商品按成本计价（未实现收益为0）。
+    """
+    now = pd.Timestamp(now or datetime.now())
+    buy_price = pd.to_numeric(inventory_df['buy_price'], errors='coerce').to_numpy(dtype=float)
+    priced = ~np.isnan(current_prices)
+    value = np.where(priced, current_prices, buy_price)
+    unrealized = value - buy_price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(buy_price > 0, unrealized / buy_price, 0.0)
+    buy_time = pd.to_datetime(inventory_df['buy_time']).to_numpy(dtype='datetime64[ns]')
+    hold_days = (np.datetime64(now.to_datetime64(), 'ns') - buy_time) / np.timedelta64(1, 'D')
+    return pd.DataFrame({
+        'inventory_id': inventory_df['inventory_id'].to_numpy(),
+        'buy_price': buy_price,
+        'current_price': current_prices,
+        'market_value': value,
+        'unrealized_pnl': unrealized,
+        'return': returns,
+        'hold_days': hold_days,
+        'annualized_return': annualize(returns, hold_days),
+        'priced': priced,
+    })
+
+
+def trade_analytics(sold_df):
+    """每笔已售交易的收益率和按hold_days计算的年化收益率"""
+    buy_price = pd.to_numeric(sold_df['buy_price'], errors='coerce').to_numpy(dtype=float)
+    profit = pd.to_numeric(sold_df['total_profit'], errors='coerce').to_numpy(dtype=float)
+    hold_days = pd.to_numeric(sold_df['hold_days'], errors='coerce').to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(buy_price > 0, profit / buy_price, 0.0)
+    return pd.DataFrame({
+        'inventory_id': sold_df['inventory_id'].to_numpy(),
+        'buy_price': buy_price,
+        'total_profit': profit,
+        'return': returns,
+        'hold_days': hold_days,
+        'annualized_return': annualize(returns, hold_days),
+    })
+
+
+def time_weighted_return(flow_times, flow_amounts, event_times, event_amounts, end_adjustment=0.0,
+                         now=None):
+    """时间加权收益率。
+
+    组合价值 = 累计投入 + 累计已实现收益 - 累计手续费（+ 期末的未实现收益），
+    在每笔投资流水处切分区间，区间收益率 = 期末价值(流水前) / 期初价值(流水后) - 1，
+    TWR为各区间 (1 + 收益率) 的连乘减1，不受投入时点和金额的影响。
+
+    Args:
+        flow_times, flow_amounts: 投资流水（外部资金进出）
+        event_times, event_amounts: 影响组合价值的事件（已实现收益为正，手续费为负）
+        end_adjustment (float): 期末价值的调整（未实现收益）
+
+    Returns:
+        dict: twr, twr_annualized（不足一年时等于twr）, periods
+    """
+    result = {'twr': 0.0, 'twr_annualized': 0.0, 'periods': 0}
+    flow_times = np.asarray(flow_times, dtype='datetime64[ns]')
+    if len(flow_times) == 0:
+        return result
+    order = np.argsort(flow_times, kind='stable')
+    flow_times = flow_times[order]
+    flow_amounts = np.asarray(flow_amounts, dtype=float)[order]
+
+    event_times = np.asarray(event_times, dtype='datetime64[ns]')
+    event_amounts = np.asarray(event_amounts, dtype=float)
+    event_order = np.argsort(event_times, kind='stable')
+    event_times = event_times[event_order]
+    event_cumsum = np.concatenate([[0.0], np.cumsum(event_amounts[event_order])])
+
+    # 每笔流水发生前的累计事件金额和累计投入
+    events_before = event_cumsum[np.searchsorted(event_times, flow_times, side='right')]
+    flows_before = np.concatenate([[0.0], np.cumsum(flow_amounts)[:-1]])
+    value_before = flows_before + events_before
+    value_after = value_before + flow_amounts
+    end_value = flow_amounts.sum() + event_cumsum[-1] + end_adjustment
+
+    start = value_after
+    end = np.append(value_before[1:], end_value)
+    valid = start > 0
+    if not valid.any():
+        return result
+    twr = float(np.prod(end[valid] / start[valid]) - 1.0)
+
+    # 不足一年的区间不外推年化，直接使用区间收益率
+    now = np.datetime64(pd.Timestamp(now or datetime.now()).to_datetime64(), 'ns')
+    days = (now - flow_times[0]) / np.timedelta64(1, 'D')
+    result.update({
+        'twr': twr,
+        'twr_annualized': float(annualize([twr], [days])[0]) if days >= 365 else twr,
+        'periods': int(valid.sum()),
+    })
+    return result
+
+
+def compute_portfolio_analytics(model, mapping=None, now=None, detail=True):
+    """计算投资组合的收益分析。
+
+    Args:
+        model (ItemModel): 数据模型
+        mapping (ItemMapping, optional): 提供当前参考价，未提供时未实现收益为0
+        now (datetime, optional): 计算时点，默认当前时间
+        detail (bool): 为False时已售部分只使用预计算的汇总（不加载往年归档），
+            不返回trades，TWR中的已实现收益按天计入
+
+    Returns:
+        dict: 汇总指标，以及 holdings（每件持有商品）和 trades（每笔交易）两个DataFrame
+    """
+    now = pd.Timestamp(now or datetime.now())
+    inventory_df = model._inventory_cache
+    price_table = mapping.get_price_table() if mapping is not None else None
+
+    holdings = holding_analytics(inventory_df, lookup_current_prices(inventory_df, price_table), now) \
+        if not inventory_df.empty else holding_analytics(_empty_inventory(), np.array([]), now)
+    unrealized = float(holdings['unrealized_pnl'].sum())
+
+    if detail:
+        sold_df = model.get_sold_items()
+        trades = trade_analytics(sold_df) if not sold_df.empty else trade_analytics(_empty_sold())
+        realized = float(trades['total_profit'].sum())
+        weights = annualized_weights(trades)
+        avg_annualized = float(np.average(trades['annualized_return'], weights=weights)) \
+            if weights.sum() > 0 else 0.0
+        profit_times = pd.to_datetime(sold_df['sell_time']).to_numpy(dtype='datetime64[ns]') \
+            if not sold_df.empty else np.array([], dtype='datetime64[ns]')
+        profit_amounts = trades['total_profit'].to_numpy()
+    else:
+        summary = model.get_sold_summary()
+        trades = None
+        realized = summary['total_profit']
+        avg_annualized = summary['annualized_cost_sum'] / summary['annualized_cost_base'] \
+            if summary['annualized_cost_base'] > 0 else 0.0
+        days = sorted(summary['profit_by_day'])
+        profit_times = pd.to_datetime(pd.Series(days, dtype=object)).to_numpy(dtype='datetime64[ns]')
+        profit_amounts = np.array([summary['profit_by_day'][day] for day in days], dtype=float)
+
+    # 资金流水：投资是外部资金，手续费和已实现收益改变组合价值
+    flows = model.get_cash_flows()
+    investments = flows[flows['kind'] == 'investment'] if not flows.empty else flows
+    fees = flows[flows['kind'] == 'fee'] if not flows.empty else flows
+    flow_times = list(investments['time']) if not investments.empty else []
+    flow_amounts = list(investments['amount']) if not investments.empty else []
+
+    # 没有完整流水的旧数据：把缺少的投资额视为在最早一笔交易时投入
+    stats = model.get_data_statistics()
+    missing = stats['total_investment'] - float(np.sum(flow_amounts))
+    if abs(missing) > 1e-6:
+        candidates = list(flow_times[:1])
+        if len(profit_times):
+            candidates.append(pd.Timestamp(profit_times.min()))
+        if not inventory_df.empty:
+            candidates.append(pd.to_datetime(inventory_df['buy_time']).min())
+        flow_times = [min(candidates) if candidates else now] + flow_times
+        flow_amounts = [missing] + flow_amounts
+
+    fee_times = pd.to_datetime(fees['time']).to_numpy(dtype='datetime64[ns]') \
+        if not fees.empty else np.array([], dtype='datetime64[ns]')
+    fee_amounts = -pd.to_numeric(fees['amount']).to_numpy(dtype=float) if not fees.empty else np.array([])
+    twr = time_weighted_return(
+        pd.to_datetime(pd.Series(flow_times, dtype=object)).to_numpy(dtype='datetime64[ns]'),
+        flow_amounts,
+        np.concatenate([profit_times, fee_times]),
+        np.concatenate([profit_amounts, fee_amounts]),
+        end_adjustment=unrealized,
+        now=now,
+    )
+
+    return {
+        'realized_pnl': realized,
+        'unrealized_pnl': unrealized,
+        'total_pnl': realized + unrealized,
+        'current_market_value': float(holdings['market_value'].sum()),
+        'priced_count': int(holdings['priced'].sum()),
+        'holding_count': len(holdings),
+        'avg_annualized_return': avg_annualized,
+        'twr': twr['twr'],
+        'twr_annualized': twr['twr_annualized'],
+        'twr_periods': twr['periods'],
+        'holdings': holdings,
+        'trades': trades,
+    }
+
+
+def _empty_inventory():
+    return pd.DataFrame({'inventory_id': [], 'buy_price': [], 'buy_time': pd.to_datetime([])})
+
+
+def _empty_sold():
+    return pd.DataFrame({'inventory_id': [], 'buy_price': [], 'total_profit': [], 'hold_days': []})
@@ -0,0 +1,266 @@
+"""多账户管理
+
+每个账户使用独立的库存数据文件（见 config/portfolios.py）。PortfolioManager 在线程池中
+并发打开所有账户的 ItemModel，之后切换账户只是换用已加载的模型，不重新读取文件。
+
+CombinedPortfolio 是所有账户的只读合并视图：统计和汇总由各账户的汇总结果相加得到，
+表格查询时每个账户只取出当前页之前的行再合并排序，不拼接完整的数据表。
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import pandas as pd
+
+from config.portfolios import PORTFOLIOS
+from models.float_index import FloatIndex
+from models.item_model import ItemModel
+from models.nav_series import merge_nav
+from models.portfolio_analytics import compute_portfolio_analytics
+from models.query import TableQuery
+from models.sold_archive import merge_summaries
+from utils.metrics import METRICS, MODEL_METHODS
+
+
+class PortfolioManager:
+    """多个账户的数据模型"""
+
+    # 合并视图在账户列表中的名称
+    COMBINED = '全部账户'
+
+    def __init__(self, portfolios=None, workers=None, cooling_rules=None):
+        """
+        Args:
+            portfolios (dict, optional): 账户名称 -> 数据文件，默认使用配置文件
+            workers (int, optional): 并发加载的线程数，默认为账户数（最多CPU核数）
+            cooling_rules (dict, optional): 冷却规则配置，所有账户共用
+        """
+        self.paths = dict(PORTFOLIOS if portfolios is None else portfolios)
+        if not self.paths:
+            raise ValueError("至少需要一个账户")
+        self.models = self._load_all(workers, cooling_rules)
+        if not self.models:
+            raise ValueError("没有可以打开的账户")
+        self.active = next(iter(self.models))
+        self._combined = None
+
+    def _load_all(self, workers, cooling_rules):
+        """并发打开所有账户（读取Excel和归档检查主要在各自的文件上进行，互不等待）"""
+        workers = workers or min(len(self.paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='portfolio-loader') as executor:
+            futures = {name: executor.submit(ItemModel, path, cooling_rules)
+                       for name, path in self.paths.items()}
+        models = {}
+        for name, future in futures.items():
+            try:
+                models[name] = future.result()
+            except Exception as e:
+                print(f"加载账户 {name} 出错: {str(e)}")
+        return models
+
+    def names(self):
+        """账户名称（多于一个账户时最后是合并视图）"""
+        names = list(self.models)
+        return names + [self.COMBINED] if len(names) > 1 else names
+
+    def get(self, name=None):
+        """账户的模型；name为COMBINED时返回合并视图"""
+        name = self.active if name is None else name
+        if name == self.COMBINED:
+            if self._combined is None:
+                self._combined = CombinedPortfolio(self.models)
+                # 合并视图在第一次切换时才创建，启用了指标收集时同样记录其耗时
+                if METRICS.enabled:
+                    METRICS.instrument(self._combined, MODEL_METHODS, 'CombinedPortfolio')
+            return self._combined
+        return self.models[name]
+
+    def switch(self, name):
+        """切换当前账户，返回其模型（已加载的模型只检查文件是否被其他进程修改）"""
+        model = self.get(name)
+        self.active = name
+        model.reload_if_changed()
+        return model
+
+
+class CombinedPortfolio:
+    """所有账户的只读合并视图，提供界面显示需要的查询和统计方法"""
+
+    STATUS_COOLING = ItemModel.STATUS_COOLING
+    STATUS_HOLDING = ItemModel.STATUS_HOLDING
+    STATUS_SOLD = ItemModel.STATUS_SOLD
+    STATUS_PRIORITY = ItemModel.STATUS_PRIORITY
+
+    read_only = True
+    inventory_sheet = 'inventory'
+    sold_items_sheet = 'sold_items'
+
+    def __init__(self, models):
+        self.models = dict(models)
+        first = next(iter(self.models.values()))
+        self.file_path = first.file_path
+        # 所有账户使用相同的冷却规则，时间信息由任意一个模型计算
+        self._first = first
+        self._float_index = (None, None)
+
+    @property
+    def _versions(self):
+        """各工作表的数据版本（各账户版本的组合，任一账户修改后都会变化）"""
+        sheets = (self.inventory_sheet, self.sold_items_sheet, 'data_gather', 'cash_flows')
+        return {sheet: tuple(model._versions[sheet] for model in self.models.values()) for sheet in sheets}
+
+    def reload_if_changed(self):
+        changed = [model.reload_if_changed() for model in self.models.values()]
+        return any(changed)
+
+    # ---------- 查询 ----------
+
+    def query(self, table='inventory', where=None, order_by=None, offset=0, limit=None, years=None):
+        """与 ItemModel.query 相同，结果多一列 portfolio（账户名称）。
+        每个账户只取排在前 offset+limit 的行，合并后再排序分页。
+        """
+        kwargs = {} if table == self.inventory_sheet else {'years': years}
+        stop = None if limit is None else offset + limit
+        pages = []
+        total = 0
+        for name, model in self.models.items():
+            page, count = model.query(table, where=where, order_by=order_by, offset=0, limit=stop, **kwargs)
+            total += count
+            if not page.empty:
+                pages.append(page.assign(portfolio=name))
+        if not pages:
+            return next(iter(self.models.values())).query(table, where=where, limit=0, **kwargs)[0], 0
+
+        candidates = pd.concat(pages, ignore_index=True)
+        if table == self.inventory_sheet:
+            merged = TableQuery(
+                candidates,
+                derived={'status_priority': lambda frame: frame['goods_state'].map(self.STATUS_PRIORITY)},
+                default_order=[('status_priority', True), ('buy_time', False)],
+            )
+        else:
+            merged = TableQuery(candidates)
+        page, _ = merged.run(None, order_by, offset, limit)
+        return page, total
+
+    def _owner(self, inventory_id):
+        for model in self.models.values():
+            item = model.get_item_by_id(inventory_id)
+            if item is not None:
+                return model, item
+        return None, None
+
+    def get_item_by_id(self, item_id):
+        return self._owner(item_id)[1]
+
+    def get_current_price(self, inventory_id):
+        item = self.get_item_by_id(inventory_id)
+        return item['buy_price'] if item else 0.0
+
+    def get_item_status_text(self, status_code):
+        return self._first.get_item_status_text(status_code)
+
+    def get_time_infos(self, df=None, now=None):
+        if df is None:
+            df = self.query(self.inventory_sheet)[0]
+        return self._first.get_time_infos(df, now)
+
+    def get_float_index(self):
+        """所有账户记录的磨损值排名索引（同一目录下的账户共用的导入数据只计一次）"""
+        datasets = {model.float_dataset.file_path: model.float_dataset for model in self.models.values()}
+        key = (self._versions[self.inventory_sheet], self._versions[self.sold_items_sheet],
+               tuple(dataset.signature() for dataset in datasets.values()))
+        if self._float_index[0] != key:
+            frames = [model._float_samples() for model in self.models.values()]
+            frames += [dataset.load() for dataset in datasets.values()]
+            self._float_index = (key, FloatIndex(frames))
+        return self._float_index[1]
+
+    def get_float_ranks(self, df=None):
+        if df is None:
+            df = self.query(self.inventory_sheet)[0]
+        return self.get_float_index().ranks(df)
+
+    def get_nav_series(self, mapping=None, now=None, rebuild=False):
+        """所有账户的每日净值按日期相加"""
+        return merge_nav([model.get_nav_series(mapping, now, rebuild) for model in self.models.values()])
+
+    def get_sold_years(self):
+        years = set()
+        for model in self.models.values():
+            years.update(model.get_sold_years())
+        return sorted(years, reverse=True)
+
+    # ---------- 冷却期 ----------
+
+    def get_cooling_schedule(self, inventory_ids=None):
+        schedules = [model.get_cooling_schedule(inventory_ids) for model in self.models.values()]
+        schedules = [schedule for schedule in schedules if not schedule.empty]
+        return pd.concat(schedules) if schedules else pd.Series([], dtype='datetime64[ns]')
+
+    def release_cooling_items(self, inventory_ids=None, now=None):
+        released = []
+        for model in self.models.values():
+            released.extend(model.release_cooling_items(inventory_ids, now))
+        return released
+
+    # ---------- 统计（合并各账户的汇总） ----------
+
+    def get_data_statistics(self):
+        stats = {}
+        for model in self.models.values():
+            for name, value in model.get_data_statistics().items():
+                stats[name] = stats.get(name, 0.0) + float(value)
+        return stats
+
+    def get_sold_summary(self):
+        return merge_summaries([model.get_sold_summary() for model in self.models.values()])
+
+    def compute_analytics(self, mapping=None, now=None):
+        """各账户分别计算收益分析（只用汇总数据）后合并。
+        收益和市值直接相加，平均年化收益率按成本加权；
+        时间加权收益率无法由汇总精确合并，按各账户总投资加权近似。
+        """
+        results = []
+        for model in self.models.values():
+            analytics = compute_portfolio_analytics(model, mapping, now=now, detail=False)
+            investment = model.get_data_statistics()['total_investment']
+            results.append((analytics, abs(investment)))
+
+        merged = {key: sum(analytics[key] for analytics, _ in results) for key in (
+            'realized_pnl', 'unrealized_pnl', 'total_pnl', 'current_market_value',
+            'priced_count', 'holding_count')}
+        summary = self.get_sold_summary()
+        merged['avg_annualized_return'] = summary['annualized_cost_sum'] / summary['annualized_cost_base'] \
+            if summary['annualized_cost_base'] > 0 else 0.0
+        weight = sum(investment for _, investment in results)
+        for key in ('twr', 'twr_annualized'):
+            merged[key] = sum(analytics[key] * investment for analytics, investment in results) / weight \
+                if weight > 0 else 0.0
+        return merged
+
+    # ---------- 合并视图不能修改数据 ----------
+
+    def can_undo(self):
+        return False
+
+    def can_redo(self):
+        return False
+
+    def undo(self):
+        return None
+
+    def redo(self):
+        return None
+
+    def can_sell_item(self, inventory_id):
+        model, _ = self._owner(inventory_id)
+        if model is None:
+            return False, "商品不存在"
+        return model.can_sell_item(inventory_id)
+
+    def sell_item(self, inventory_id, sell_price, extra_income=0, sell_time=None):
+        """出售商品（在商品所属的账户中执行）"""
+        model, _ = self._owner(inventory_id)
+        if model is None:
+            return False, "商品不存在"
+        return model.sell_item(inventory_id, sell_price, extra_income, sell_time)
@@ -0,0 +1,301 @@
+"""价格提醒
+
+规则保存在映射文件旁的 price_alerts.json 中，触发的提醒追加到 price_alerts.jsonl（提醒队列），
+界面和其他进程从上次读到的位置继续读取新提醒。
+
+规则的作用范围（scope）：
+    inventory  某件库存商品（target为inventory_id）
+    mapping    某个商品类别（target为mapping_id）
+    portfolio  所有持有的商品（没有target），每件商品各触发一次
+规则类型（kind）：
+    above      价格 ≥ threshold
+    below      价格 ≤ threshold
+    gain_pct   价格 ≥ 买入价 × (1 + threshold)
+    loss_pct   价格 ≤ 买入价 × (1 - threshold)
+
+每批价格更新时，规则表与本批价格、持仓表做一次哈希连接，向量化求出所有触发的规则。
+inventory/mapping规则触发一次后停用，portfolio规则对每件商品只触发一次。
+"""
+from datetime import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+from utils.atomic_file import atomic_write_path
+from utils.file_lock import FileLock
+from models.portfolio_analytics import match_price_rows
+
+SCOPES = ('inventory', 'mapping', 'portfolio')
+KINDS = ('above', 'below', 'gain_pct', 'loss_pct')
+RULE_COLUMNS = ['alert_id', 'scope', 'target', 'kind', 'threshold', 'note']
+
+
+class PriceAlertRules:
+    """价格提醒规则（JSON文件）"""
+
+    def __init__(self, file_path='data/price_alerts.json'):
+        self.file_path = file_path
+        self._lock = FileLock(file_path)
+        # (文件修改时间, 大小) -> (规则字典, 生效规则的DataFrame)
+        self._cache = (None, None, None)
+
+    def _read(self):
+        """读取规则文件（按文件签名缓存）"""
+        try:
+            st = os.stat(self.file_path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return {'next_id': 1, 'rules': [], 'fired': []}, _empty_rules()
+        if self._cache[0] == signature:
+            return self._cache[1], self._cache[2]
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        active = [rule for rule in data['rules'] if rule.get('enabled', True)]
+        frame = pd.DataFrame(active, columns=RULE_COLUMNS) if active else _empty_rules()
+        frame['target'] = frame['target'].astype(str)
+        frame['threshold'] = frame['threshold'].astype(float)
+        self._cache = (signature, data, frame)
+        return data, frame
+
+    def _write(self, data):
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with atomic_write_path(self.file_path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def add_rule(self, scope, kind, threshold, target=None, note=''):
+        """添加规则，返回alert_id"""
+        if scope not in SCOPES:
+            raise ValueError(f"未知的提醒范围: {scope}")
+        if kind not in KINDS:
+            raise ValueError(f"未知的提醒类型: {kind}")
+        if (scope == 'portfolio') != (target is None):
+            raise ValueError("portfolio规则不需要target，其他规则必须指定target")
+        if kind in ('gain_pct', 'loss_pct') and threshold < 0:
+            raise ValueError("涨跌幅不能为负数")
+        with self._lock:
+            data, _ = self._read()
+            alert_id = data['next_id']
+            data['rules'].append({
+                'alert_id': alert_id,
+                'scope': scope,
+                'target': None if target is None else str(target),
+                'kind': kind,
+                'threshold': float(threshold),
+                'note': note,
+                'enabled': True,
+                'created': datetime.now().isoformat(timespec='seconds'),
+            })
+            data['next_id'] = alert_id + 1
+            self._write(data)
+        return alert_id
+
+    def remove_rule(self, alert_id):
+        """删除规则，返回是否存在"""
+        with self._lock:
+            data, _ = self._read()
+            rules = [rule for rule in data['rules'] if rule['alert_id'] != alert_id]
+            if len(rules) == len(data['rules']):
+                return False
+            data['rules'] = rules
+            data['fired'] = [key for key in data['fired'] if not key.startswith(f"{alert_id}:")]
+            self._write(data)
+        return True
+
+    def list_rules(self):
+        """全部规则（包括已触发停用的）"""
+        with self._lock.shared():
+            data, _ = self._read()
+        return pd.DataFrame(data['rules'])
+
+    def active(self):
+        """返回 (生效规则的DataFrame, 已触发的portfolio规则键集合)"""
+        with self._lock.shared():
+            data, frame = self._read()
+        return frame, set(data['fired'])
+
+    def mark_fired(self, alert_ids, fired_keys):
+        """停用已触发的inventory/mapping规则，记录已触发的portfolio规则和商品"""
+        if not alert_ids and not fired_keys:
+            return
+        with self._lock:
+            data, _ = self._read()
+            alert_ids = set(alert_ids)
+            now = datetime.now().isoformat(timespec='seconds')
+            for rule in data['rules']:
+                if rule['alert_id'] in alert_ids:
+                    rule['enabled'] = False
+                    rule['triggered'] = now
+            data['fired'] = sorted(set(data['fired']) | set(fired_keys))
+            self._write(data)
+
+
+class AlertQueue:
+    """触发的提醒（只追加的JSON Lines文件），读取方各自记录读到的位置"""
+
+    def __init__(self, file_path='data/price_alerts.jsonl'):
+        self.file_path = file_path
+        self._lock = FileLock(file_path)
+        self._offset = 0
+
+    def push(self, alerts):
+        if not alerts:
+            return
+        with self._lock:
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                for alert in alerts:
+                    f.write(json.dumps(alert, ensure_ascii=False) + '\n')
+
+    def read_new(self, limit=None):
+        """读取上次之后新增的提醒；limit为只保留最新的条数"""
+        if not os.path.exists(self.file_path):
+            return []
+        with self._lock.shared():
+            if os.path.getsize(self.file_path) < self._offset:
+                self._offset = 0  # 文件被清空
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                f.seek(self._offset)
+                lines = f.readlines()
+                self._offset = f.tell()
+        alerts = [json.loads(line) for line in lines if line.strip()]
+        return alerts[-limit:] if limit else alerts
+
+    def seek_end(self):
+        """跳过已有的提醒，之后只读取新增的"""
+        self._offset = os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+
+    def clear(self):
+        with self._lock:
+            with open(self.file_path, 'w', encoding='utf-8'):
+                pass
+        self._offset = 0
+
+
+class PriceAlertEngine:
+    """在每批价格更新时评估全部提醒规则"""
+
+    def __init__(self, model, mapping):
+        directory = os.path.dirname(mapping.file_path)
+        self.model = model
+        self.mapping = mapping
+        self.rules = PriceAlertRules(os.path.join(directory, 'price_alerts.json'))
+        self.queue = AlertQueue(os.path.join(directory, 'price_alerts.jsonl'))
+        # (库存数据版本, 价格表) -> 持仓表（inventory_id, mapping_id, buy_price）
+        self._positions_cache = (None, None, None)
+
+    def attach(self):
+        """订阅映射的价格更新"""
+        self.mapping.add_price_listener(self.on_prices)
+        return self
+
+    def on_prices(self, prices):
+        try:
+            self.queue.push(self.evaluate(prices))
+        except Exception as e:
+            print(f"检查价格提醒时出错: {str(e)}")
+
+    def _positions(self):
+        """持有商品与商品类别的对应关系（库存或映射变化时才重新关联）"""
+        price_table = self.mapping.get_price_table()
+        version = self.model._versions[self.model.inventory_sheet]
+        if self._positions_cache[0] == version and self._positions_cache[1] is price_table:
+            return self._positions_cache[2]
+        inventory, _ = self.model.query('inventory', where={
+            'goods_state': [self.model.STATUS_COOLING, self.model.STATUS_HOLDING]})
+        if inventory.empty or price_table.empty:
+            positions = pd.DataFrame({'inventory_id': pd.Series(dtype=object),
+                                      'mapping_id': pd.Series(dtype=object),
+                                      'buy_price': pd.Series(dtype=float)})
+        else:
+            prices, rows = match_price_rows(inventory, price_table)
+            matched = rows >= 0
+            positions = pd.DataFrame({
+                'inventory_id': inventory['inventory_id'].to_numpy()[matched].astype(str),
+                'mapping_id': prices['mapping_id'].to_numpy()[rows[matched]].astype(np.int64).astype(str),
+                'buy_price': pd.to_numeric(inventory['buy_price'], errors='coerce').to_numpy(dtype=float)[matched],
+            })
+        self._positions_cache = (version, price_table, positions)
+        return positions
+
+    def evaluate(self, prices, now=None):
+        """评估一批价格（mapping_id -> 价格），返回触发的提醒列表"""
+        rules, fired = self.rules.active()
+        if rules.empty or not prices:
+            return []
+        batch = pd.DataFrame({
+            'mapping_id': [str(int(mapping_id)) for mapping_id in prices],
+            'price': [float(price) for price in prices.values()],
+        })
+        held = self._positions().merge(batch, on='mapping_id')
+
+        by_scope = dict(tuple(rules.groupby('scope')))
+        candidates = []
+        mapping_rules = by_scope.get('mapping')
+        if mapping_rules is not None:
+            absolute = mapping_rules['kind'].isin(['above', 'below'])
+            # 绝对价格规则不需要持仓；涨跌幅规则对该类别下的每件持有商品计算
+            candidates.append(mapping_rules[absolute].merge(
+                batch, left_on='target', right_on='mapping_id').assign(inventory_id=None, buy_price=np.nan))
+            candidates.append(mapping_rules[~absolute].merge(held, left_on='target', right_on='mapping_id'))
+        if 'inventory' in by_scope:
+            candidates.append(by_scope['inventory'].merge(held, left_on='target', right_on='inventory_id'))
+        if 'portfolio' in by_scope and not held.empty:
+            candidates.append(by_scope['portfolio'].merge(held, how='cross'))
+        candidates = [frame for frame in candidates if not frame.empty]
+        if not candidates:
+            return []
+        df = pd.concat(candidates, ignore_index=True)
+
+        kind = df['kind'].to_numpy()
+        threshold = df['threshold'].to_numpy(dtype=float)
+        buy_price = df['buy_price'].to_numpy(dtype=float)
+        price = df['price'].to_numpy(dtype=float)
+        reference = np.select([kind == 'gain_pct', kind == 'loss_pct'],
+                              [buy_price * (1 + threshold), buy_price * (1 - threshold)], threshold)
+        upward = np.isin(kind, ['above', 'gain_pct'])
+        hit = np.where(upward, price >= reference, price <= reference)
+
+        df = df[hit].assign(reference=reference[hit])
+        # portfolio规则只对触发的行检查是否已对该商品提醒过
+        portfolio = (df['scope'] == 'portfolio').to_numpy()
+        keys = [f"{alert_id}:{inventory_id}" for alert_id, inventory_id
+                in zip(df['alert_id'].to_numpy()[portfolio], df['inventory_id'].to_numpy()[portfolio])]
+        repeated = np.zeros(len(df), dtype=bool)
+        repeated[portfolio] = [key in fired for key in keys]
+        fired_keys = [key for key in keys if key not in fired]
+        df = df[~repeated]
+        if df.empty:
+            return []
+
+        time = pd.Timestamp(now or datetime.now()).isoformat(timespec='seconds')
+        alerts = [{
+            'time': time,
+            'alert_id': int(row.alert_id),
+            'scope': row.scope,
+            'kind': row.kind,
+            'mapping_id': int(row.mapping_id),
+            'inventory_id': None if pd.isna(row.inventory_id) else row.inventory_id,
+            'price': float(row.price),
+            'reference': float(row.reference),
+            'note': row.note,
+        } for row in df.itertuples(index=False)]
+        self.rules.mark_fired(
+            [int(alert_id) for alert_id in df.loc[df['scope'] != 'portfolio', 'alert_id'].unique()], fired_keys)
+        return alerts
+
+
+def format_alert(alert):
+    """提醒的文字描述"""
+    conditions = {'above': '价格达到', 'below': '价格跌至', 'gain_pct': '价格涨至', 'loss_pct': '价格跌至'}
+    target = alert['inventory_id'] or f"类别 {alert['mapping_id']}"
+    text = f"[{alert['time']}] {target} {conditions.get(alert['kind'], alert['kind'])} " \
+           f"¥{alert['price']:.2f}（提醒价 ¥{alert['reference']:.2f}）"
+    if alert.get('note'):
+        text += f" {alert['note']}"
+    return text
+
+
+def _empty_rules():
+    return pd.DataFrame({column: pd.Series(dtype=object) for column in RULE_COLUMNS})
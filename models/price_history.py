@@ -0,0 +1,65 @@
+from datetime import datetime
+import pandas as pd
+import os
+from utils.file_lock import FileLock
+
+
+class PriceHistory:
+    """商品类别的历史价格记录（只追加的CSV文件）。
+
+    每次更新当前价格时追加 (time, mapping_id, price) 记录，
+    用于回测卖出策略和计算历史净值。
+    """
+
+    COLUMNS = ['time', 'mapping_id', 'price']
+
+    def __init__(self, file_path='data/price_history.csv'):
+        self.file_path = file_path
+        self._lock = FileLock(file_path)
+        # 读取缓存：(文件修改时间, 大小) -> DataFrame
+        self._cache = (None, None)
+
+    def append(self, prices, time=None):
+        """追加一批价格记录。
+
+        Args:
+            prices (dict): mapping_id -> 价格
+            time (datetime, optional): 记录时间，默认当前时间
+        """
+        if not prices:
+            return 0
+        time = pd.Timestamp(time or datetime.now()).floor('s')
+        df = pd.DataFrame({
+            'time': [time.isoformat()] * len(prices),
+            'mapping_id': [int(mapping_id) for mapping_id in prices],
+            'price': [float(price) for price in prices.values()],
+        })
+        return self.append_frame(df)
+
+    def append_frame(self, df):
+        """追加包含time、mapping_id、price列的DataFrame（如从外部导入的历史数据）"""
+        df = df[self.COLUMNS].dropna()
+        if df.empty:
+            return 0
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            write_header = not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0
+            df.to_csv(self.file_path, mode='a', header=write_header, index=False)
+        return len(df)
+
+    def load(self):
+        """读取全部历史价格，按时间排序"""
+        if not os.path.exists(self.file_path):
+            return pd.DataFrame({'time': pd.to_datetime([]), 'mapping_id': [], 'price': []})
+        with self._lock.shared():
+            st = os.stat(self.file_path)
+            signature = (st.st_mtime_ns, st.st_size)
+            if self._cache[0] == signature:
+                return self._cache[1]
+            df = pd.read_csv(self.file_path)
+        df['time'] = pd.to_datetime(df['time'])
+        df = df.sort_values('time', kind='stable').reset_index(drop=True)
+        self._cache = (signature, df)
+        return df
@@ -0,0 +1,142 @@
+"""表格查询：条件筛选、排序和分页
+
+TableQuery 包装某一版本的表格数据，按需建立并缓存：
+- 类型化的列（NumPy数组），用于范围条件和排序
+- 等值索引（值 -> 行号数组），用于等值和多值条件
+- 排序后的行号排列，同一排序方式只计算一次
+
+数据修改后由 ItemModel 创建新的 TableQuery，旧的缓存随之失效。
+
+where 的写法（各条件之间为"且"）：
+    {'goods_state': 1}                     等于（整数列直接比较，不建立等值索引）
+    {'sub_type': ['AK-47', 'AWP']}         属于其中之一
+    {'buy_price': {'min': 10, 'max': 100}} 范围（含端点，可只给一端）
+    {'goods_name': {'contains': '红线'}}   包含子串（不区分大小写）
+    {'buy_time': lambda s: s.dt.year == 2024}  任意条件（参数为该列的Series）
+
+order_by 为列名或 (列名, 是否升序) 的列表，排在前面的优先。
+"""
+import numpy as np
+import pandas as pd
+
+
+class TableQuery:
+    """某一版本表格数据上的查询缓存"""
+
+    def __init__(self, frame, derived=None, default_order=None):
+        """
+        Args:
+            frame (DataFrame): 表格数据（查询结果从中按行号取出）
+            derived (dict, optional): 派生列名 -> 函数(frame)，可用于条件和排序但不出现在结果中
+            default_order (list, optional): 未指定order_by时的排序方式，None表示保持原顺序
+        """
+        self.frame = frame.reset_index(drop=True)
+        self.derived = derived or {}
+        self.default_order = default_order
+        self._columns = {}
+        self._indexes = {}
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def column(self, name):
+        """类型化的列"""
+        values = self._columns.get(name)
+        if values is None:
+            if name in self.derived:
+                values = np.asarray(self.derived[name](self.frame))
+            elif name not in self.frame.columns:
+                raise KeyError(f"未知的列: {name}")
+            else:
+                series = self.frame[name]
+                if pd.api.types.is_datetime64_any_dtype(series):
+                    values = series.to_numpy(dtype='datetime64[ns]')
+                elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                    values = series.to_numpy()
+                else:
+                    values = series.to_numpy(dtype=object)
+            self._columns[name] = values
+        return values
+
+    def index(self, name):
+        """等值索引：值 -> 行号数组"""
+        index = self._indexes.get(name)
+        if index is None:
+            index = pd.Series(self.column(name)).groupby(self.column(name), sort=False).indices \
+                if len(self.frame) else {}
+            self._indexes[name] = index
+        return index
+
+    def mask(self, where):
+        """满足全部条件的行（布尔数组）"""
+        mask = np.ones(len(self.frame), dtype=bool)
+        for name, condition in (where or {}).items():
+            if callable(condition):
+                series = pd.Series(self.column(name))
+                mask &= np.asarray(condition(series), dtype=bool)
+            elif isinstance(condition, dict):
+                mask &= self._range_mask(name, condition)
+            elif not isinstance(condition, (list, tuple, set, frozenset)) and self.column(name).dtype.kind in 'iu':
+                mask &= self.column(name) == condition
+            else:
+                values = condition if isinstance(condition, (list, tuple, set, frozenset)) else [condition]
+                index = self.index(name)
+                matched = np.zeros(len(self.frame), dtype=bool)
+                for value in values:
+                    positions = index.get(value)
+                    if positions is not None:
+                        matched[positions] = True
+                mask &= matched
+            if not mask.any():
+                break
+        return mask
+
+    def _range_mask(self, name, condition):
+        values = self.column(name)
+        mask = np.ones(len(values), dtype=bool)
+        if values.dtype.kind == 'M':
+            convert = lambda bound: np.datetime64(pd.Timestamp(bound).to_datetime64(), 'ns')
+        else:
+            convert = lambda bound: bound
+        if condition.get('min') is not None:
+            mask &= values >= convert(condition['min'])
+        if condition.get('max') is not None:
+            mask &= values <= convert(condition['max'])
+        if condition.get('contains'):
+            text = pd.Series(values, dtype=object).astype(str)
+            mask &= text.str.contains(str(condition['contains']), case=False, regex=False).to_numpy()
+        return mask
+
+    def order(self, order_by=None):
+        """排序后的行号排列（稳定排序，结果被缓存）"""
+        order_by = self.default_order if order_by is None else order_by
+        if not order_by:
+            return np.arange(len(self.frame))
+        key = tuple((item, True) if isinstance(item, str) else tuple(item) for item in order_by)
+        order = self._orders.get(key)
+        if order is None:
+            sort_keys = []
+            for name, ascending in key:
+                values = self.column(name)
+                if values.dtype.kind == 'M':
+                    values = values.view('int64')
+                elif values.dtype.kind not in 'biuf':
+                    values = pd.factorize(values, sort=True)[0]
+                values = values.astype(float) if values.dtype.kind == 'b' else values
+                sort_keys.append(values if ascending else -values)
+            # lexsort以最后一个键为主键
+            order = np.lexsort(sort_keys[::-1])
+            self._orders[key] = order
+        return order
+
+    def run(self, where=None, order_by=None, offset=0, limit=None):
+        """执行查询，返回 (当前页的DataFrame, 满足条件的总行数)"""
+        if len(self.frame) == 0:
+            return self.frame, 0
+        order = self.order(order_by)
+        if where:
+            order = order[self.mask(where)[order]]
+        total = len(order)
+        end = total if limit is None else offset + limit
+        return self.frame.iloc[order[offset:end]], total
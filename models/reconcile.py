@@ -0,0 +1,367 @@
+"""交易市场记录对账
+
+把从交易市场导出的买入/卖出记录与库存表、已售表核对，找出：
+- matched：账本中有对应记录
+- missing：账本中没有这件商品的记录（可以一键补录）
+- duplicated：导出文件中重复的行（同一方向、同一商品、同一价格、时间相差不超过时间窗口）
+- mismatched：账本中有这件商品（名称+磨损值相同），但价格或时间对不上
+
+匹配使用哈希连接：名称（去掉空白和大小写差异）、磨损值（4位小数）、价格（精确到分）
+编码成整数键，时间按窗口分桶，账本每条记录同时登记到相邻的桶中，
+一次 merge 得到所有候选，再筛选时间差并一一配对。十万行的记录几秒内完成，不逐行查找。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.excel_io import read_sheet
+
+# 默认时间窗口：手工录入的时间和交易市场的成交时间通常不完全一致
+DEFAULT_WINDOW = pd.Timedelta(days=1)
+
+# 标准列 -> 导出文件中可能使用的列名（不区分大小写）
+LOG_ALIASES = {
+    'side': ['side', 'type', 'direction', 'trade_type', '交易类型', '类型', '方向'],
+    'goods_name': ['goods_name', 'name', 'item_name', 'market_hash_name', '商品名称', '名称', '饰品名称'],
+    'goods_wear_value': ['goods_wear_value', 'wear_value', 'float', 'paintwear', 'paint_wear', '磨损值', '磨损'],
+    'price': ['price', 'amount', 'trade_price', '价格', '成交价', '金额'],
+    'time': ['time', 'trade_time', 'created_at', 'date', '时间', '成交时间', '交易时间'],
+    'goods_type': ['goods_type', 'category', '商品类型', '类别'],
+    'sub_type': ['sub_type', 'weapon', '子类型', '武器'],
+    'goods_wear': ['goods_wear', 'exterior', 'wear', '磨损等级', '外观'],
+    'is_stattrak': ['is_stattrak', 'stattrak', '暗金'],
+    'extra_income': ['extra_income', '额外收入'],
+}
+REQUIRED_COLUMNS = ['side', 'goods_name', 'goods_wear_value', 'price', 'time']
+
+SIDE_VALUES = {
+    'buy': 'buy', 'purchase': 'buy', 'b': 'buy', '买入': 'buy', '购买': 'buy', '买': 'buy',
+    'sell': 'sell', 'sale': 'sell', 's': 'sell', '卖出': 'sell', '出售': 'sell', '卖': 'sell',
+}
+
+# 磨损值区间的上界和对应的磨损等级
+WEAR_BOUNDS = [0.07, 0.15, 0.38, 0.45]
+WEAR_GRADES = ['崭新出厂', '略有磨损', '久经沙场', '破损不堪', '战痕累累']
+
+_STATTRAK_PATTERN = r'\(?\s*stattrak™?\s*\)?'
+
+
+class ReconcileResult:
+    """对账结果：四个DataFrame，都保留导出文件中的行号（line）"""
+
+    def __init__(self, matched, missing, duplicated, mismatched, window):
+        self.matched = matched
+        self.missing = missing
+        self.duplicated = duplicated
+        self.mismatched = mismatched
+        self.window = window
+
+    def summary(self):
+        return {
+            'matched': len(self.matched),
+            'missing_buy': int((self.missing['side'] == 'buy').sum()),
+            'missing_sell': int((self.missing['side'] == 'sell').sum()),
+            'duplicated': len(self.duplicated),
+            'mismatched': len(self.mismatched),
+        }
+
+
+def read_trade_log(path):
+    """读取导出的交易记录（CSV/Excel/JSONL）并转换为标准列"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        df = read_sheet(path)
+    elif ext == '.jsonl':
+        df = pd.read_json(path, lines=True)
+    else:
+        df = pd.read_csv(path, encoding='utf-8-sig')
+    return normalize_log(df)
+
+
+def normalize_log(df):
+    """列名对应到标准列，方向、价格、时间无法识别的行被丢弃。
+    缺少必需的列时抛出ValueError。
+    """
+    lower = {str(column).strip().lower(): column for column in df.columns}
+    columns = {}
+    for name, aliases in LOG_ALIASES.items():
+        for alias in aliases:
+            if alias.lower() in lower:
+                columns[name] = lower[alias.lower()]
+                break
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"交易记录缺少列: {', '.join(missing)}")
+
+    log = pd.DataFrame({name: df[column].to_numpy() for name, column in columns.items()})
+    # 行号按文件中的行计算（第1行是表头）
+    log.insert(0, 'line', np.arange(2, len(df) + 2))
+    log['side'] = log['side'].astype(str).str.strip().str.lower().map(SIDE_VALUES)
+    log['price'] = pd.to_numeric(log['price'], errors='coerce')
+    log['goods_wear_value'] = pd.to_numeric(log['goods_wear_value'], errors='coerce')
+    # 导出文件中的时间格式可能不统一（有的带时分秒，有的只有日期）
+    log['time'] = pd.to_datetime(log['time'], errors='coerce', format='mixed')
+    if getattr(log['time'].dt, 'tz', None) is not None:
+        log['time'] = log['time'].dt.tz_localize(None)
+
+    names = log['goods_name'].astype(str)
+    stattrak = names.str.contains(_STATTRAK_PATTERN, case=False, regex=True)
+    log['goods_name'] = names.str.replace(_STATTRAK_PATTERN, '', case=False, regex=True).str.split().str.join(' ')
+    if 'is_stattrak' in log.columns:
+        flags = log['is_stattrak'].astype(str).str.strip().str.lower().isin(['1', 'true', 'yes', '是', 'y'])
+        log['is_stattrak'] = flags | stattrak
+    else:
+        log['is_stattrak'] = stattrak
+    if 'extra_income' in log.columns:
+        log['extra_income'] = pd.to_numeric(log['extra_income'], errors='coerce').fillna(0.0)
+
+    valid = log['side'].notna() & log['price'].notna() & log['time'].notna() & (log['goods_name'] != '')
+    return log[valid].reset_index(drop=True)
+
+
+def wear_grades(values):
+    """按磨损值得到磨损等级"""
+    values = np.asarray(values, dtype=float)
+    grades = np.array(WEAR_GRADES, dtype=object)[np.searchsorted(WEAR_BOUNDS, values, side='right')]
+    grades[np.isnan(values)] = ''
+    return grades
+
+
+def reconcile(model, log, window=DEFAULT_WINDOW):
+    """把标准化的交易记录与账本对账
+
+    Args:
+        model (ItemModel): 数据模型（已售记录包括往年归档）
+        log (DataFrame): normalize_log / read_trade_log 的结果
+        window (Timedelta): 时间相差不超过该值才视为同一笔交易
+    """
+    window = pd.Timedelta(window)
+    inventory = model.snapshot().inventory
+    sold = model.get_sold_items()
+    buy_columns = ['inventory_id', 'goods_name', 'goods_wear_value', 'buy_price', 'buy_time']
+    ledger_buys = pd.concat([frame[buy_columns] for frame in (inventory, sold) if not frame.empty],
+                            ignore_index=True) if not (inventory.empty and sold.empty) else None
+    ledger_sells = sold[['inventory_id', 'goods_name', 'goods_wear_value', 'sell_price', 'sell_time']] \
+        if not sold.empty else None
+
+    # 名称在导出记录和账本中统一编码，商品键 = 名称编码 × 10^5 + 磨损值×10^4
+    ledgers = {
+        'buy': _ledger_frame(ledger_buys, 'buy_price', 'buy_time'),
+        'sell': _ledger_frame(ledger_sells, 'sell_price', 'sell_time'),
+    }
+    all_names = pd.concat([log['goods_name']] + [ledger['goods_name'] for ledger in ledgers.values()],
+                          ignore_index=True)
+    codes, _ = pd.factorize(_normalize_names(all_names))
+    log = log.assign(item_key=_item_keys(codes[:len(log)], log['goods_wear_value']),
+                     price_key=_price_keys(log['price']),
+                     seconds=_seconds(log['time']))
+    offset = len(log)
+    for side, ledger in ledgers.items():
+        ledger['item_key'] = _item_keys(codes[offset:offset + len(ledger)], ledger['goods_wear_value'])
+        offset += len(ledger)
+
+    duplicated_mask = _duplicated(log, window)
+    duplicated = log[duplicated_mask]
+    unique = log[~duplicated_mask]
+
+    matched, missing, mismatched = [], [], []
+    for side, ledger in ledgers.items():
+        rows = unique[unique['side'] == side]
+        if rows.empty:
+            continue
+        side_matched, rest = _match_exact(rows, ledger, window)
+        side_mismatched, side_missing = _match_item(rest, ledger)
+        matched.append(side_matched)
+        mismatched.append(side_mismatched)
+        missing.append(side_missing)
+
+    internal = ['item_key', 'price_key', 'seconds', 'ledger_row']
+    return ReconcileResult(
+        matched=_concat(matched, log).drop(columns=internal, errors='ignore'),
+        missing=_concat(missing, log).drop(columns=internal, errors='ignore'),
+        duplicated=duplicated.drop(columns=internal, errors='ignore'),
+        mismatched=_concat(mismatched, log).drop(columns=internal, errors='ignore'),
+        window=window,
+    )
+
+
+def apply_missing(model, result, catalog=None):
+    """把缺少的记录写入账本：先批量添加缺少的买入，再批量出售缺少的卖出。
+    所有修改在一个事务中完成（只写一次文件，可以一次撤销）。
+
+    Args:
+        catalog (SkinCatalog, optional): 导出记录没有商品类型时，按名称从饰品目录中查找；
+            同名饰品属于多个子类型、无法确定时抛出ValueError，不写入任何记录
+
+    Returns:
+        dict: added（添加的商品数）、sold（出售的商品数）、skipped（库存中找不到对应商品的卖出记录）
+    """
+    missing = result.missing
+    buys = missing[missing['side'] == 'buy']
+    sells = missing[missing['side'] == 'sell']
+    with model.transaction():
+        added = model.add_items(_purchase_items(buys, catalog)) if not buys.empty else 0
+        sales = []
+        skipped = 0
+        if not sells.empty:
+            inventory = model.snapshot().inventory
+            names = pd.concat([sells['goods_name'], inventory['goods_name']], ignore_index=True)
+            codes, _ = pd.factorize(_normalize_names(names))
+            # 名称和磨损值相同的多件商品依次对应多条卖出记录
+            sell_keys = pd.DataFrame({'item_key': _item_keys(codes[:len(sells)], sells['goods_wear_value'])})
+            sell_keys['occurrence'] = sell_keys.groupby('item_key').cumcount()
+            inventory_keys = pd.DataFrame({
+                'item_key': _item_keys(codes[len(sells):], inventory['goods_wear_value']),
+                'inventory_id': inventory['inventory_id'].to_numpy(),
+            })
+            inventory_keys['occurrence'] = inventory_keys.groupby('item_key').cumcount()
+            inventory_ids = sell_keys.merge(inventory_keys, on=['item_key', 'occurrence'], how='left')[
+                'inventory_id'].to_numpy()
+            found = pd.notna(inventory_ids)
+            skipped = int((~found).sum())
+            extra_income = sells['extra_income'].to_numpy() if 'extra_income' in sells.columns \
+                else np.zeros(len(sells))
+            sales = [{'inventory_id': inventory_id, 'sell_price': float(price), 'extra_income': float(extra),
+                      'sell_time': time.to_pydatetime()}
+                     for inventory_id, price, extra, time in zip(inventory_ids[found], sells['price'].to_numpy()[found],
+                                                                 extra_income[found], sells['time'][found])]
+        sold = model.sell_items(sales) if sales else 0
+        if sold < len(sales):
+            # sell_items出错时只打印错误并返回0，抛出异常让已添加的买入记录一起回滚
+            raise ValueError(f"补录卖出记录失败（{sold}/{len(sales)}），所有修改已撤销")
+    return {'added': added, 'sold': sold, 'skipped': skipped}
+
+
+def _ledger_frame(df, price_column, time_column):
+    if df is None:
+        return pd.DataFrame({'inventory_id': pd.Series(dtype=object), 'goods_name': pd.Series(dtype=object),
+                             'goods_wear_value': pd.Series(dtype=float), 'ledger_price': pd.Series(dtype=float),
+                             'ledger_time': pd.Series(dtype='datetime64[ns]'), 'price_key': pd.Series(dtype=np.int64),
+                             'seconds': pd.Series(dtype=np.int64)})
+    ledger = pd.DataFrame({
+        'inventory_id': df['inventory_id'].to_numpy(),
+        'goods_name': df['goods_name'].astype(str).to_numpy(),
+        'goods_wear_value': pd.to_numeric(df['goods_wear_value'], errors='coerce').to_numpy(dtype=float),
+        'ledger_price': pd.to_numeric(df[price_column], errors='coerce').to_numpy(dtype=float),
+        'ledger_time': pd.to_datetime(df[time_column]).to_numpy(dtype='datetime64[ns]'),
+    })
+    ledger['price_key'] = _price_keys(ledger['ledger_price'])
+    ledger['seconds'] = _seconds(ledger['ledger_time'])
+    return ledger
+
+
+def _normalize_names(names):
+    return names.astype(str).str.replace(_STATTRAK_PATTERN, '', case=False, regex=True) \
+        .str.split().str.join(' ').str.casefold()
+
+
+def _item_keys(name_codes, wear_values):
+    wear = np.round(pd.to_numeric(pd.Series(wear_values), errors='coerce').to_numpy(dtype=float) * 10000)
+    wear = np.where(np.isnan(wear), 10001, wear).astype(np.int64)
+    return np.asarray(name_codes, dtype=np.int64) * 100000 + wear
+
+
+def _price_keys(prices):
+    values = np.round(pd.to_numeric(pd.Series(prices), errors='coerce').to_numpy(dtype=float) * 100)
+    return np.where(np.isnan(values), -1, values).astype(np.int64)
+
+
+def _seconds(times):
+    return pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _duplicated(log, window):
+    """同一方向、商品和价格，时间与前一条相差不超过窗口的行"""
+    order = log.sort_values(['side', 'item_key', 'price_key', 'seconds'], kind='stable')
+    same = (order['side'].to_numpy()[1:] == order['side'].to_numpy()[:-1]) \
+        & (order['item_key'].to_numpy()[1:] == order['item_key'].to_numpy()[:-1]) \
+        & (order['price_key'].to_numpy()[1:] == order['price_key'].to_numpy()[:-1]) \
+        & (np.diff(order['seconds'].to_numpy()) <= window.total_seconds())
+    flags = np.concatenate([[False], same])
+    return pd.Series(flags, index=order.index).reindex(log.index).to_numpy()
+
+
+def _match_exact(rows, ledger, window):
+    """按 (商品, 价格, 时间桶) 哈希连接，时间差在窗口内的候选按时间差一一配对"""
+    seconds = max(int(window.total_seconds()), 1)
+    rows = rows.assign(bucket=rows['seconds'] // seconds)
+    # 账本记录登记到自己和相邻的时间桶，窗口两侧的记录也能连接上
+    base = ledger.assign(ledger_row=ledger.index, bucket=ledger['seconds'] // seconds)
+    expanded = pd.concat([base.assign(bucket=base['bucket'] + shift) for shift in (-1, 0, 1)], ignore_index=True)
+    candidates = rows.reset_index().merge(
+        expanded[['item_key', 'price_key', 'bucket', 'ledger_row', 'seconds', 'inventory_id', 'ledger_price',
+                  'ledger_time']],
+        on=['item_key', 'price_key', 'bucket'], suffixes=('', '_ledger'))
+    candidates['time_diff'] = (candidates['seconds'] - candidates['seconds_ledger']).abs()
+    candidates = candidates[candidates['time_diff'] <= seconds].sort_values('time_diff', kind='stable')
+    # 每条导出记录和每条账本记录最多配对一次
+    candidates = candidates.drop_duplicates('index').drop_duplicates('ledger_row')
+    matched = candidates.set_index('index')[['ledger_row', 'inventory_id', 'ledger_price', 'ledger_time']]
+    matched = rows.drop(columns='bucket').join(matched, how='inner')
+    return matched, rows.drop(columns='bucket')[~rows.index.isin(matched.index)]
+
+
+def _match_item(rows, ledger):
+    """只按商品（名称+磨损值）连接：有对应商品的是不一致的记录，否则是缺少的记录"""
+    if rows.empty:
+        return rows.assign(ledger_row=[]), rows
+    candidates = rows.reset_index().merge(
+        ledger.assign(ledger_row=ledger.index)[['item_key', 'ledger_row', 'seconds', 'inventory_id',
+                                                 'ledger_price', 'ledger_time']],
+        on='item_key', suffixes=('', '_ledger'))
+    candidates['time_diff'] = (candidates['seconds'] - candidates['seconds_ledger']).abs()
+    candidates = candidates.sort_values('time_diff', kind='stable').drop_duplicates('index')
+    mismatched = rows.join(candidates.set_index('index')[['ledger_row', 'inventory_id', 'ledger_price',
+                                                          'ledger_time']], how='inner')
+    mismatched['price_diff'] = mismatched['price'] - mismatched['ledger_price']
+    mismatched['time_diff'] = mismatched['time'] - mismatched['ledger_time']
+    return mismatched, rows[~rows.index.isin(mismatched.index)]
+
+
+def _concat(frames, log):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return log.iloc[:0]
+    return pd.concat(frames).sort_values('line', kind='stable')
+
+
+def _purchase_items(buys, catalog=None):
+    """缺少的买入记录转换为 add_items 的参数"""
+    goods_types = buys['goods_type'] if 'goods_type' in buys.columns else pd.Series('', index=buys.index)
+    sub_types = buys['sub_type'] if 'sub_type' in buys.columns else pd.Series('', index=buys.index)
+    goods_wears = buys['goods_wear'] if 'goods_wear' in buys.columns else pd.Series('', index=buys.index)
+    goods_wears = goods_wears.fillna('').astype(str).where(goods_wears.notna() & (goods_wears.astype(str) != ''),
+                                                          wear_grades(buys['goods_wear_value']))
+    items = []
+    lookups = {}
+    ambiguous = []
+    for name, goods_type, sub_type, goods_wear, wear_value, stattrak, price, time in zip(
+            buys['goods_name'], goods_types.fillna(''), sub_types.fillna(''), goods_wears,
+            buys['goods_wear_value'], buys['is_stattrak'], buys['price'], buys['time']):
+        if (not goods_type or not sub_type) and catalog is not None:
+            key = (name, goods_type, sub_type)
+            if key not in lookups:
+                try:
+                    lookups[key] = catalog.resolve(name, goods_type, sub_type)
+                except ValueError as e:
+                    ambiguous.append(str(e))
+                    lookups[key] = None
+            entry = lookups[key]
+            if entry is not None:
+                goods_type = goods_type or entry[1]
+                sub_type = sub_type or entry[2]
+        items.append({
+            'goods_name': name,
+            'goods_type': goods_type,
+            'sub_type': sub_type,
+            'goods_wear': goods_wear,
+            'goods_wear_value': float(wear_value),
+            'is_stattrak': bool(stattrak),
+            'buy_price': float(price),
+            'buy_time': time.to_pydatetime(),
+        })
+    if ambiguous:
+        # 不猜测同名饰品的类型，整批不补录
+        raise ValueError('；'.join(ambiguous[:5]) + (f" 等 {len(ambiguous)} 个饰品" if len(ambiguous) > 5 else ''))
+    return items
@@ -0,0 +1,121 @@
+"""饰品目录：添加商品时按名称前缀补全
+
+目录来自随程序提供的 data/skin_catalog.csv（列: goods_name, goods_type, sub_type），
+可以替换为更完整的导出文件，列相同即可。
+
+索引是排好序的检索键列表（名称，以及"子类型 名称"），前缀查询用两次二分查找
+定位到连续的一段，不需要逐条比较，几万条目录也能在亚毫秒内返回。
+同一名称的皮肤可能属于多种武器（如各种匕首的"多普勒"），条目以 (名称, 子类型) 区分，
+只按名称查找时需要用 resolve 确认结果唯一。
+目录在第一次使用时才加载，之后在进程内共用。
+"""
+from bisect import bisect_left
+import csv
+import os
+import threading
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'data', 'skin_catalog.csv')
+# 比任何实际字符都大，用于求前缀区间的右端
+_PREFIX_END = '\U0010ffff'
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+class SkinCatalog:
+    """饰品目录和前缀索引"""
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (list): (goods_name, goods_type, sub_type) 元组列表
+        """
+        self.entries = entries
+        keys = []
+        for position, (name, goods_type, sub_type) in enumerate(entries):
+            keys.append((_normalize(name), position))
+            if sub_type:
+                keys.append((_normalize(f"{sub_type} {name}"), position))
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._positions = [position for _, position in keys]
+        self._exact = {}
+        for position, (name, goods_type, sub_type) in enumerate(entries):
+            self._exact.setdefault(_normalize(name), []).append(position)
+            if sub_type:
+                self._exact.setdefault(_normalize(f"{sub_type} {name}"), []).append(position)
+
+    @classmethod
+    def from_file(cls, file_path=DEFAULT_CATALOG):
+        """从CSV文件加载目录，文件不存在时为空目录"""
+        entries = []
+        seen = set()
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    entry = (row['goods_name'].strip(), row.get('goods_type', '').strip(),
+                             row.get('sub_type', '').strip())
+                    if entry[0] and entry not in seen:
+                        seen.add(entry)
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"加载饰品目录出错: {str(e)}")
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def complete(self, prefix, limit=50):
+        """返回名称（或"子类型 名称"）以prefix开头的条目，最多limit条"""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect_left(self._keys, prefix)
+        stop = bisect_left(self._keys, prefix + _PREFIX_END, start)
+        result = []
+        seen = set()
+        for position in self._positions[start:stop]:
+            if position not in seen:
+                seen.add(position)
+                result.append(self.entries[position])
+                if len(result) >= limit:
+                    break
+        return result
+
+    def lookup(self, name, goods_type=None, sub_type=None):
+        """名称（或"子类型 名称"）完全相同的条目，同名饰品可能属于多个子类型；
+        给出goods_type或sub_type时只返回该类型的条目
+        """
+        entries = [self.entries[position] for position in self._exact.get(_normalize(name), [])]
+        if goods_type:
+            entries = [entry for entry in entries if entry[1] == goods_type]
+        if sub_type:
+            entries = [entry for entry in entries if entry[2] == sub_type]
+        return entries
+
+    def resolve(self, name, goods_type=None, sub_type=None):
+        """按名称和类型确定唯一的条目，目录中没有时返回None，仍有多个条目时抛出ValueError"""
+        entries = self.lookup(name, goods_type, sub_type)
+        if len(entries) > 1:
+            raise ValueError(f"饰品目录中有多个同名饰品: {name}"
+                             f"（{'、'.join(entry[2] for entry in entries)}），需要指定子类型")
+        return entries[0] if entries else None
+
+
+def get_catalog(file_path=DEFAULT_CATALOG):
+    """获取目录（第一次调用时加载）"""
+    catalog = _catalogs.get(file_path)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(file_path)
+            if catalog is None:
+                catalog = SkinCatalog.from_file(file_path)
+                _catalogs[file_path] = catalog
+    return catalog
+
+
+def _normalize(text):
+    return ' '.join(str(text).split()).casefold()
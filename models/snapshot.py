@@ -0,0 +1,46 @@
+"""数据快照（写时复制）
+
+pandas的写时复制（Copy-on-Write）模式下，浅复制得到的DataFrame与原对象共享列数据，
+任何一方修改时才复制被修改的列（块），pandas 3 总是启用，pandas 2 在导入本模块时启用。
+模型对外返回的表格都是浅复制，不再整表深复制：调用方修改返回的表格不会改变缓存，
+模型之后的修改（生成新的DataFrame或只替换被修改的列）也不会改变已经返回的表格。
+
+ModelSnapshot 是某一数据版本下各工作表的只读快照。数据没有修改时 ItemModel.snapshot()
+返回同一个快照对象，界面刷新不分配内存；后台线程持有快照即可读取一致的数据，
+不受之后修改的影响，用 is_current 判断快照是否已过期。
+"""
+import pandas as pd
+
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+def share_frame(frame):
+    """与frame共享数据的浅复制（写时复制），frame为None时返回None"""
+    return None if frame is None else frame.copy(deep=False)
+
+
+class ModelSnapshot:
+    """某一数据版本下各工作表的只读快照，工作表通过同名属性访问（如 snapshot.inventory）"""
+
+    def __init__(self, versions, frames):
+        """
+        Args:
+            versions (dict): 工作表名 -> 生成快照时的数据版本
+            frames (dict): 工作表名 -> DataFrame
+        """
+        object.__setattr__(self, 'versions', dict(versions))
+        object.__setattr__(self, '_frames', {sheet: share_frame(frame) for sheet, frame in frames.items()})
+
+    def __getattr__(self, sheet):
+        try:
+            return self._frames[sheet]
+        except KeyError:
+            raise AttributeError(sheet) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("快照是只读的")
+
+    def is_current(self, versions):
+        """快照是否仍是versions（模型当前的数据版本）对应的数据"""
+        return all(versions.get(sheet) == version for sheet, version in self.versions.items())
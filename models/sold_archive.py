@@ -0,0 +1,179 @@
+from datetime import datetime
+import pandas as pd
+import json
+import os
+from utils.atomic_file import atomic_write_path
+from utils.excel_io import read_sheet, write_sheets
+from utils.metrics import METRICS
+from models.portfolio_analytics import annualized_weights, trade_analytics
+
+
+class SoldArchive:
+    """按售出年份分区的已售商品归档。
+
+    往年的已售记录从主数据文件移到归档目录中，每个分区是一个只写一次的xlsx文件，
+    之后不再修改（同一年份后来又归档的记录写入新的分区文件）。
+    index.json中记录每个分区的文件名和预先计算好的汇总数据，
+    统计和图表只读索引即可，分区文件只在需要查看明细时才加载。
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = {'partitions': []}
+        self._index_signature = None
+        # 已加载的分区：文件名 -> DataFrame（分区文件不会被修改，可以一直缓存）
+        self._frames = {}
+
+    def _index_path(self):
+        return os.path.join(self.directory, self.INDEX_FILE)
+
+    def _refresh_index(self):
+        """索引文件被（其他进程）修改时重新读取"""
+        try:
+            st = os.stat(self._index_path())
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        if signature == self._index_signature:
+            return
+        if signature is None:
+            self._index = {'partitions': []}
+        else:
+            try:
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取归档索引时出错: {str(e)}")
+                return
+        self._index_signature = signature
+
+    def partitions(self):
+        """所有分区的索引记录"""
+        self._refresh_index()
+        return list(self._index['partitions'])
+
+    def years(self):
+        """已归档的年份（升序）"""
+        return sorted({partition['year'] for partition in self.partitions()})
+
+    def load(self, year):
+        """加载某一年的全部归档记录"""
+        frames = []
+        for partition in self.partitions():
+            if partition['year'] != year:
+                continue
+            frames.append(self._load_partition(partition))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def _load_partition(self, partition):
+        frame = self._frames.get(partition['file'])
+        if METRICS.enabled:
+            METRICS.cache_hit('sold_archive', frame is not None)
+        if frame is None:
+            frame = read_sheet(os.path.join(self.directory, partition['file']))
+            self._frames[partition['file']] = frame
+        return frame
+
+    def load_all(self, years=None):
+        """加载多个年份（默认全部）的归档记录"""
+        frames = [self.load(year) for year in (self.years() if years is None else years)]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def aggregates(self):
+        """合并所有分区的预计算汇总数据（不加载分区文件，早期索引缺少的汇总项除外）"""
+        self._refresh_index()
+        for partition in self._index['partitions']:
+            if 'annualized_cost_base' not in partition['summary']:
+                # 早期分区的年化汇总包括短期交易，加载一次分区重新计算（只更新内存中的索引）
+                partition['summary'] = summarize_sold(self._load_partition(partition))
+        return merge_summaries(partition['summary'] for partition in self._index['partitions'])
+
+    def write_partition(self, year, df):
+        """写入一个新的分区文件并登记到索引。
+        调用方负责持有数据文件的锁。先写分区文件再写索引，
+        中途出错时未登记的分区文件会被忽略。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._refresh_index()
+        existing = {partition['file'] for partition in self._index['partitions']}
+        file_name = f"sold_{year}.xlsx"
+        seq = 1
+        while file_name in existing:
+            seq += 1
+            file_name = f"sold_{year}_{seq}.xlsx"
+
+        df = df.reset_index(drop=True)
+        with atomic_write_path(os.path.join(self.directory, file_name)) as tmp_path:
+            write_sheets(tmp_path, {'Sheet1': df})
+        self._frames[file_name] = df
+
+        index = {'partitions': self._index['partitions'] + [{
+            'year': int(year),
+            'file': file_name,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'summary': summarize_sold(df),
+        }]}
+        with atomic_write_path(self._index_path()) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+        self._index = index
+        self._index_signature = None
+        return file_name
+
+
+def summarize_sold(df):
+    """计算一组已售记录的汇总数据（可以逐分区合并）"""
+    summary = {
+        'count': 0,
+        'total_profit': 0.0,
+        'hold_days_sum': 0.0,
+        'cost_sum': 0.0,
+        'annualized_cost_sum': 0.0,
+        'annualized_cost_base': 0.0,
+        'profit_by_type': {},
+        'profit_by_day': {},
+    }
+    if df is None or df.empty:
+        return summary
+    summary['count'] = int(len(df))
+    summary['total_profit'] = float(df['total_profit'].sum())
+    summary['hold_days_sum'] = float(df['hold_days'].sum())
+    # 以成本加权的平均年化收益率 = annualized_cost_sum / annualized_cost_base（不含短期交易）
+    trades = trade_analytics(df)
+    weights = annualized_weights(trades)
+    summary['cost_sum'] = float(trades['buy_price'].sum())
+    summary['annualized_cost_sum'] = float((trades['annualized_return'] * weights).sum())
+    summary['annualized_cost_base'] = float(weights.sum())
+    summary['profit_by_type'] = {
+        str(goods_type): float(profit)
+        for goods_type, profit in df.groupby('goods_type')['total_profit'].sum().items()
+    }
+    days = pd.to_datetime(df['sell_time']).dt.strftime('%Y-%m-%d')
+    summary['profit_by_day'] = {
+        day: float(profit) for day, profit in df['total_profit'].groupby(days).sum().items()
+    }
+    return summary
+
+
+def merge_summaries(summaries):
+    """合并多个summarize_sold的结果"""
+    merged = summarize_sold(None)
+    for summary in summaries:
+        merged['count'] += summary['count']
+        merged['total_profit'] += summary['total_profit']
+        merged['hold_days_sum'] += summary['hold_days_sum']
+        # 早期分区的索引中没有这两项
+        merged['cost_sum'] += summary.get('cost_sum', 0.0)
+        merged['annualized_cost_sum'] += summary.get('annualized_cost_sum', 0.0)
+        merged['annualized_cost_base'] += summary.get('annualized_cost_base', 0.0)
+        for key in ('profit_by_type', 'profit_by_day'):
+            for name, profit in summary[key].items():
+                merged[key][name] = merged[key].get(name, 0.0) + profit
+    return merged
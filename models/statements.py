@@ -0,0 +1,265 @@
+"""月度/年度对账单
+
+把已售记录、资金流水和每日净值整理成按月或按年的对账单，输出为HTML文件
+（PDF由界面的后台任务用同一份HTML生成）。
+
+所有对账单的汇总数据一次算出：已售记录按期间分组后用 summarize_sold 计算
+（与归档索引中的预计算汇总相同的结构），资金流水和净值同样按期间分组；
+每份对账单只列出收益最高和最低的几笔交易，不逐行格式化全部记录。
+图表生成为SVG（utils/svg_chart.py），不需要图形界面，可以在后台线程中生成。
+"""
+import base64
+from html import escape
+import os
+
+import numpy as np
+import pandas as pd
+
+from models.nav_series import nav_frame
+from models.sold_archive import summarize_sold
+from utils.svg_chart import WIDTH, bar_chart, line_chart
+
+# 期间 -> 子期间名称（月度对账单按日汇总，年度对账单按月汇总）
+PERIODS = {'month': '日', 'year': '月'}
+# 每份对账单列出的交易笔数
+TOP_TRADES = 10
+
+TRADE_COLUMNS = ['goods_name', 'goods_wear', 'buy_price', 'sell_price', 'extra_income', 'hold_days',
+                 'total_profit', 'sell_time']
+TRADE_HEADERS = ['商品名称', '磨损', '买入价', '售价', '额外收入', '持有天数', '收益', '售出时间']
+
+_STYLE = """
+body { font-family: sans-serif; margin: 24px; color: #222; }
+h1 { font-size: 20px; }
+h2 { font-size: 15px; margin-top: 24px; border-bottom: 1px solid #ccc; }
+table { border-collapse: collapse; margin: 8px 0; }
+th, td { border: 1px solid #ccc; padding: 3px 8px; font-size: 12px; }
+th { background: #f0f0f0; }
+td.num { text-align: right; }
+"""
+
+
+def statement_periods(sold, period='month', years=None):
+    """有售出记录的期间键（升序），years为年份列表时只包括这些年份"""
+    if sold is None or sold.empty:
+        return []
+    times = pd.to_datetime(sold['sell_time'])
+    if years is not None:
+        times = times[times.dt.year.isin(years)]
+    codes, _ = _period_codes(times, period)
+    return [_period_key(code, period) for code in np.unique(codes)]
+
+
+def build_statements(sold, flows=None, nav_records=None, period='month', years=None):
+    """计算对账单数据
+
+    Args:
+        sold (DataFrame): 已售记录（get_sold_items 的结果）
+        flows (DataFrame, optional): 资金流水（get_cash_flows 的结果）
+        nav_records (ndarray, optional): 每日净值记录（NavStore.load 的结果）
+        period (str): 'month' 或 'year'
+        years (list, optional): 只生成这些年份的对账单
+
+    Returns:
+        list[dict]: 每个期间一份对账单数据，按期间升序
+    """
+    if sold is None or sold.empty:
+        return []
+    sold = sold.assign(sell_time=pd.to_datetime(sold['sell_time']),
+                       total_profit=pd.to_numeric(sold['total_profit'], errors='coerce').fillna(0))
+    if years is not None:
+        sold = sold[sold['sell_time'].dt.year.isin(years)]
+    if sold.empty:
+        return []
+    # 期间用整数编码（年*100+月 或 年）分组，只为每个期间格式化一次键
+    codes, sub_codes = _period_codes(sold['sell_time'], period)
+
+    # 资金流水和净值按期间分组一次
+    flow_totals = {}
+    if flows is not None and not flows.empty:
+        flow_codes, _ = _period_codes(pd.to_datetime(flows['time']), period)
+        amounts = pd.to_numeric(flows['amount'], errors='coerce').fillna(0)
+        flow_totals = amounts.groupby([flow_codes, flows['kind'].to_numpy()]).sum().to_dict()
+    nav = nav_frame(nav_records) if nav_records is not None and len(nav_records) else None
+    nav_codes = _period_codes(nav.index.to_series(), period)[0] if nav is not None else None
+
+    sub_profit = sold['total_profit'].groupby([codes, sub_codes]).sum()
+    # 每个期间收益最高和亏损最多的交易：排序一次后按期间取前几行
+    ranked = sold.assign(code=codes).sort_values('total_profit', ascending=False, kind='stable')
+    best = dict(tuple(ranked.groupby('code', sort=False).head(TOP_TRADES).groupby('code', sort=False)))
+    losses = ranked[ranked['total_profit'] < 0]
+    worst = dict(tuple(losses.groupby('code', sort=False).tail(TOP_TRADES)[::-1].groupby('code', sort=False)))
+
+    statements = []
+    for code, part in sold.groupby(codes, sort=True):
+        key = _period_key(code, period)
+        summary = summarize_sold(part)
+        revenue = float(pd.to_numeric(part['sell_price'], errors='coerce').fillna(0).sum()
+                        + pd.to_numeric(part['extra_income'], errors='coerce').fillna(0).sum())
+        cost = summary['cost_sum']
+        statement = {
+            'period': period,
+            'key': key,
+            'title': _title(period, key),
+            'count': summary['count'],
+            'revenue': revenue,
+            'cost': cost,
+            'total_profit': summary['total_profit'],
+            'return_rate': summary['total_profit'] / cost if cost else 0.0,
+            'annualized_return': summary['annualized_cost_sum'] / summary['annualized_cost_base']
+            if summary['annualized_cost_base'] else 0.0,
+            'avg_hold_days': summary['hold_days_sum'] / summary['count'] if summary['count'] else 0.0,
+            'investment': float(flow_totals.get((code, 'investment'), 0.0)),
+            'fees': float(flow_totals.get((code, 'fee'), 0.0)),
+            'profit_by_type': sorted(summary['profit_by_type'].items(), key=lambda item: -item[1]),
+            'profit_by_sub_period': [(f"{key}-{sub:02d}", float(profit))
+                                     for sub, profit in sub_profit.loc[code].items()],
+            'best_trades': best[code][TRADE_COLUMNS],
+            'worst_trades': worst[code][TRADE_COLUMNS] if code in worst else ranked.iloc[:0][TRADE_COLUMNS],
+            'nav': None,
+        }
+        if nav is not None:
+            period_nav = nav['nav'][nav_codes == code]
+            if not period_nav.empty:
+                statement['nav'] = period_nav
+        statements.append(statement)
+    return statements
+
+
+def statement_charts(statement):
+    """对账单的图表（名称 -> SVG）"""
+    sub_name = PERIODS[statement['period']]
+    labels = [key[-2:] for key, _ in statement['profit_by_sub_period']]
+    charts = {
+        'profit': bar_chart(labels, [profit for _, profit in statement['profit_by_sub_period']],
+                            f"每{sub_name}收益"),
+    }
+    nav = statement['nav']
+    if nav is not None:
+        charts['nav'] = line_chart(nav.index.strftime('%m-%d'), nav.to_numpy(), '每日净值')
+    return charts
+
+
+def render_statement_html(statement, charts=None, image_src=None):
+    """生成对账单HTML
+
+    Args:
+        charts (dict, optional): statement_charts 的结果，未提供时重新生成
+        image_src (callable, optional): 图表名称 -> img标签的src；默认把SVG作为data URI嵌入，
+            文件可以单独打开
+    """
+    charts = statement_charts(statement) if charts is None else charts
+    if image_src is None:
+        def image_src(name):
+            return 'data:image/svg+xml;base64,' + base64.b64encode(charts[name].encode('utf-8')).decode('ascii')
+
+    sub_name = PERIODS[statement['period']]
+    rows = [
+        ('售出数量', f"{statement['count']}"),
+        ('售出总额', _money(statement['revenue'])),
+        ('买入成本', _money(statement['cost'])),
+        ('收益', _money(statement['total_profit'])),
+        ('收益率', f"{statement['return_rate'] * 100:.2f}%"),
+        ('年化收益率', f"{statement['annualized_return'] * 100:.2f}%"),
+        ('平均持有天数', f"{statement['avg_hold_days']:.1f}"),
+        ('追加投资', _money(statement['investment'])),
+        ('手续费', _money(statement['fees'])),
+    ]
+    nav = statement['nav']
+    if nav is not None:
+        rows.append(('期初净值', _money(nav.iloc[0])))
+        rows.append(('期末净值', _money(nav.iloc[-1])))
+
+    parts = [
+        '<!DOCTYPE html>',
+        '<html><head><meta charset="utf-8">',
+        f"<title>{escape(statement['title'])}</title>",
+        f"<style>{_STYLE}</style>",
+        '</head><body>',
+        f"<h1>{escape(statement['title'])}</h1>",
+        '<h2>概览</h2>',
+        _table(['项目', '数值'], rows),
+        '<h2>图表</h2>',
+    ]
+    for name in charts:
+        parts.append(f'<p><img src="{escape(image_src(name))}" width="{WIDTH}" alt="{escape(name)}"></p>')
+    parts.append('<h2>按类型收益</h2>')
+    parts.append(_table(['商品类型', '收益'], [(goods_type, _money(profit))
+                                              for goods_type, profit in statement['profit_by_type']]))
+    parts.append(f'<h2>按{sub_name}收益</h2>')
+    parts.append(_table([sub_name, '收益'], [(key, _money(profit))
+                                             for key, profit in statement['profit_by_sub_period']]))
+    parts.append(f'<h2>收益最高的 {TOP_TRADES} 笔交易</h2>')
+    parts.append(_trade_table(statement['best_trades']))
+    if not statement['worst_trades'].empty:
+        parts.append('<h2>亏损最多的交易</h2>')
+        parts.append(_trade_table(statement['worst_trades']))
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+def statement_file_name(statement, fmt='html'):
+    return f"statement_{statement['key']}.{fmt}"
+
+
+def write_statements_html(statements, directory, progress=None):
+    """把对账单写入directory，每份一个HTML文件，返回文件路径列表。
+    progress(已完成数, 总数) 返回False时停止。
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index, statement in enumerate(statements):
+        path = os.path.join(directory, statement_file_name(statement))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render_statement_html(statement))
+        paths.append(path)
+        if progress is not None and progress(index + 1, len(statements)) is False:
+            break
+    return paths
+
+
+def _period_codes(times, period):
+    """期间编码和子期间编码：月度为 (年*100+月, 日)，年度为 (年, 月)"""
+    year = times.dt.year.to_numpy(dtype=np.int64)
+    month = times.dt.month.to_numpy(dtype=np.int64)
+    if period == 'year':
+        return year, month
+    return year * 100 + month, times.dt.day.to_numpy(dtype=np.int64)
+
+
+def _period_key(code, period):
+    code = int(code)
+    return str(code) if period == 'year' else f"{code // 100}-{code % 100:02d}"
+
+
+def _title(period, key):
+    if period == 'year':
+        return f"{key}年对账单"
+    year, month = key.split('-')
+    return f"{year}年{int(month)}月对账单"
+
+
+def _money(value):
+    return f"{float(value):,.2f}"
+
+
+def _table(headers, rows, text_columns=1):
+    """HTML表格，前text_columns列为文字，其余列右对齐"""
+    head = ''.join(f"<th>{escape(str(header))}</th>" for header in headers)
+    body = []
+    for row in rows:
+        cells = []
+        for index, value in enumerate(row):
+            css = ' class="num"' if index >= text_columns else ''
+            cells.append(f"<td{css}>{escape(str(value))}</td>")
+        body.append(f"<tr>{''.join(cells)}</tr>")
+    return f"<table><tr>{head}</tr>{''.join(body)}</table>"
+
+
+def _trade_table(trades):
+    rows = []
+    for trade in trades.itertuples(index=False):
+        rows.append((trade.goods_name, trade.goods_wear, _money(trade.buy_price), _money(trade.sell_price),
+                     _money(trade.extra_income or 0), int(trade.hold_days),
+                     _money(trade.total_profit), pd.Timestamp(trade.sell_time).strftime('%Y-%m-%d %H:%M')))
+    return _table(TRADE_HEADERS, rows, text_columns=2)
@@ -0,0 +1,426 @@
+"""本地HTTP/JSON接口服务（不依赖PyQt5）
+
+在同一个进程内常驻一个ItemModel/ItemMapping实例，供脚本和机器人调用：
+
+    python -m services.api_service --port 8765
+
+接口：
+    GET  /inventory          查询库存（可选参数 state/goods_type/sub_type/offset/limit）
+    GET  /sold               查询已售商品（可选参数 offset/limit）
+    GET  /stats              数据统计
+    GET  /analytics          收益分析（已实现/未实现收益、年化收益率、时间加权收益率）
+    GET  /metrics            性能指标快照（设置CS2_METRICS=1时收集）
+    GET  /alerts             价格提醒规则和最近触发的提醒（可选参数 limit）
+    POST /items              添加商品
+    POST /items/bulk         批量添加商品 {"items": [...]}
+    POST /sell               出售商品
+    POST /prices             更新价格 {"prices": {"<mapping_id>": price}}
+    POST /alerts             添加价格提醒 {"scope": ..., "kind": ..., "threshold": ..., "target": ...}
+
+所有写操作通过唯一的写任务串行执行，读操作直接使用最近一次写入后更新的快照，
+因此读请求不会被写入文件阻塞。每次写入后只重新读取数据版本发生变化的工作表；
+收益分析和价格提醒需要访问模型或提醒规则文件，也交给写任务执行，
+收益分析只在请求时计算，数据、价格和日期都没有变化时使用上次的结果。
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from models.item_mapping import ItemMapping
+from models.item_model import ItemModel
+from models.portfolio_analytics import compute_portfolio_analytics
+from models.price_alerts import AlertQueue, PriceAlertEngine
+from utils.metrics import install_from_env, metrics
+
+
+class ApiError(Exception):
+    """返回给客户端的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _Snapshot:
+    """某一时刻的只读数据快照"""
+
+    def __init__(self, versions, inventory, sold_items, stats):
+        # 工作表名 -> 生成快照时模型的数据版本
+        self.versions = versions
+        self.inventory = inventory
+        self.sold_items = sold_items
+        self.stats = stats
+
+
+class ApiService:
+    """基于asyncio的本地JSON接口服务"""
+
+    STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   405: 'Method Not Allowed', 409: 'Conflict', 500: 'Internal Server Error'}
+
+    def __init__(self, model, mapping=None, sync_interval=30.0):
+        self.model = model
+        self.mapping = mapping
+        # 每批价格更新后评估提醒规则，触发的提醒写入队列文件
+        self.alerts = PriceAlertEngine(model, mapping).attach() if mapping is not None else None
+        self.sync_interval = sync_interval
+        self._write_queue = None
+        # 模型只在这个单线程执行器中访问，保证写入串行且不阻塞事件循环
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-writer')
+        self._snapshot = None
+        # (计算时的数据版本、价格表和日期, 结果)
+        self._analytics = None
+        self._refresh_snapshot()
+
+    def _refresh_snapshot(self):
+        """在写线程中更新快照，只重新读取数据版本发生变化的工作表"""
+        model = self.model
+        versions = model.snapshot().versions
+        old = self._snapshot
+        if old is not None and old.versions == versions:
+            return
+        changed = set(versions) if old is None else {
+            sheet for sheet, version in versions.items() if old.versions.get(sheet) != version}
+        inventory_changed = model.inventory_sheet in changed
+        self._snapshot = _Snapshot(
+            versions=versions,
+            inventory=model.get_inventory_items() if inventory_changed else old.inventory,
+            # 归档也会修改已售表，已售表没有变化时不重新合并往年归档
+            sold_items=model.get_sold_items() if model.sold_items_sheet in changed else old.sold_items,
+            # 统计数据中的购买市值来自库存表
+            stats=model.get_data_statistics() if inventory_changed or model.data_gather_sheet in changed
+            else old.stats,
+        )
+
+    def _current_analytics(self):
+        """在写线程中获取收益分析，数据版本、价格表和日期都没有变化时使用上次的结果"""
+        price_table = self.mapping.get_price_table() if self.mapping is not None else None
+        key = (self.model.snapshot().versions, date.today())
+        cached = self._analytics
+        if cached is not None and cached[0] == key and cached[1] is price_table:
+            return cached[2]
+        analytics = self._compute_analytics()
+        self._analytics = (key, price_table, analytics)
+        return analytics
+
+    def _compute_analytics(self):
+        analytics = compute_portfolio_analytics(self.model, self.mapping, detail=False)
+        return {key: value for key, value in analytics.items() if key not in ('holdings', 'trades')}
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """启动服务并一直运行"""
+        self._write_queue = asyncio.Queue()
+        writer_task = asyncio.create_task(self._writer_loop())
+        sync_task = asyncio.create_task(self._sync_loop())
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"接口服务已启动: http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+            sync_task.cancel()
+            self._executor.shutdown(wait=True)
+
+    async def _writer_loop(self):
+        """唯一的写任务：依次执行写操作，每次写入后替换快照"""
+        loop = asyncio.get_running_loop()
+        while True:
+            func, future = await self._write_queue.get()
+            try:
+                result = await loop.run_in_executor(self._executor, self._run_write, func)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._write_queue.task_done()
+
+    def _run_write(self, func):
+        result = func()
+        self._refresh_snapshot()
+        return result
+
+    async def _sync_loop(self):
+        """定期同步其他进程的修改并检查冷却期"""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self._submit_write(self._sync)
+            except Exception as e:
+                print(f"同步数据时出错: {str(e)}")
+
+    def _sync(self):
+        self.model.reload_if_changed()
+        self.model.check_cooling_items()
+
+    async def _submit_write(self, func):
+        """提交写操作并等待其完成"""
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((func, future))
+        return await future
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            status, payload = await self._handle_request(reader)
+        except ApiError as e:
+            status, payload = e.status, {'error': e.message}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+
+        body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('utf-8') + body
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        if not request_line:
+            raise ApiError(400, '空请求')
+        try:
+            method, target, _ = request_line.split(' ', 2)
+        except ValueError:
+            raise ApiError(400, f'无效的请求行: {request_line}')
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        body = None
+        length = int(headers.get('content-length', 0) or 0)
+        if length:
+            raw = await reader.readexactly(length)
+            try:
+                body = json.loads(raw.decode('utf-8'))
+            except ValueError:
+                raise ApiError(400, '请求体不是有效的JSON')
+
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = self._routes().get((method, url.path.rstrip('/') or '/'))
+        if route is None:
+            raise ApiError(404, f'未知接口: {method} {url.path}')
+        return 200, await route(params, body)
+
+    def _routes(self):
+        return {
+            ('GET', '/inventory'): self._get_inventory,
+            ('GET', '/sold'): self._get_sold_items,
+            ('GET', '/stats'): self._get_stats,
+            ('GET', '/analytics'): self._get_analytics,
+            ('GET', '/metrics'): self._get_metrics,
+            ('GET', '/alerts'): self._get_alerts,
+            ('POST', '/items'): self._post_item,
+            ('POST', '/items/bulk'): self._post_items_bulk,
+            ('POST', '/sell'): self._post_sell,
+            ('POST', '/prices'): self._post_prices,
+            ('POST', '/alerts'): self._post_alert,
+        }
+
+    # ---------- 读接口（直接使用快照） ----------
+
+    async def _get_inventory(self, params, body):
+        df = self._snapshot.inventory
+        if 'state' in params:
+            df = df[df['goods_state'] == int(params['state'])]
+        if 'goods_type' in params:
+            df = df[df['goods_type'] == params['goods_type']]
+        if 'sub_type' in params:
+            df = df[df['sub_type'] == params['sub_type']]
+        return _page(df, params)
+
+    async def _get_sold_items(self, params, body):
+        return _page(self._snapshot.sold_items, params)
+
+    async def _get_stats(self, params, body):
+        return {key: float(value) for key, value in self._snapshot.stats.items()}
+
+    async def _get_analytics(self, params, body):
+        return await self._submit_write(self._current_analytics)
+
+    async def _get_metrics(self, params, body):
+        return metrics()
+
+    async def _get_alerts(self, params, body):
+        if self.alerts is None:
+            raise ApiError(404, '未配置商品映射文件')
+        try:
+            limit = int(params.get('limit', 100))
+        except ValueError:
+            raise ApiError(400, 'limit必须是整数')
+
+        def read_alerts():
+            rules = self.alerts.rules.list_rules()
+            # 每次都从头读取队列，不影响其他读取方的位置
+            alerts = AlertQueue(self.alerts.queue.file_path).read_new(limit)
+            return {'rules': json.loads(rules.to_json(orient='records', force_ascii=False)), 'alerts': alerts}
+
+        # 提醒规则由写任务中的价格更新同时使用，只在写任务中访问
+        return await self._submit_write(read_alerts)
+
+    # ---------- 写接口（交给写任务执行） ----------
+
+    async def _post_item(self, params, body):
+        item = _parse_item(_require(body, dict))
+        success = await self._submit_write(lambda: self.model.add_item(**item))
+        if not success:
+            raise ApiError(409, '添加商品失败')
+        return {'success': True}
+
+    async def _post_items_bulk(self, params, body):
+        items = [_parse_item(item) for item in _require(_require(body, dict).get('items'), list)]
+        added = await self._submit_write(lambda: self.model.add_items(items))
+        return {'success': True, 'added': added}
+
+    async def _post_sell(self, params, body):
+        body = _require(body, dict)
+        if 'inventory_id' not in body or 'sell_price' not in body:
+            raise ApiError(400, '缺少inventory_id或sell_price')
+
+        def sell():
+            self.model.check_cooling_items()
+            can_sell, message = self.model.can_sell_item(body['inventory_id'])
+            if not can_sell:
+                return False, message
+            return self.model.sell_item(
+                inventory_id=body['inventory_id'],
+                sell_price=float(body['sell_price']),
+                extra_income=float(body.get('extra_income', 0)),
+                sell_time=_parse_time(body.get('sell_time')),
+            )
+
+        success, message = await self._submit_write(sell)
+        if not success:
+            raise ApiError(409, message)
+        return {'success': True, 'message': message}
+
+    async def _post_prices(self, params, body):
+        if self.mapping is None:
+            raise ApiError(404, '未配置商品映射文件')
+        prices = _require(_require(body, dict).get('prices'), dict)
+        try:
+            prices = {int(mapping_id): float(price) for mapping_id, price in prices.items()}
+        except (TypeError, ValueError):
+            raise ApiError(400, '价格格式错误')
+        updated = await self._submit_write(lambda: self.mapping.update_prices(prices))
+        return {'success': True, 'updated': updated}
+
+    async def _post_alert(self, params, body):
+        if self.alerts is None:
+            raise ApiError(404, '未配置商品映射文件')
+        body = _require(body, dict)
+        try:
+            threshold = float(body.get('threshold'))
+        except (TypeError, ValueError):
+            raise ApiError(400, 'threshold必须是数字')
+        try:
+            alert_id = await self._submit_write(lambda: self.alerts.rules.add_rule(
+                body.get('scope'), body.get('kind'), threshold,
+                target=body.get('target'), note=body.get('note', '')))
+        except (TypeError, ValueError) as e:
+            raise ApiError(400, str(e))
+        return {'success': True, 'alert_id': alert_id}
+
+
+def _require(value, expected_type):
+    if not isinstance(value, expected_type):
+        raise ApiError(400, '请求参数格式错误')
+    return value
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    try:
+        return pd.to_datetime(value).to_pydatetime()
+    except (TypeError, ValueError):
+        raise ApiError(400, f'无效的时间: {value}')
+
+
+def _parse_item(data):
+    """把JSON中的商品转换为add_item的参数"""
+    data = _require(data, dict)
+    required = ['goods_name', 'goods_type', 'sub_type', 'goods_wear', 'goods_wear_value', 'buy_price']
+    missing = [key for key in required if key not in data]
+    if missing:
+        raise ApiError(400, f"缺少字段: {', '.join(missing)}")
+    try:
+        return {
+            'goods_name': str(data['goods_name']),
+            'goods_type': str(data['goods_type']),
+            'sub_type': str(data['sub_type']),
+            'goods_wear': str(data['goods_wear']),
+            'goods_wear_value': float(data['goods_wear_value']),
+            'is_stattrak': bool(data.get('is_stattrak', False)),
+            'buy_price': float(data['buy_price']),
+            'buy_time': _parse_time(data.get('buy_time')),
+        }
+    except (TypeError, ValueError):
+        raise ApiError(400, '商品字段格式错误')
+
+
+def _page(df, params):
+    """按offset/limit分页并转换为JSON记录"""
+    try:
+        offset = int(params.get('offset', 0))
+        limit = int(params['limit']) if 'limit' in params else None
+    except ValueError:
+        raise ApiError(400, 'offset/limit必须是整数')
+    page = df.iloc[offset:offset + limit] if limit is not None else df.iloc[offset:]
+    return {
+        'total': len(df),
+        'items': json.loads(page.to_json(orient='records', date_format='iso', force_ascii=False)),
+    }
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"无法序列化: {type(value)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CS2饰品交易系统本地JSON接口服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', default='data/inventory.xlsx', help='库存数据文件')
+    parser.add_argument('--mapping', default='data/item_mapping.xlsx', help='商品映射文件')
+    parser.add_argument('--sync-interval', type=float, default=30.0,
+                        help='同步其他进程修改的间隔（秒）')
+    args = parser.parse_args(argv)
+    # 数据文件可以只给出文件名（相对于当前目录）
+    args.data = os.path.abspath(args.data)
+    args.mapping = os.path.abspath(args.mapping)
+
+    model, mapping = ItemModel(args.data), ItemMapping(args.mapping)
+    install_from_env(model=model, mapping=mapping)
+    service = ApiService(model, mapping, args.sync_interval)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
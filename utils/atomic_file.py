@@ -0,0 +1,21 @@
+"""原子文件写入"""
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write_path(path):
+    """提供一个同目录下的临时文件路径，写入成功后原子替换目标文件。
+    写入过程中出错时删除临时文件，目标文件保持不变。
+    临时文件保留原扩展名，以便pandas等按扩展名选择写入引擎。
+    """
+    directory, name = os.path.split(path)
+    root, ext = os.path.splitext(name)
+    tmp_path = os.path.join(directory, f".{root}.{os.getpid()}.tmp{ext}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
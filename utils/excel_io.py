@@ -0,0 +1,168 @@
+"""流式Excel读写
+
+pandas通过openpyxl写入Excel时，会先在内存中建立整个工作簿的单元格对象，
+十万行的数据文件要占用几百MB内存。这里直接使用openpyxl的流式模式：
+- 读取：read_only模式逐行读取单元格的值，分块填入预先分配好的列数组，
+  读完后每列一次转换为对应的类型（整数、浮点数、布尔、时间、字符串），结果与pd.read_excel一致
+- 写入：write_only模式逐行写入，每次只转换一块行数据
+多个工作表的大文件在多个进程中并行解析（解析是纯Python代码，多线程受GIL限制没有加速）。
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+# 每次转置和写入的行数
+CHUNK_ROWS = 4096
+# 文件超过该大小且读取多个工作表时才使用多进程（启动进程和传回结果有固定开销）
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """进程池在第一次需要时创建，之后共用"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        return _pool
+
+
+def sheet_names(path):
+    """工作簿中的工作表名称"""
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_sheet(path, sheet=None):
+    """读取一个工作表（默认第一个），第一行为列名"""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+        return _read_worksheet(ws)
+    finally:
+        wb.close()
+
+
+def read_sheets(path, sheets=None, parallel=None):
+    """读取多个工作表，返回 {工作表名: DataFrame}，文件中不存在的工作表不包含在结果中。
+
+    Args:
+        path (str): 文件路径
+        sheets (list, optional): 要读取的工作表，默认全部
+        parallel (bool, optional): 是否多进程并行解析，默认按文件大小决定
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        names = [sheet for sheet in (sheets or wb.sheetnames) if sheet in wb.sheetnames]
+        if parallel is None:
+            parallel = (len(names) > 1 and (os.cpu_count() or 1) > 1
+                        and os.path.getsize(path) >= PARALLEL_MIN_BYTES)
+        if not parallel or len(names) < 2:
+            return {sheet: _read_worksheet(wb[sheet]) for sheet in names}
+    finally:
+        wb.close()
+
+    try:
+        frames = _get_pool().map(read_sheet, [path] * len(names), names)
+        return dict(zip(names, frames))
+    except Exception as e:
+        print(f"并行读取工作表出错，改为逐个读取: {str(e)}")
+        return read_sheets(path, names, parallel=False)
+
+
+def write_sheets(path, frames):
+    """按顺序写入多个工作表（{工作表名: DataFrame}），不写索引"""
+    wb = Workbook(write_only=True)
+    for sheet, df in frames.items():
+        ws = wb.create_sheet(sheet)
+        ws.append([str(column) for column in df.columns])
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            columns = [_cell_values(chunk.iloc[:, j]) for j in range(chunk.shape[1])]
+            for row in zip(*columns):
+                ws.append(row)
+    wb.save(path)
+
+
+def _read_worksheet(ws):
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    # 去掉末尾没有列名的空列
+    width = len(header)
+    while width and header[width - 1] is None:
+        width -= 1
+    header = [f"Unnamed: {j}" if name is None else name for j, name in enumerate(header[:width])]
+
+    # 工作表记录了数据范围时按行数预先分配，否则（或记录不准确时）按需扩容
+    capacity = max((ws.max_row or 0) - 1, CHUNK_ROWS)
+    columns = [np.empty(capacity, dtype=object) for _ in range(width)]
+    count = 0
+    block = []
+
+    def flush():
+        nonlocal columns, count
+        size = len(block)
+        if count + size > len(columns[0]):
+            capacity = max(count + size, len(columns[0]) * 2)
+            columns = [np.concatenate([column, np.empty(capacity - len(column), dtype=object)])
+                       for column in columns]
+        for j, values in enumerate(zip(*block)):
+            columns[j][count:count + size] = values
+        count += size
+        block.clear()
+
+    for row in rows:
+        if len(row) != width:
+            row = (row + (None,) * width)[:width]
+        block.append(row)
+        if len(block) >= CHUNK_ROWS:
+            flush()
+    if block:
+        flush()
+    # 末尾带格式的空行也会被读出，不计入数据
+    while count and all(column[count - 1] is None for column in columns):
+        count -= 1
+
+    data = {}
+    for name, column in zip(header, columns):
+        data[name] = _convert_column(column[:count])
+    return pd.DataFrame(data, columns=header)
+
+
+def _convert_column(values):
+    """把单元格值数组转换为与pd.read_excel相同的列类型"""
+    series = pd.Series(values, dtype=object)
+    if series.empty:
+        return series
+    missing = series.isna()
+    if missing.all():
+        return pd.Series(np.nan, index=series.index)
+    if missing.any():
+        series = series.where(~missing, np.nan)
+    converted = series.infer_objects()
+    # Excel中的数值都是浮点数，全部为整数值时pandas读取为整数列
+    if converted.dtype == np.float64 and not converted.isna().any():
+        numbers = converted.to_numpy()
+        if np.all(np.mod(numbers, 1) == 0) and np.all(np.abs(numbers) < 2 ** 63):
+            return converted.astype(np.int64)
+    return converted
+
+
+def _cell_values(series):
+    """一列数据转换为openpyxl可以写入的Python值，缺失值写为空单元格"""
+    values = series.astype(object)
+    missing = series.isna().to_numpy()
+    if missing.any():
+        values = values.where(~missing, None)
+    return values.tolist()
@@ -0,0 +1,129 @@
+"""进程间文件锁"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """基于锁文件的咨询锁（advisory lock）。
+
+    锁文件为 ``<path>.lock``，只在写入（读-改-写）期间持有，
+    读取时可以使用共享锁，多个进程可以同时读取同一份数据。
+    同一个实例在同一线程内可重入，嵌套获取时只在最外层真正加锁/解锁；
+    其他线程获取时等待持有的线程释放（文件锁只在进程之间互斥，线程之间由实例内的RLock互斥）。
+    持有共享锁时不能再嵌套获取独占锁（会抛出RuntimeError），需要先释放共享锁。
+    """
+
+    def __init__(self, path, timeout=10.0, poll_interval=0.05):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._depth = 0
+        self._shared = False
+        # 持有文件锁的线程；其他线程在 _thread_lock 上等待
+        self._thread_lock = threading.RLock()
+        self._owner = None
+
+    def acquire(self, shared=False):
+        """获取锁，超时抛出TimeoutError；持有共享锁时嵌套获取独占锁抛出RuntimeError"""
+        deadline = time.monotonic() + self.timeout
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"获取文件锁超时: {self.lock_path}")
+        if self._depth > 0:
+            # 同一线程嵌套获取
+            if self._shared and not shared:
+                self._thread_lock.release()
+                raise RuntimeError(f"持有共享锁时不能获取独占锁: {self.lock_path}")
+            self._depth += 1
+            return
+        try:
+            directory = os.path.dirname(self.lock_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            while True:
+                try:
+                    self._try_lock(fd, shared)
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        os.close(fd)
+                        raise TimeoutError(f"获取文件锁超时: {self.lock_path}")
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._fd = fd
+        self._depth = 1
+        self._shared = shared
+        self._owner = threading.get_ident()
+
+    def release(self):
+        """释放锁（只有持有锁的线程可以释放）"""
+        if self._depth == 0 or self._owner != threading.get_ident():
+            return
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                self._owner = None
+                try:
+                    self._unlock(self._fd)
+                finally:
+                    os.close(self._fd)
+                    self._fd = None
+        finally:
+            self._thread_lock.release()
+
+    @property
+    def is_locked(self):
+        """当前线程是否持有锁"""
+        return self._depth > 0 and self._owner == threading.get_ident()
+
+    def shared(self):
+        """以共享模式使用的上下文管理器（Windows下退化为独占锁）"""
+        return _LockContext(self, shared=True)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    @staticmethod
+    def _try_lock(fd, shared):
+        if fcntl is not None:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    @staticmethod
+    def _unlock(fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class _LockContext:
+    def __init__(self, lock, shared):
+        self._lock = lock
+        self._shared = shared
+
+    def __enter__(self):
+        self._lock.acquire(shared=self._shared)
+        return self._lock
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._lock.release()
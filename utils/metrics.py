@@ -0,0 +1,247 @@
+"""运行时性能指标
+
+记录各方法的调用耗时直方图、涉及的行数、写入文件的字节数和缓存命中率。
+未启用时不会安装任何包装函数，代码中的埋点只有一次布尔判断，开销可以忽略。
+
+启用方式（环境变量）：
+    CS2_METRICS=1                    启用指标收集
+    CS2_METRICS_DUMP=metrics.json    定期把指标快照写入该文件
+    CS2_METRICS_INTERVAL=60          写入间隔（秒）
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# 直方图桶的上界（毫秒）
+BUCKET_BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                    1000, 2500, 5000, 10000, float('inf')]
+
+# 各类对象默认包装的方法
+MODEL_METHODS = [
+    'add_item', 'add_items', 'sell_item', 'sell_items', 'check_cooling_items', 'can_sell_item',
+    'get_inventory_items', 'get_sold_items', 'get_sold_summary', 'archive_sold_items',
+    'query', 'release_cooling_items', 'get_item_by_id', 'get_time_info', 'get_time_infos',
+    'get_float_index', 'get_float_ranks', 'get_nav_series',
+    'get_current_price', 'get_data_statistics', 'update_total_investment', 'add_fee',
+    'recompute_data_gather', 'reload_if_changed', 'undo', 'redo', '_load_cache', '_save_cache_to_file',
+]
+MAPPING_METHODS = ['get_mapping_id', 'update_current_price', 'update_prices', 'get_price_table',
+                   'get_item_details']
+CONTROLLER_METHODS = [
+    '_update_tables', '_update_inventory_table', '_update_sold_items_table',
+    '_update_analysis', '_update_statistics', 'apply_filters', '_update_visible_status',
+]
+
+
+class _Histogram:
+    """对数分桶的耗时直方图"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKET_BOUNDS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, elapsed_ms, rows):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows:
+            self.rows += rows
+
+    def percentile(self, q):
+        """按桶上界估算分位数"""
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKET_BOUNDS_MS, self.buckets):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'min_ms': self.min_ms or 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'rows': self.rows,
+            'buckets': {
+                ('inf' if bound == float('inf') else str(bound)): n
+                for bound, n in zip(BUCKET_BOUNDS_MS, self.buckets) if n
+            },
+        }
+
+
+class Metrics:
+    """指标注册表（进程内单例 METRICS）"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._installed = []
+        self._dump_timer = None
+
+    # ---------- 记录 ----------
+
+    def record(self, name, elapsed_ms, rows=None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram()
+            histogram.add(elapsed_ms, rows)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def cache_hit(self, cache, hit):
+        """记录一次缓存访问结果"""
+        self.count(f"cache.{cache}.{'hit' if hit else 'miss'}")
+
+    def snapshot(self):
+        """返回当前指标的快照字典"""
+        with self._lock:
+            latency = {name: h.to_dict() for name, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        caches = {}
+        for name, value in counters.items():
+            if name.startswith('cache.'):
+                cache, kind = name[len('cache.'):].rsplit('.', 1)
+                caches.setdefault(cache, {'hit': 0, 'miss': 0})[kind] = value
+        for stats in caches.values():
+            total = stats['hit'] + stats['miss']
+            stats['hit_rate'] = stats['hit'] / total if total else None
+
+        return {
+            'enabled': self.enabled,
+            'timestamp': time.time(),
+            'latency': latency,
+            'counters': counters,
+            'caches': caches,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+    # ---------- 安装/卸载包装 ----------
+
+    def instrument(self, obj, methods, prefix):
+        """在实例上用计时包装替换指定方法（不修改类本身）"""
+        for name in methods:
+            original = getattr(obj, name, None)
+            if original is None or name in vars(obj):
+                continue
+            setattr(obj, name, self._wrap(original, f"{prefix}.{name}"))
+            self._installed.append((obj, name))
+
+    def _wrap(self, func, metric_name):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.record(metric_name, elapsed_ms, _row_count(result))
+            return result
+
+        return wrapper
+
+    def enable(self, model=None, mapping=None, controller=None, portfolios=None):
+        """启用指标收集并为给定对象安装包装。
+        portfolios（PortfolioManager）的每个账户的模型分别记录为 ItemModel[账户名称]，
+        合并视图在创建时记录为 CombinedPortfolio（见 PortfolioManager.get）。
+        """
+        self.enabled = True
+        if model is not None:
+            self.instrument(model, MODEL_METHODS, 'ItemModel')
+        if portfolios is not None:
+            for name, account in portfolios.models.items():
+                self.instrument(account, MODEL_METHODS, f'ItemModel[{name}]')
+        if mapping is not None:
+            self.instrument(mapping, MAPPING_METHODS, 'ItemMapping')
+        if controller is not None:
+            self.instrument(controller, CONTROLLER_METHODS, 'MainController')
+
+    def disable(self):
+        """停止收集并卸载所有包装"""
+        self.enabled = False
+        self.stop_periodic_dump()
+        for obj, name in self._installed:
+            if name in vars(obj):
+                delattr(obj, name)
+        self._installed = []
+
+    # ---------- 定期写入 ----------
+
+    def dump(self, path):
+        """把快照写入JSON文件（先写临时文件再替换）"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_periodic_dump(self, path, interval=60.0):
+        self.stop_periodic_dump()
+
+        def run():
+            try:
+                self.dump(path)
+            except OSError as e:
+                print(f"写入性能指标时出错: {str(e)}")
+            self._dump_timer = threading.Timer(interval, run)
+            self._dump_timer.daemon = True
+            self._dump_timer.start()
+
+        self._dump_timer = threading.Timer(interval, run)
+        self._dump_timer.daemon = True
+        self._dump_timer.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_timer is not None:
+            self._dump_timer.cancel()
+            self._dump_timer = None
+
+
+def _row_count(result):
+    """从返回值推断涉及的行数"""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return None
+
+
+METRICS = Metrics()
+
+
+def metrics():
+    """当前指标快照"""
+    return METRICS.snapshot()
+
+
+def install_from_env(model=None, mapping=None, controller=None, portfolios=None):
+    """根据环境变量决定是否启用指标收集"""
+    if os.environ.get('CS2_METRICS', '') not in ('1', 'true', 'yes'):
+        return False
+    METRICS.enable(model=model, mapping=mapping, controller=controller, portfolios=portfolios)
+    dump_path = os.environ.get('CS2_METRICS_DUMP')
+    if dump_path:
+        METRICS.start_periodic_dump(dump_path, float(os.environ.get('CS2_METRICS_INTERVAL', 60)))
+    return True
@@ -0,0 +1,110 @@
+"""生成简单的SVG图表（折线图、柱状图）
+
+只拼接字符串，不依赖图形界面，可以在后台线程或命令行中使用；
+生成的SVG可以直接嵌入HTML，也可以用QSvgRenderer绘制到图片上。
+"""
+from html import escape
+
+WIDTH = 640
+HEIGHT = 240
+MARGIN_LEFT = 64
+MARGIN_RIGHT = 16
+MARGIN_TOP = 28
+MARGIN_BOTTOM = 36
+LINE_COLOR = '#2f6fb3'
+POSITIVE_COLOR = '#3a9d5d'
+NEGATIVE_COLOR = '#c94c4c'
+
+
+def line_chart(labels, values, title, width=WIDTH, height=HEIGHT):
+    """折线图：labels为横轴标签（只显示首尾和中间几个），values为数值"""
+    values = [float(value) for value in values]
+    parts = _frame(title, width, height)
+    if not values:
+        return _finish(parts)
+    low, high = _value_range(values)
+    parts.extend(_axis(low, high, width, height))
+    points = ' '.join(f"{_x(index, len(values), width):.1f},{_y(value, low, high, height):.1f}"
+                      for index, value in enumerate(values))
+    parts.append(f'<polyline fill="none" stroke="{LINE_COLOR}" stroke-width="1.5" points="{points}"/>')
+    parts.extend(_labels(labels, width, height))
+    return _finish(parts)
+
+
+def bar_chart(labels, values, title, width=WIDTH, height=HEIGHT):
+    """柱状图：正值为绿色，负值为红色"""
+    values = [float(value) for value in values]
+    parts = _frame(title, width, height)
+    if not values:
+        return _finish(parts)
+    low, high = _value_range(values + [0.0])
+    parts.extend(_axis(low, high, width, height))
+    slot = (width - MARGIN_LEFT - MARGIN_RIGHT) / len(values)
+    zero = _y(0.0, low, high, height)
+    for index, value in enumerate(values):
+        y = _y(value, low, high, height)
+        color = POSITIVE_COLOR if value >= 0 else NEGATIVE_COLOR
+        parts.append(f'<rect x="{MARGIN_LEFT + index * slot + slot * 0.15:.1f}" y="{min(y, zero):.1f}" '
+                     f'width="{slot * 0.7:.1f}" height="{max(abs(zero - y), 0.5):.1f}" fill="{color}"/>')
+    parts.extend(_labels(labels, width, height, centered=True))
+    return _finish(parts)
+
+
+def _frame(title, width, height):
+    return [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="{width / 2:.1f}" y="18" text-anchor="middle" font-size="13">{escape(str(title))}</text>',
+    ]
+
+
+def _finish(parts):
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def _value_range(values):
+    low, high = min(values), max(values)
+    if high == low:
+        low, high = low - 1.0, high + 1.0
+    padding = (high - low) * 0.05
+    return low - padding, high + padding
+
+
+def _x(index, count, width):
+    span = width - MARGIN_LEFT - MARGIN_RIGHT
+    return MARGIN_LEFT + (span * index / (count - 1) if count > 1 else span / 2)
+
+
+def _y(value, low, high, height):
+    span = height - MARGIN_TOP - MARGIN_BOTTOM
+    return MARGIN_TOP + span * (high - value) / (high - low)
+
+
+def _axis(low, high, width, height, ticks=4):
+    """纵轴刻度和网格线"""
+    parts = []
+    for step in range(ticks + 1):
+        value = low + (high - low) * step / ticks
+        y = _y(value, low, high, height)
+        parts.append(f'<line x1="{MARGIN_LEFT}" y1="{y:.1f}" x2="{width - MARGIN_RIGHT}" y2="{y:.1f}" '
+                     f'stroke="#e0e0e0"/>')
+        parts.append(f'<text x="{MARGIN_LEFT - 6}" y="{y + 4:.1f}" text-anchor="end">{value:,.0f}</text>')
+    return parts
+
+
+def _labels(labels, width, height, centered=False, max_labels=8):
+    """横轴标签，标签较多时均匀取max_labels个"""
+    labels = [str(label) for label in labels]
+    count = len(labels)
+    if not count:
+        return []
+    step = max((count + max_labels - 1) // max_labels, 1)
+    slot = (width - MARGIN_LEFT - MARGIN_RIGHT) / count
+    parts = []
+    for index in range(0, count, step):
+        x = MARGIN_LEFT + slot * (index + 0.5) if centered else _x(index, count, width)
+        parts.append(f'<text x="{x:.1f}" y="{height - MARGIN_BOTTOM + 16}" text-anchor="middle">'
+                     f'{escape(labels[index])}</text>')
+    return parts
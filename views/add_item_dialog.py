@@ -1,8 +1,10 @@
-from PyQt5.QtWidgets import QDialog
-from PyQt5.QtCore import Qt, QDateTime
+from PyQt5.QtWidgets import QDialog, QCompleter, QTreeView, QMessageBox
+from PyQt5.QtCore import Qt, QDateTime, QModelIndex, QTimer
+from PyQt5.QtGui import QStandardItemModel, QStandardItem
 from PyQt5 import uic
 import os
-from config.goods_types import GOODS_TYPES
+from models.goods_taxonomy import get_taxonomy
+from models.skin_catalog import get_catalog
 
 class AddItemDialog(QDialog):
     def __init__(self, parent=None):
@@ -14,18 +16,21 @@ class AddItemDialog(QDialog):
         # 初始化下拉框
         self.setup_combo_boxes()
         
+        # 名称补全
+        self.setup_completer()
+        
         # 连接信号
         self.connect_signals()
         
     def setup_combo_boxes(self):
         """初始化下拉框的选项"""
         # 商品类型
-        self.type_combo.addItems(list(GOODS_TYPES.keys()))
+        self.type_combo.addItems(get_taxonomy().type_names(include_all=True))
         
         # 商品子类型
         self.subtype_combo.clear()
         if self.type_combo.currentText() != '全部':
-            self.subtype_combo.addItems(GOODS_TYPES[self.type_combo.currentText()][1:])
+            self.subtype_combo.addItems(get_taxonomy().sub_type_names(self.type_combo.currentText()))
         
         # 磨损等级
         self.wear_combo.addItems(['崭新出厂', '略有磨损', '久经沙场', '破损不堪', '战痕累累'])
@@ -33,10 +38,53 @@ class AddItemDialog(QDialog):
         # 设置当前时间
         self.time_input.setDateTime(QDateTime.currentDateTime())
         
+    def setup_completer(self):
+        """名称输入框按饰品目录补全（目录在第一次打开对话框时加载）"""
+        self.catalog = get_catalog()
+        self._completions = []
+        self.completion_model = QStandardItemModel(self)
+        self.completer = QCompleter(self.completion_model, self)
+        # 候选项由目录索引给出，补全器不再自行筛选
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        popup = QTreeView()
+        popup.setRootIsDecorated(False)
+        popup.setHeaderHidden(True)
+        popup.setUniformRowHeights(True)
+        self.completer.setPopup(popup)
+        self.name_input.setCompleter(self.completer)
+        
     def connect_signals(self):
         """连接信号和槽"""
         self.type_combo.currentTextChanged.connect(self.on_type_changed)
         self.stattrak_checkbox.stateChanged.connect(self.on_stattrak_changed)
+        self.name_input.textEdited.connect(self.on_name_edited)
+        self.completer.activated[QModelIndex].connect(self.on_completion_activated)
+        self.buttonBox.accepted.connect(self.on_accept)
+        
+    def on_name_edited(self, text):
+        """输入名称时更新候选项"""
+        self._completions = self.catalog.complete(text.replace(' (StatTrak™)', ''))
+        self.completion_model.clear()
+        for goods_name, goods_type, sub_type in self._completions:
+            self.completion_model.appendRow([QStandardItem(goods_name),
+                                             QStandardItem(f"{sub_type}（{goods_type}）")])
+        if self._completions:
+            self.completer.complete()
+            
+    def on_completion_activated(self, index):
+        """选中候选项后同时设置商品类型和子类型"""
+        if not 0 <= index.row() < len(self._completions):
+            return
+        goods_name, goods_type, sub_type = self._completions[index.row()]
+        # 只使用商品分类中已有的类型，不把目录中的未知子类型加入下拉框
+        if sub_type not in get_taxonomy().sub_type_names(goods_type):
+            QMessageBox.warning(self, '提示', f'商品分类中没有子类型 {sub_type}（{goods_type}），'
+                                            f'请在 data/goods_types.csv 中添加后再选择')
+        else:
+            self.type_combo.setCurrentText(goods_type)
+            self.subtype_combo.setCurrentText(sub_type)
+        # 补全器随后会把输入框设为名称，之后再补上暗金后缀
+        QTimer.singleShot(0, lambda: self.on_stattrak_changed(self.stattrak_checkbox.checkState()))
         
     def on_stattrak_changed(self, state):
         """当暗金选项改变时更新预览名称"""
@@ -53,14 +101,21 @@ class AddItemDialog(QDialog):
         # 更新子类型列表
         self.subtype_combo.clear()
         if main_type != '全部':
-            self.subtype_combo.addItems(GOODS_TYPES[main_type][1:])  # 排除"全部"选项
+            self.subtype_combo.addItems(get_taxonomy().sub_type_names(main_type))
             
         # 更新暗金选项状态
-        is_gun = main_type in ['手枪', '匕首', '步枪']
-        self.stattrak_checkbox.setEnabled(is_gun)  # 只有枪械可以选择暗金
+        is_gun = get_taxonomy().has_stattrak(main_type)
+        self.stattrak_checkbox.setEnabled(is_gun)  # 只有有暗金版本的大类（分类文件中stattrak为1）可以选择暗金
         if not is_gun:
             self.stattrak_checkbox.setChecked(False)
             
+    def on_accept(self):
+        goods_type = self.type_combo.currentText()
+        if self.subtype_combo.currentText() not in get_taxonomy().sub_type_names(goods_type):
+            QMessageBox.warning(self, '提示', '请选择商品类型和子类型')
+            return
+        self.accept()
+
     def get_data(self):
         """获取表单数据"""
         # 构建商品名称：子类型 + StatTrak™（如果选中）
@@ -0,0 +1,90 @@
+from PyQt5.QtWidgets import QDialog, QFileDialog, QMessageBox
+from PyQt5.QtCore import QDate
+from PyQt5 import uic
+from datetime import datetime, time
+import os
+from models.goods_taxonomy import get_taxonomy
+from models.exporter import default_export_name
+
+class ExportDialog(QDialog):
+    # 显示名称 -> 表名 / 格式
+    TABLES = {'已售商品': 'sold_items', '库存': 'inventory'}
+    FORMATS = {'CSV': 'csv', 'JSONL': 'jsonl', 'Parquet': 'parquet'}
+
+    def __init__(self, parent=None, default_dir='.'):
+        super().__init__(parent)
+        self.default_dir = default_dir
+
+        # 加载UI文件
+        ui_file = os.path.join(os.path.dirname(__file__), 'ui/export_dialog.ui')
+        uic.loadUi(ui_file, self)
+
+        # 初始化界面
+        self.setup_ui()
+
+        # 连接信号
+        self.connect_signals()
+
+    def setup_ui(self):
+        """初始化界面数据"""
+        self.table_combo.addItems(self.TABLES.keys())
+        self.format_combo.addItems(self.FORMATS.keys())
+        self.type_combo.addItems(get_taxonomy().type_names(include_all=True))
+
+        # 默认日期范围为今年
+        today = QDate.currentDate()
+        self.start_date.setDate(QDate(today.year(), 1, 1))
+        self.end_date.setDate(today)
+        self.on_date_range_toggled(False)
+        self.update_default_path()
+
+    def connect_signals(self):
+        """连接信号和槽"""
+        self.date_range_check.toggled.connect(self.on_date_range_toggled)
+        self.table_combo.currentTextChanged.connect(self.update_default_path)
+        self.format_combo.currentTextChanged.connect(self.update_default_path)
+        self.btn_browse.clicked.connect(self.on_browse)
+        self.buttonBox.accepted.connect(self.on_accept)
+
+    def on_date_range_toggled(self, checked):
+        self.start_date.setEnabled(checked)
+        self.end_date.setEnabled(checked)
+
+    def update_default_path(self):
+        """根据表和格式生成默认文件名"""
+        name = default_export_name(self.TABLES[self.table_combo.currentText()],
+                                   self.FORMATS[self.format_combo.currentText()])
+        directory = os.path.dirname(self.path_input.text()) or self.default_dir
+        self.path_input.setText(os.path.join(directory, name))
+
+    def on_browse(self):
+        fmt = self.format_combo.currentText()
+        path, _ = QFileDialog.getSaveFileName(
+            self, '导出到', self.path_input.text(), f"{fmt} (*.{self.FORMATS[fmt]})")
+        if path:
+            self.path_input.setText(path)
+
+    def on_accept(self):
+        if not self.path_input.text().strip():
+            QMessageBox.warning(self, '提示', '请选择保存位置')
+            return
+        if self.date_range_check.isChecked() and self.start_date.date() > self.end_date.date():
+            QMessageBox.warning(self, '提示', '开始日期不能晚于结束日期')
+            return
+        self.accept()
+
+    def get_data(self):
+        """获取表单数据"""
+        start = end = None
+        if self.date_range_check.isChecked():
+            start = datetime.combine(self.start_date.date().toPyDate(), time.min)
+            end = datetime.combine(self.end_date.date().toPyDate(), time.max)
+        goods_type = self.type_combo.currentText()
+        return {
+            'table': self.TABLES[self.table_combo.currentText()],
+            'fmt': self.FORMATS[self.format_combo.currentText()],
+            'path': self.path_input.text().strip(),
+            'start': start,
+            'end': end,
+            'goods_type': None if goods_type == '全部' else goods_type,
+        }
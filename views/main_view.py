@@ -3,11 +3,12 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QComboBox, QDoubleSpinBox, QMessageBox,
                              QGroupBox, QDialog, QInputDialog, QGridLayout)
 from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QKeySequence
 from PyQt5 import uic
 import os
 from .add_item_dialog import AddItemDialog
-from config.goods_types import GOODS_TYPES
-from PyQt5.QtWidgets import QHeaderView
+from models.goods_taxonomy import get_taxonomy
+from PyQt5.QtWidgets import QHeaderView, QShortcut
 
 class MainView(QMainWindow):
     def __init__(self):
@@ -33,7 +34,7 @@ class MainView(QMainWindow):
         """设置表格属性"""
         # 设置库存表格
         headers = ["商品名称", "商品类型", "具体类型", "磨损等级", 
-                    "磨损值", "购买价格", "购买时间", "当前价格", 
+                    "磨损值", "磨损排名", "购买价格", "购买时间", "当前价格", 
                     "商品状态", "操作"]
         self.inventory_table.setColumnCount(len(headers))
         self.inventory_table.setHorizontalHeaderLabels(headers)
@@ -56,8 +57,8 @@ class MainView(QMainWindow):
     def setup_filters(self):
         """初始化筛选器"""
         # 商品类型筛选
-        self.type_filter.addItems(GOODS_TYPES.keys())
-        self.subtype_filter.addItems(GOODS_TYPES['全部'])
+        self.type_filter.addItems(get_taxonomy().type_names(include_all=True))
+        self.subtype_filter.addItems(get_taxonomy().sub_type_names('全部', include_all=True))
         
         # 磨损等级筛选
         self.wear_filter.addItems(['全部', '崭新出厂', '略有磨损', '久经沙场', '破损不堪', '战痕累累'])
@@ -65,6 +66,10 @@ class MainView(QMainWindow):
         # 状态筛选
         self.state_combo.addItems(['全部', '冷却期', '持有中', '已售出'])
         
+        # 只有一个账户时不显示账户选择
+        self.label_portfolio.setVisible(False)
+        self.portfolio_combo.setVisible(False)
+        
     def connect_signals(self):
         """连接信号槽"""
         # 连接筛选器信号
@@ -79,14 +84,40 @@ class MainView(QMainWindow):
         # 连接添加按钮信号
         self.btn_add.clicked.connect(self.on_add_item)
         
+        # 已售商品年份筛选
+        self.sold_year_filter.currentTextChanged.connect(self.on_sold_year_changed)
+        
+        # 翻页
+        self.btn_inventory_prev.clicked.connect(lambda: self.on_change_page('inventory', -1))
+        self.btn_inventory_next.clicked.connect(lambda: self.on_change_page('inventory', 1))
+        self.btn_sold_prev.clicked.connect(lambda: self.on_change_page('sold', -1))
+        self.btn_sold_next.clicked.connect(lambda: self.on_change_page('sold', 1))
+        
+        # 撤销/重做
+        self.btn_undo.clicked.connect(self.on_undo)
+        self.btn_redo.clicked.connect(self.on_redo)
+        
+        # 导出
+        self.btn_export.clicked.connect(self.on_export)
+        self.btn_reconcile.clicked.connect(self.on_reconcile)
+        self.btn_report.clicked.connect(self.on_generate_reports)
+        QShortcut(QKeySequence.Undo, self, activated=self.on_undo)
+        QShortcut(QKeySequence.Redo, self, activated=self.on_redo)
+        
         # 连接统计按钮信号
         self.btn_adjust_investment.clicked.connect(self.on_adjust_investment)
         self.btn_add_fee.clicked.connect(self.on_add_fee)
         
+        # 价格提醒
+        self.btn_clear_alerts.clicked.connect(self.on_clear_alerts)
+        
+        # 切换账户
+        self.portfolio_combo.currentTextChanged.connect(self.on_portfolio_changed)
+        
     def on_type_filter_changed(self, main_type):
         # 更新子类型下拉框
         self.subtype_filter.clear()
-        self.subtype_filter.addItems(GOODS_TYPES[main_type])
+        self.subtype_filter.addItems(get_taxonomy().sub_type_names(main_type, include_all=True))
         self.subtype_filter.setCurrentText('全部')
         # 触发筛选更新
         self.on_filter_changed()
@@ -95,6 +126,95 @@ class MainView(QMainWindow):
         if self.controller:
             self.controller.add_item()
 
+    def set_sold_years(self, years):
+        """更新已售商品的年份选项（默认选中最近的年份），保留当前选择"""
+        options = [str(year) for year in years] + ['全部']
+        if options == [self.sold_year_filter.itemText(i) for i in range(self.sold_year_filter.count())]:
+            return
+        current = self.sold_year_filter.currentText()
+        self.sold_year_filter.blockSignals(True)
+        self.sold_year_filter.clear()
+        self.sold_year_filter.addItems(options)
+        if current in options:
+            self.sold_year_filter.setCurrentText(current)
+        self.sold_year_filter.blockSignals(False)
+
+    def set_portfolios(self, names, current):
+        """设置账户选项（多于一个账户时才显示）"""
+        self.portfolio_combo.blockSignals(True)
+        self.portfolio_combo.clear()
+        self.portfolio_combo.addItems(names)
+        self.portfolio_combo.setCurrentText(current)
+        self.portfolio_combo.blockSignals(False)
+        self.label_portfolio.setVisible(len(names) > 1)
+        self.portfolio_combo.setVisible(len(names) > 1)
+
+    def on_portfolio_changed(self, name):
+        if self.controller and name:
+            self.controller.switch_portfolio(name)
+
+    def on_sold_year_changed(self, year):
+        if self.controller and year:
+            self.controller.set_page('sold', 0)
+
+    def on_change_page(self, table, step):
+        if self.controller:
+            self.controller.change_page(table, step)
+
+    def set_page_info(self, table, page, total, page_size):
+        """更新表格（inventory/sold）的页码显示和翻页按钮状态"""
+        pages = max((total + page_size - 1) // page_size, 1)
+        getattr(self, f"lbl_{table}_page").setText(f"第 {page + 1}/{pages} 页（共 {total} 条）")
+        getattr(self, f"btn_{table}_prev").setEnabled(page > 0)
+        getattr(self, f"btn_{table}_next").setEnabled(page + 1 < pages)
+
+    def on_export(self):
+        if self.controller:
+            self.controller.export_data()
+
+    def on_reconcile(self):
+        if self.controller:
+            self.controller.reconcile_trades()
+
+    def on_generate_reports(self):
+        if self.controller:
+            self.controller.generate_reports()
+
+    def on_undo(self):
+        if self.controller:
+            self.controller.undo()
+
+    def on_redo(self):
+        if self.controller:
+            self.controller.redo()
+
+    def set_undo_redo_enabled(self, can_undo, can_redo):
+        """更新撤销/重做按钮的可用状态"""
+        self.btn_undo.setEnabled(can_undo)
+        self.btn_redo.setEnabled(can_redo)
+
+    def add_alerts(self, texts, max_rows=500):
+        """在价格提醒列表顶部加入新提醒（最新的在最上面）"""
+        for text in texts:
+            self.alert_list.insertItem(0, text)
+        while self.alert_list.count() > max_rows:
+            self.alert_list.takeItem(self.alert_list.count() - 1)
+        if texts:
+            index = self.tabWidget.indexOf(self.tab_alerts)
+            self.tabWidget.setTabText(index, f"价格提醒 ({self.alert_list.count()})")
+
+    def on_clear_alerts(self):
+        if self.controller:
+            self.controller.clear_alerts()
+
+    def clear_alerts(self):
+        self.alert_list.clear()
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab_alerts), "价格提醒")
+
+    def show_status(self, message, timeout=5000):
+        """在状态栏显示提示信息"""
+        self.statusbar.showMessage(message, timeout)
+
     def show_add_dialog(self):
         dialog = AddItemDialog(self)
         if dialog.exec_() == AddItemDialog.Accepted:
@@ -116,7 +236,7 @@ class MainView(QMainWindow):
     def on_clear_filter(self):
         self.type_filter.setCurrentText('全部')
         self.subtype_filter.clear()
-        self.subtype_filter.addItems(GOODS_TYPES['全部'])
+        self.subtype_filter.addItems(get_taxonomy().sub_type_names('全部', include_all=True))
         self.wear_filter.setCurrentText('全部')
         self.state_combo.setCurrentText('全部')
         self.price_min.setValue(0)
@@ -158,3 +278,9 @@ class MainView(QMainWindow):
         self.lbl_total_fee.setText(f"总手续费: {stats['total_fee']:.2f}")
         self.lbl_purchase_market_value.setText(f"购买市值: {stats['purchase_market_value']:.2f}")
         self.lbl_current_market_value.setText(f"当前市值: {stats['current_market_value']:.2f}")
+        self.lbl_realized_pnl.setText(f"已实现收益: {stats.get('realized_pnl', 0.0):.2f}")
+        self.lbl_unrealized_pnl.setText(f"未实现收益: {stats.get('unrealized_pnl', 0.0):.2f}")
+        self.lbl_avg_annualized_return.setText(
+            f"平均年化收益率: {stats.get('avg_annualized_return', 0.0) * 100:.2f}%")
+        self.lbl_twr.setText(f"时间加权收益率: {stats.get('twr', 0.0) * 100:.2f}%"
+                             f" (年化 {stats.get('twr_annualized', 0.0) * 100:.2f}%)")
@@ -0,0 +1,79 @@
+from PyQt5.QtWidgets import QDialog, QTableWidgetItem, QHeaderView, QMessageBox
+from PyQt5 import uic
+import os
+import pandas as pd
+
+class ReconcileDialog(QDialog):
+    # 每类记录最多显示的行数（完整结果可以用命令行导出）
+    MAX_ROWS = 500
+    # 列名 -> 表头
+    HEADERS = {
+        'line': '行号',
+        'side': '方向',
+        'goods_name': '商品名称',
+        'goods_wear_value': '磨损值',
+        'price': '价格',
+        'time': '时间',
+        'inventory_id': '账本商品ID',
+        'ledger_price': '账本价格',
+        'ledger_time': '账本时间',
+        'price_diff': '价格差',
+        'time_diff': '时间差',
+    }
+    SIDES = {'buy': '买入', 'sell': '卖出'}
+
+    def __init__(self, result, parent=None):
+        super().__init__(parent)
+        self.result = result
+
+        # 加载UI文件
+        ui_file = os.path.join(os.path.dirname(__file__), 'ui/reconcile_dialog.ui')
+        uic.loadUi(ui_file, self)
+
+        self.setup_ui()
+        self.btn_apply.clicked.connect(self.on_apply)
+
+    def setup_ui(self):
+        """显示对账汇总和各类记录"""
+        summary = self.result.summary()
+        self.lbl_summary.setText(
+            f"已匹配 {summary['matched']} 条，缺少买入 {summary['missing_buy']} 条、"
+            f"缺少卖出 {summary['missing_sell']} 条，重复 {summary['duplicated']} 条，"
+            f"价格或时间不一致 {summary['mismatched']} 条")
+        for name in ('missing', 'mismatched', 'duplicated', 'matched'):
+            df = getattr(self.result, name)
+            self._fill_table(getattr(self, f"table_{name}"), df)
+            index = self.result_tabs.indexOf(getattr(self, f"tab_{name}"))
+            self.result_tabs.setTabText(index, f"{self.result_tabs.tabText(index)} ({len(df)})")
+        self.btn_apply.setEnabled(not self.result.missing.empty)
+
+    def _fill_table(self, table, df):
+        columns = [column for column in self.HEADERS if column in df.columns]
+        rows = df.head(self.MAX_ROWS)
+        table.setColumnCount(len(columns))
+        table.setHorizontalHeaderLabels([self.HEADERS[column] for column in columns])
+        table.setRowCount(len(rows))
+        for column_index, column in enumerate(columns):
+            for row_index, value in enumerate(rows[column].tolist()):
+                table.setItem(row_index, column_index, QTableWidgetItem(self._format(column, value)))
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+    def _format(self, column, value):
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return ''
+        if column == 'side':
+            return self.SIDES.get(value, value)
+        if column in ('time', 'ledger_time'):
+            return pd.Timestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+        if column in ('price', 'ledger_price', 'price_diff'):
+            return f"{value:.2f}"
+        return str(value)
+
+    def on_apply(self):
+        summary = self.result.summary()
+        reply = QMessageBox.question(
+            self, '确认',
+            f"将添加 {summary['missing_buy']} 件商品到库存，并出售 {summary['missing_sell']} 件商品，是否继续？",
+            QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.accept()
@@ -0,0 +1,61 @@
+from PyQt5.QtWidgets import QDialog, QFileDialog, QMessageBox
+from PyQt5 import uic
+import os
+
+class ReportDialog(QDialog):
+    # 显示名称 -> 期间 / 格式
+    PERIODS = {'月度对账单': 'month', '年度对账单': 'year'}
+    FORMATS = {'HTML': 'html', 'PDF': 'pdf'}
+    ALL_YEARS = '全部年份'
+
+    def __init__(self, years, parent=None, default_dir='.'):
+        """
+        Args:
+            years (list): 有售出记录的年份（降序）
+        """
+        super().__init__(parent)
+        self.years = years
+        self.default_dir = default_dir
+
+        # 加载UI文件
+        ui_file = os.path.join(os.path.dirname(__file__), 'ui/report_dialog.ui')
+        uic.loadUi(ui_file, self)
+
+        # 初始化界面
+        self.setup_ui()
+
+        # 连接信号
+        self.connect_signals()
+
+    def setup_ui(self):
+        """初始化界面数据"""
+        self.period_combo.addItems(self.PERIODS.keys())
+        self.year_combo.addItems([str(year) for year in self.years] + [self.ALL_YEARS])
+        self.format_combo.addItems(self.FORMATS.keys())
+        self.directory_input.setText(os.path.join(self.default_dir, 'reports'))
+
+    def connect_signals(self):
+        """连接信号和槽"""
+        self.btn_browse.clicked.connect(self.on_browse)
+        self.buttonBox.accepted.connect(self.on_accept)
+
+    def on_browse(self):
+        directory = QFileDialog.getExistingDirectory(self, '保存到', self.directory_input.text())
+        if directory:
+            self.directory_input.setText(directory)
+
+    def on_accept(self):
+        if not self.directory_input.text().strip():
+            QMessageBox.warning(self, '提示', '请选择保存位置')
+            return
+        self.accept()
+
+    def get_data(self):
+        """获取表单数据"""
+        year = self.year_combo.currentText()
+        return {
+            'period': self.PERIODS[self.period_combo.currentText()],
+            'years': None if year == self.ALL_YEARS else [int(year)],
+            'fmt': self.FORMATS[self.format_combo.currentText()],
+            'directory': self.directory_input.text().strip(),
+        }